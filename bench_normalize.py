@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+
+
+'''
+Benchmarks author/title normalization: the previous per-item functions
+against util.normalize_authors/util.normalize_titles, checking that
+outputs are identical.
+'''
+
+
+import re
+import sys
+import time
+import random
+import unicodedata
+
+import util
+
+
+#number of names/titles to normalize
+N_ITEMS = 1000000
+#number of distinct names/titles (they recur in refs lists)
+N_DISTINCT_ITEMS = 50000
+
+
+def _slugify(seq, sep='-'):
+    seq = unicodedata.normalize('NFKD', seq)
+    seq = seq.encode('ascii', 'ignore').decode()
+    seq = seq.strip().lower()
+    seq = re.sub(r'[^\w\s-]', '', seq)
+    seq = re.sub(r'[-\s]+', sep, seq)
+    return seq
+
+
+def _normalize_author(author):
+    '''
+    Implementation previously used in util.
+    '''
+    author = util.remove(author, '0123456789')
+    author = author.strip(' ')
+    author = util.remove_reps(author, ' ')
+    if ',' in author:
+        author = ' '.join(author.split(',')[::-1])
+    author = author.replace('-', ' ')
+    author = _slugify(author, sep='-')
+    author = util.crop_author_names(author)
+    return author
+
+
+def _normalize_title(title):
+    '''
+    Implementation previously used in util.
+    '''
+    title = '' if title is None else title
+    title = title.lower()
+    title = util.remove(title, '0123456789')
+    title = title.split('.')[0]
+    title = _slugify(title)
+    tokens = title.split('-')
+    for term in ['et', 'al']:
+        tokens = [tok for tok in tokens if not tok == term]
+    for term in ['arxiv', 'biorxiv', 'preprint', 'abs/']:
+        tokens = [tok for tok in tokens if not tok.startswith(term)]
+    for term in ['/']:
+        tokens = [tok for tok in tokens if not term in tok]
+    title = '-'.join(tokens)
+    return title
+
+
+_FIRST_NAMES = ['Dzmitry', 'K.', 'Yoshua', 'Ashish', 'N', 'José', 'Łukasz',
+    'Jean-Pierre', 'A. B.', 'Zoë', '  Kyung Hyun']
+_LAST_NAMES = ['Bahdanau', 'Cho', 'Bengio', 'Vaswani', 'Shazeer', 'García',
+    'Kaiser', 'van der Maaten', 'Müller', 'Li1', 'O\'Neil']
+_WORDS = ['attention', 'is', 'all', 'you', 'need', 'Neural', 'Machine',
+    'translation', 'et', 'al', 'arXiv', 'preprint', 'arXiv:1706.03762',
+    '2017', 'learning', 'to', 'align', 'and', 'translate', 'Ünicode',
+    '(NIPS)', 'In', 'Proc.', 'deep']
+
+
+def get_rand_author(rng):
+    first = rng.choice(_FIRST_NAMES)
+    last = rng.choice(_LAST_NAMES)
+    if rng.random() < 0.3:
+        return '{}, {}'.format(last, first)
+    return '{} {}'.format(first, last)
+
+
+def get_rand_title(rng):
+    return ' '.join(rng.choice(_WORDS) for __ in range(rng.randint(3, 12)))
+
+
+def get_items(fn, n_items, n_distinct_items, seed=0):
+    rng = random.Random(seed)
+    distinct_items = [fn(rng) for __ in range(n_distinct_items)]
+    #zipf-like recurrence of items
+    weights = [1/(i + 1) for i in range(n_distinct_items)]
+    return rng.choices(distinct_items, weights=weights, k=n_items)
+
+
+def timeit(fn, *args):
+    start = time.perf_counter()
+    ret = fn(*args)
+    return ret, time.perf_counter() - start
+
+
+def bench(name, items, prev_fn, batch_fn):
+    prev_out, prev_time = timeit(lambda xs: [prev_fn(x) for x in xs], items)
+    out, time_ = timeit(batch_fn, items)
+    assert out == prev_out
+    print('{} {}: previous = {:.3f}s, batch = {:.3f}s, speedup = {:.1f}x'.format(
+        len(items), name, prev_time, time_, prev_time/max(time_, 1e-9)))
+
+
+def main():
+    n_items = int(sys.argv[1]) if len(sys.argv) > 1 else N_ITEMS
+    authors = get_items(get_rand_author, n_items, N_DISTINCT_ITEMS)
+    bench('authors', authors, _normalize_author, util.normalize_authors)
+    titles = get_items(get_rand_title, n_items, N_DISTINCT_ITEMS)
+    bench('titles', titles, _normalize_title, util.normalize_titles)
+
+
+if __name__ == '__main__':
+    main()
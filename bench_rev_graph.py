@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+
+
+'''
+Benchmarks reverse graph construction: the previous O(V*E) implementation
+against util.get_rev_graph, which runs in O(V+E).
+'''
+
+
+import sys
+import time
+import random
+
+import util
+
+
+#numbers of nodes of the random graphs
+N_NODES = [1000, 10000, 100000]
+#mean out-degree of nodes
+MEAN_DEGREE = 10
+#skip the quadratic implementation if estimated to take longer than this
+MAX_QUADRATIC_TIME = 120
+
+
+def get_rev_graph_quadratic(graph):
+    '''
+    Implementation previously used in mk_citation_graphs.
+    '''
+    all_nodes = set(graph.keys())
+    rev_graph = {node: set() for node in all_nodes}
+    for to_node in all_nodes:
+        for from_node, nodes in graph.items():
+            if to_node in nodes and from_node in all_nodes:
+                rev_graph[to_node].add(from_node)
+    return rev_graph
+
+
+def get_rand_graph(n_nodes, mean_degree=MEAN_DEGREE, seed=0):
+    rng = random.Random(seed)
+    nodes = ['node-{}'.format(i) for i in range(n_nodes)]
+    graph = {n: set(rng.sample(nodes, rng.randint(0, 2*mean_degree)))
+        for n in nodes}
+    return graph
+
+
+def timeit(fn, *args):
+    start = time.perf_counter()
+    ret = fn(*args)
+    return ret, time.perf_counter() - start
+
+
+def main():
+    n_nodes_list = [int(a) for a in sys.argv[1:]] or N_NODES
+    quadratic_time_per_op = None
+    for n_nodes in n_nodes_list:
+        graph = get_rand_graph(n_nodes)
+        n_edges = sum(len(v) for v in graph.values())
+        rev_graph, linear_time = timeit(util.get_rev_graph, graph)
+        print('{} nodes, {} edges: linear = {:.4f}s'.format(
+            n_nodes, n_edges, linear_time), end=', ')
+
+        n_ops = n_nodes*n_nodes
+        if quadratic_time_per_op is not None \
+                and quadratic_time_per_op*n_ops > MAX_QUADRATIC_TIME:
+            print('quadratic = skipped (estimated {:.0f}s)'.format(
+                quadratic_time_per_op*n_ops))
+            continue
+        rev_graph_, quadratic_time = timeit(get_rev_graph_quadratic, graph)
+        quadratic_time_per_op = quadratic_time/n_ops
+        assert rev_graph == rev_graph_
+        print('quadratic = {:.4f}s, speedup = {:.1f}x'.format(
+            quadratic_time, quadratic_time/max(linear_time, 1e-9)))
+
+
+if __name__ == '__main__':
+    main()
@@ -22,16 +22,33 @@ paths['raw-papers-metadata'] = os.path.join(
 #pre-processed papers metadata based on zotero exported metadata
 paths['papers-metadata'] = os.path.join(
     paths['data-dir'], 'papers-metadata.json')
+#same as above in columnar format, for loading only some fields
+paths['papers-metadata-table'] = os.path.join(
+    paths['data-dir'], 'papers-metadata.parquet')
 
 #directory for downloaded pdfs that weren't present in exported metadata
 paths['pdfs-dir'] = os.path.join(paths['data-dir'], 'pdfs')
 
 #raw references file produced by analyzing papers pdfs
+#in JSON-lines format, one {"uid": paper uid, "refs": [refs]} per line
 paths['raw-papers-refs'] = os.path.join(
-    paths['data-dir'], 'papers-raw-refs.json')
-#parsed raw references
+    paths['data-dir'], 'papers-raw-refs.jsonl')
+#cache of raw references extracted from each pdf, keyed by pdf content hash
+paths['raw-refs-cache-dir'] = os.path.join(
+    paths['data-dir'], 'raw-refs-cache')
+#parsed raw references, in same format as raw references
 paths['papers-refs'] = os.path.join(
-    paths['data-dir'], 'papers-refs.json')
+    paths['data-dir'], 'papers-refs.jsonl')
+#cache of parsed raw references, shared by all collections
+paths['parsed-refs-cache'] = os.path.join(
+    os.path.expanduser('~'), '.cache', 'litrev', 'parsed-refs-cache.sqlite')
+
+#document-term counts and tf-idf sparse matrices of abstracts/titles
+paths['abstract-dtm'] = os.path.join(paths['data-dir'], 'abstract-dtm.npz')
+paths['abstract-tfidf'] = os.path.join(
+    paths['data-dir'], 'abstract-tfidf.npz')
+paths['title-dtm'] = os.path.join(paths['data-dir'], 'title-dtm.npz')
+paths['title-tfidf'] = os.path.join(paths['data-dir'], 'title-tfidf.npz')
 
 #authors citations graph in format {author: {authors cited by author}}
 paths['authors-refs-graph'] = os.path.join(
@@ -47,6 +64,33 @@ paths['titles-refs-graph'] = os.path.join(
 paths['titles-refs-rev-graph'] = os.path.join(
     paths['data-dir'], 'titles-refs-rev-graph.json')
 
+#refs titles matched to collection titles by similarity (not equality)
+paths['fuzzy-title-matches'] = os.path.join(
+    paths['data-dir'], 'fuzzy-title-matches.csv')
+
+#state of last graphs build (papers, refs titles, cited titles), for
+#updating graphs only with papers added/changed since then
+paths['citation-graphs-state'] = os.path.join(
+    paths['data-dir'], 'citation-graphs-state.json')
+
+#same graphs as above in compact CSR format (see csr_graph.py)
+paths['authors-refs-graph-csr'] = os.path.join(
+    paths['data-dir'], 'authors-refs-graph.npz')
+paths['authors-refs-rev-graph-csr'] = os.path.join(
+    paths['data-dir'], 'authors-refs-rev-graph.npz')
+paths['titles-refs-graph-csr'] = os.path.join(
+    paths['data-dir'], 'titles-refs-graph.npz')
+paths['titles-refs-rev-graph-csr'] = os.path.join(
+    paths['data-dir'], 'titles-refs-rev-graph.npz')
+
+#refs titles co-citation graph {title: {titles cited together with it}}
+#and papers bibliographic coupling graph {uid: {uids with common refs}},
+#weighted and with only the top neighbors of each node (CSR format)
+paths['cocitation-graph-csr'] = os.path.join(
+    paths['data-dir'], 'cocitation-graph.npz')
+paths['coupling-graph-csr'] = os.path.join(
+    paths['data-dir'], 'coupling-graph.npz')
+
 #histograms for word frequencies in papers titles
 paths['title-word-freqs-hist'] = os.path.join(
     paths['data-dir'], 'title-word-freqs-hist.csv')
@@ -61,6 +105,33 @@ paths['authors-refs-hist'] = os.path.join(
 #in format {title: n. of papers that cite title}
 paths['titles-refs-hist'] = os.path.join(
     paths['data-dir'], 'titles-refs-hist.csv')
+#histograms for pagerank/hits scores of nodes of citations graphs
+paths['authors-pagerank-hist'] = os.path.join(
+    paths['data-dir'], 'authors-pagerank-hist.csv')
+paths['authors-hubs-hist'] = os.path.join(
+    paths['data-dir'], 'authors-hubs-hist.csv')
+paths['authors-authorities-hist'] = os.path.join(
+    paths['data-dir'], 'authors-authorities-hist.csv')
+paths['titles-pagerank-hist'] = os.path.join(
+    paths['data-dir'], 'titles-pagerank-hist.csv')
+paths['titles-hubs-hist'] = os.path.join(
+    paths['data-dir'], 'titles-hubs-hist.csv')
+paths['titles-authorities-hist'] = os.path.join(
+    paths['data-dir'], 'titles-authorities-hist.csv')
+#pagerank/hits scores of nodes of citations graphs, by CSR graph node id
+paths['authors-ranks'] = os.path.join(paths['data-dir'], 'authors-ranks.npz')
+paths['titles-ranks'] = os.path.join(paths['data-dir'], 'titles-ranks.npz')
+
+#louvain clusters of nodes of citations graphs in format {node: cluster}
+#and summaries of clusters (size, component, most cited nodes)
+paths['titles-clusters'] = os.path.join(
+    paths['data-dir'], 'titles-clusters.csv')
+paths['titles-clusters-summaries'] = os.path.join(
+    paths['data-dir'], 'titles-clusters-summaries.csv')
+paths['authors-clusters'] = os.path.join(
+    paths['data-dir'], 'authors-clusters.csv')
+paths['authors-clusters-summaries'] = os.path.join(
+    paths['data-dir'], 'authors-clusters-summaries.csv')
 
 #plots for histograms
 paths['title-word-freqs-hist-plot'] = os.path.join(
@@ -71,6 +142,10 @@ paths['authors-refs-hist-plot'] = os.path.join(
     paths['data-dir'], 'authors-refs-hist.pdf')
 paths['titles-refs-hist-plot'] = os.path.join(
     paths['data-dir'], 'titles-refs-hist.pdf')
+paths['authors-pagerank-hist-plot'] = os.path.join(
+    paths['data-dir'], 'authors-pagerank-hist.pdf')
+paths['titles-pagerank-hist-plot'] = os.path.join(
+    paths['data-dir'], 'titles-pagerank-hist.pdf')
 
 #plots for graphs
 paths['titles-graph-plot'] = os.path.join(
@@ -97,3 +172,164 @@ paths['search-pubs-results-dir'] = os.path.join(
 
 #number of threads to use on scripts that use parallelism
 n_threads = 8
+
+#state of the last pipeline run (content hashes of stages inputs/outputs)
+paths['pipeline-state'] = os.path.join(paths['data-dir'], 'pipeline-state.json')
+
+#pipeline stages in execution order, used by run_pipeline.py.
+#each stage is a script in this dir, with inputs/outputs as keys of paths.
+#a stage depends on the last previous stage that outputs one of its inputs.
+#'code' lists extra modules (besides the script, util and config) it uses.
+pipeline_stages = [
+    {
+        'name': 'pre_proc_papers_metadata',
+        'inputs': ['raw-papers-metadata'],
+        'outputs': ['papers-metadata', 'papers-metadata-table'],
+        'code': ['metas_table.py'],
+    },
+    {
+        'name': 'download_missing_paper_pdfs',
+        'inputs': ['papers-metadata', 'papers-metadata-table'],
+        'outputs': ['papers-metadata', 'papers-metadata-table', 'pdfs-dir'],
+        'code': ['metas_table.py'],
+    },
+    {
+        'name': 'extract_raw_refs_from_pdfs',
+        'inputs': [
+            'papers-metadata-table',
+            'exported-metadata-dir',
+            'pdfs-dir',
+        ],
+        'outputs': ['raw-papers-refs'],
+        'code': ['extractrefs.py', 'extractrefs_pool.py', 'metas_table.py'],
+    },
+    {
+        'name': 'parse_raw_refs',
+        'inputs': ['raw-papers-refs'],
+        'outputs': ['papers-refs'],
+        'code': ['refparser.py', 'refs_cache.py', 'freecite_client.py'],
+    },
+    {
+        'name': 'mk_citation_graphs',
+        'inputs': ['papers-metadata-table', 'papers-refs'],
+        'outputs': [
+            'titles-refs-graph',
+            'titles-refs-rev-graph',
+            'authors-refs-graph',
+            'authors-refs-rev-graph',
+            'titles-refs-graph-csr',
+            'titles-refs-rev-graph-csr',
+            'authors-refs-graph-csr',
+            'authors-refs-rev-graph-csr',
+            'titles-refs-hist',
+            'authors-refs-hist',
+            'citation-graphs-state',
+        ],
+        'code': ['csr_graph.py', 'metas_table.py', 'title_index.py'],
+    },
+    {
+        'name': 'mk_similarity_graphs',
+        'inputs': ['papers-refs'],
+        'outputs': ['cocitation-graph-csr', 'coupling-graph-csr'],
+        'code': ['csr_graph.py'],
+    },
+    {
+        'name': 'mk_doc_term_matrices',
+        'inputs': ['papers-metadata-table'],
+        'outputs': [
+            'abstract-dtm',
+            'abstract-tfidf',
+            'title-dtm',
+            'title-tfidf',
+        ],
+        'code': ['dtm.py', 'metas_table.py'],
+    },
+    {
+        'name': 'mk_histograms',
+        'inputs': [
+            'papers-metadata-table',
+            'abstract-dtm',
+            'title-dtm',
+            'titles-refs-rev-graph-csr',
+            'authors-refs-rev-graph-csr',
+        ],
+        'outputs': [
+            'title-word-freqs-hist',
+            'abstract-word-freqs-hist',
+            'titles-refs-hist',
+            'authors-refs-hist',
+        ],
+        'code': [
+            'csr_graph.py',
+            'metas_table.py',
+            'topk_counter.py',
+            'dtm.py',
+        ],
+    },
+    {
+        'name': 'mk_graph_ranks',
+        'inputs': ['titles-refs-graph-csr', 'authors-refs-graph-csr'],
+        'outputs': [
+            'titles-pagerank-hist',
+            'titles-hubs-hist',
+            'titles-authorities-hist',
+            'authors-pagerank-hist',
+            'authors-hubs-hist',
+            'authors-authorities-hist',
+            'titles-ranks',
+            'authors-ranks',
+        ],
+        'code': ['csr_graph.py'],
+    },
+    {
+        'name': 'mk_graph_clusters',
+        'inputs': ['titles-refs-graph-csr', 'authors-refs-graph-csr'],
+        'outputs': [
+            'titles-clusters',
+            'titles-clusters-summaries',
+            'authors-clusters',
+            'authors-clusters-summaries',
+        ],
+        'code': ['csr_graph.py'],
+    },
+    {
+        'name': 'plot_histograms',
+        'inputs': [
+            'title-word-freqs-hist',
+            'abstract-word-freqs-hist',
+            'titles-refs-hist',
+            'authors-refs-hist',
+            'titles-pagerank-hist',
+            'authors-pagerank-hist',
+        ],
+        'outputs': [
+            'title-word-freqs-hist-plot',
+            'abstract-word-freqs-hist-plot',
+            'titles-refs-hist-plot',
+            'authors-refs-hist-plot',
+            'titles-pagerank-hist-plot',
+            'authors-pagerank-hist-plot',
+        ],
+        'code': [],
+    },
+    {
+        'name': 'plot_graphs',
+        'inputs': [
+            'titles-refs-graph-csr',
+            'titles-refs-hist',
+            'titles-pagerank-hist',
+            'authors-refs-graph-csr',
+            'authors-refs-hist',
+            'authors-pagerank-hist',
+            'titles-ranks',
+            'authors-ranks',
+            'titles-clusters',
+            'authors-clusters',
+        ],
+        'outputs': [
+            'titles-graph-plot',
+            'authors-graph-plot',
+        ],
+        'code': ['csr_graph.py', 'mk_graph_clusters.py'],
+    },
+]
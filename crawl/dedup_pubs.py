@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+
+
+'''
+Finds near-duplicate publications across sources (produced by mk_jsons.py)
+and saves a table with one canonical record per publication.
+Publications are compared by the Jaccard similarity of their shingles
+(title char n-grams and authors last names), estimated with MinHash
+signatures. Candidate duplicates are found with LSH (signatures split in
+bands, publications sharing a band being candidates), avoiding all-pairs
+comparison. Duplicates are clustered with union-find.
+Publications are streamed in chunks: only uids, ranks and signatures of
+all publications are kept in memory, canonical records being reloaded
+to save the table.
+'''
+
+
+import re
+import os
+import glob
+import zlib
+import numpy as np
+import pandas as pd
+from multiprocessing.pool import ThreadPool
+
+from mk_pubs_table import COLUMNS, get_pub_row, load_json
+
+
+SRC_DIR_PATH = './pubs/jsons'
+#deduplicated table, same format as mk_pubs_table.py output
+DST_PATH = './pubs/pubs_dedup.csv'
+#mapping of uid to canonical uid of its cluster
+DUPS_DST_PATH = './pubs/pubs_dups.csv'
+N_WORKERS = 8
+#size of title char n-grams
+SHINGLE_SIZE = 5
+#minhash signature size = N_BANDS*N_ROWS.
+#probability of being candidates is 1 - (1 - sim**N_ROWS)**N_BANDS
+N_BANDS = 16
+N_ROWS = 4
+#minimum estimated similarity for candidates to be duplicates
+SIM_THRESHOLD = 0.7
+#number of publications loaded/hashed at a time
+CHUNK_SIZE = 100000
+#sources preferred for canonical records, in order
+PREFERRED_SOURCES = [
+    'arxiv',
+    'dblp',
+    'msai',
+    'deepmind',
+    'googleai',
+    'fbai',
+    'amazon',
+]
+#mersenne prime for universal hashing
+_PRIME = (1 << 31) - 1
+_NON_ALNUM_REGEX = re.compile(r'[^a-z0-9]+')
+
+
+def get_author_last_name(author):
+    author = author.strip().lower()
+    if ',' in author:
+        return _NON_ALNUM_REGEX.sub('', author.split(',')[0])
+    tokens = _NON_ALNUM_REGEX.sub(' ', author).split()
+    return tokens[-1] if tokens else ''
+
+
+def get_shingles(pub, size=SHINGLE_SIZE):
+    title = _NON_ALNUM_REGEX.sub(' ', (pub['title'] or '').lower())
+    title = ' '.join(title.split())
+    shingles = {'t:' + title[i:i+size]
+        for i in range(max(len(title) - size + 1, 0))}
+    shingles |= {'a:' + n
+        for n in map(get_author_last_name, pub['authors'] or []) if n}
+    return shingles
+
+
+def get_shingles_hashes(shingles):
+    return np.array(
+        [zlib.crc32(s.encode()) for s in shingles], dtype=np.uint64)
+
+
+def get_hash_params(n_hashes, seed=0):
+    rng = np.random.RandomState(seed)
+    a = rng.randint(1, _PRIME, size=n_hashes).astype(np.uint64)
+    b = rng.randint(0, _PRIME, size=n_hashes).astype(np.uint64)
+    return a, b
+
+
+def get_signatures(shingles_sets, hash_params):
+    '''
+    Computes minhash signatures of all sets at once: each hash function is
+    applied to all shingles concatenated, minimums taken per set.
+    Assumes no set is empty.
+    '''
+    hashes = [get_shingles_hashes(s) for s in shingles_sets]
+    lengths = np.array([len(h) for h in hashes])
+    offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    hashes = np.concatenate(hashes) % _PRIME
+    a, b = hash_params
+    sigs = np.empty((len(shingles_sets), len(a)), dtype=np.uint32)
+    for i in range(len(a)):
+        sigs[:, i] = np.minimum.reduceat(
+            (a[i]*hashes + b[i]) % _PRIME, offsets)
+    return sigs
+
+
+class UnionFind:
+    def __init__(self, n):
+        self.parents = list(range(n))
+
+
+    def find(self, i):
+        root = i
+        while self.parents[root] != root:
+            root = self.parents[root]
+        while self.parents[i] != root:
+            self.parents[i], i = root, self.parents[i]
+        return root
+
+
+    def union(self, i, j):
+        root_i, root_j = self.find(i), self.find(j)
+        if root_i != root_j:
+            self.parents[max(root_i, root_j)] = min(root_i, root_j)
+
+
+def get_bands_keys(sigs, band, n_rows):
+    '''
+    Hashes rows of band of signatures to single integers.
+    Colliding keys only add candidates, which are verified.
+    '''
+    keys = np.zeros(len(sigs), dtype=np.uint64)
+    for col in range(band*n_rows, (band + 1)*n_rows):
+        keys = keys*np.uint64(1000003) ^ sigs[:, col].astype(np.uint64)
+    return keys
+
+
+def get_clusters(sigs, n_bands=N_BANDS, n_rows=N_ROWS,
+        sim_threshold=SIM_THRESHOLD):
+    '''
+    Returns clusters label for each signature.
+    In each LSH bucket, members are compared only to the bucket's first
+    member, so the number of comparisons is linear.
+    '''
+    uf = UnionFind(len(sigs))
+    for band in range(n_bands):
+        keys = get_bands_keys(sigs, band, n_rows)
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        starts = np.flatnonzero(
+            np.concatenate([[True], keys[1:] != keys[:-1]]))
+        ends = np.append(starts[1:], len(keys))
+        for start, end in zip(starts, ends):
+            if end - start < 2:
+                continue
+            first = order[start]
+            others = order[start+1:end]
+            sims = (sigs[others] == sigs[first]).mean(axis=1)
+            for i in others[sims >= sim_threshold]:
+                uf.union(first, i)
+    return np.array([uf.find(i) for i in range(len(sigs))], dtype=np.int64)
+
+
+def get_pub_rank(pub):
+    '''
+    Canonical record of a cluster is the one with the lowest rank.
+    '''
+    n_missing = sum(not pub.get(k) for k in ['title', 'authors', 'year',
+        'abstract', 'url'])
+    source = pub.get('source')
+    source_rank = PREFERRED_SOURCES.index(source) \
+        if source in PREFERRED_SOURCES else len(PREFERRED_SOURCES)
+    return (n_missing, source_rank, str(pub['uid']))
+
+
+def get_chunks(iterable, chunk_size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def get_chunk_keys(pubs, hash_params):
+    '''
+    Returns uids, ranks and signatures of pubs, with ids (in pubs) of the
+    signatures: pubs without title/authors can't be compared.
+    '''
+    shingles_sets = [get_shingles(p) for p in pubs]
+    ids = [i for i, s in enumerate(shingles_sets) if s]
+    sigs = get_signatures([shingles_sets[i] for i in ids], hash_params) \
+        if ids else np.empty((0, len(hash_params[0])), dtype=np.uint32)
+    return [p['uid'] for p in pubs], [get_pub_rank(p) for p in pubs], \
+        ids, sigs
+
+
+def dedup_pubs(pubs, chunk_size=CHUNK_SIZE):
+    '''
+    Reads pubs (any iterable) chunk_size at a time, keeping only their
+    uids, ranks and signatures.
+    Returns sorted ids (positions in pubs) of canonical pubs and dict
+    mapping each uid to its canonical uid.
+    '''
+    hash_params = get_hash_params(N_BANDS*N_ROWS)
+    uids = []
+    ranks = []
+    ids = []
+    sigs = [np.empty((0, N_BANDS*N_ROWS), dtype=np.uint32)]
+    for chunk in get_chunks(pubs, chunk_size):
+        uids_, ranks_, ids_, sigs_ = get_chunk_keys(chunk, hash_params)
+        ids.extend(len(uids) + i for i in ids_)
+        uids.extend(uids_)
+        ranks.extend(ranks_)
+        sigs.append(sigs_)
+    sigs = np.concatenate(sigs)
+    labels = np.arange(len(uids))
+    labels[ids] = np.array(ids, dtype=np.int64)[get_clusters(sigs)]
+    #canonical pub of each cluster: the one with lowest rank
+    canon_ids = {}
+    for i, label in enumerate(labels.tolist()):
+        if label not in canon_ids or ranks[i] < ranks[canon_ids[label]]:
+            canon_ids[label] = i
+    canon_uids = {uid: uids[canon_ids[label]]
+        for uid, label in zip(uids, labels.tolist())}
+    return sorted(canon_ids.values()), canon_uids
+
+
+def iter_pubs(paths, pool, chunk_size=CHUNK_SIZE):
+    '''
+    Loads pubs from json files chunk_size at a time.
+    '''
+    for chunk in get_chunks(paths, chunk_size):
+        yield from pool.map(load_json, chunk)
+
+
+def main():
+    paths = glob.glob(os.path.join(SRC_DIR_PATH, '*.json'))
+    pool = ThreadPool(N_WORKERS)
+    canon_ids, canon_uids = dedup_pubs(iter_pubs(paths, pool))
+    print('{} pubs after deduplication ({} duplicates)'.format(
+        len(canon_ids), len(paths) - len(canon_ids)))
+
+    #reloading only canonical pubs, writing table a chunk at a time
+    pd.DataFrame(columns=COLUMNS).to_csv(DST_PATH, index=False)
+    for chunk in get_chunks(canon_ids, CHUNK_SIZE):
+        rows = [get_pub_row(p)
+            for p in pool.map(load_json, [paths[i] for i in chunk])]
+        pd.DataFrame(rows, columns=COLUMNS).to_csv(
+            DST_PATH, mode='a', header=False, index=False)
+    print('saved to', DST_PATH)
+    df = pd.DataFrame(sorted(canon_uids.items()),
+        columns=['uid', 'canonical-uid'])
+    df.to_csv(DUPS_DST_PATH, index=False)
+    print('saved to', DUPS_DST_PATH)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,7 @@
 
 
 import pubmd
+import pubs_index
 import json
 import glob
 import bibtexparser as bt
@@ -20,6 +21,8 @@ SOURCES = [
 ]
 BIBTEXES_PATHS = {k: './bibtexes/{}.bib'.format(k) for k in SOURCES}
 DST_DIR_PATH = './pubs/jsons'
+#update search index (pubs_index.py) with new/modified jsons
+UPDATE_INDEX = True
 
 
 def load_bibtex(path):
@@ -99,6 +102,9 @@ def main():
     get_metadata_and_save(load_arxiv_data(), pubmd.ArxivMetadata)
     get_metadata_and_save(load_bibtex_data(), pubmd.BibtexMetadata)
 
+    if UPDATE_INDEX:
+        pubs_index.update_index(DST_DIR_PATH)
+
 
 if __name__ == '__main__':
     main()
@@ -27,14 +27,18 @@ def load_json(path):
     return data
 
 
-def get_row(path):
-    row = load_json(path)
+def get_pub_row(pub):
+    row = dict(pub)
     row['authors'] = ';'.join(row['authors'])
     for k, v in row.items():
         row[k] = str(v).replace(',', ';').replace('\n', ' ').strip()
     return row
 
 
+def get_row(path):
+    return get_pub_row(load_json(path))
+
+
 def main():
     paths = glob.glob(os.path.join(SRC_DIR_PATH, '*.json'))
     pool = ThreadPool(N_WORKERS)
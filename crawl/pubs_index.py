@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+
+
+'''
+On-disk inverted index over crawled pubs (produced by mk_jsons.py), for
+searching titles, abstracts and authors with BM25 ranking.
+Postings (term, field, pub) keep term frequency and positions, so that
+quoted phrases in queries are matched exactly. Backed by sqlite, with
+postings clustered by term so that each query term is a single lookup,
+and with the document frequency of each term, so that idf is computed
+over the whole index (also when filtering) without reading postings.
+Query terms are matched rarest first: once no unseen pub can make it to
+the top k, only postings of pubs already seen are looked up.
+The index is updated incrementally: only new/modified json files are
+(re)indexed, deleted ones are removed.
+
+Usage:
+    pubs_index.py update [--src-dir DIR]
+    pubs_index.py search <query> [-k N] [--year Y] [--min-year Y]
+        [--max-year Y] [--source S]
+    e.g. pubs_index.py search '"neural machine translation" attention'
+'''
+
+
+import re
+import os
+import glob
+import json
+import math
+import time
+import sqlite3
+import heapq
+import argparse
+from array import array
+from collections import defaultdict, Counter
+
+
+SRC_DIR_PATH = './pubs/jsons'
+INDEX_PATH = './pubs/pubs-index.sqlite'
+#indexed fields and their weights in score
+FIELDS = ['title', 'abstract', 'authors']
+FIELDS_WEIGHTS = [3.0, 1.0, 2.0]
+#bm25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+#number of pubs indexed per transaction
+BATCH_SIZE = 5000
+#sqlite page cache size
+CACHE_SIZE_KB = 1 << 18
+#maximum number of pub ids per query, below sqlite's limit of variables
+MAX_N_QUERY_IDS = 500
+_WORD_REGEX = re.compile(r'\w+')
+_PHRASE_REGEX = re.compile(r'"([^"]*)"')
+
+
+def tokenize(text):
+    return _WORD_REGEX.findall((text or '').lower())
+
+
+def get_fields_tokens(pub):
+    return [
+        tokenize(pub.get('title')),
+        tokenize(pub.get('abstract')),
+        tokenize(' '.join(pub.get('authors') or [])),
+    ]
+
+
+def get_postings(tokens):
+    '''
+    Returns dict term: positions of term in tokens.
+    '''
+    postings = defaultdict(list)
+    for i, tok in enumerate(tokens):
+        postings[tok].append(i)
+    return postings
+
+
+def parse_query(query):
+    '''
+    Returns list of phrases (lists of terms). Unquoted terms are phrases
+    of one term.
+    '''
+    phrases = [tokenize(p) for p in _PHRASE_REGEX.findall(query)]
+    phrases = [p for p in phrases if p]
+    phrases.extend([t] for t in tokenize(_PHRASE_REGEX.sub(' ', query)))
+    return phrases
+
+
+def get_idf(n_pubs, n_docs):
+    return math.log(1 + (n_pubs - n_docs + 0.5)/(n_docs + 0.5))
+
+
+def get_year(pub):
+    try:
+        return int(pub.get('year'))
+    except (TypeError, ValueError):
+        return None
+
+
+class PubsIndex:
+    def __init__(self, path=INDEX_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('PRAGMA cache_size=-{}'.format(CACHE_SIZE_KB))
+        has_terms = self.conn.execute(
+            'SELECT 1 FROM sqlite_master WHERE name = \'terms\'').fetchone()
+        with self.conn:
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS pubs ('
+                'id INTEGER PRIMARY KEY, path TEXT UNIQUE, mtime REAL, '
+                'uid TEXT, title TEXT, year INTEGER, source TEXT, {})'.format(
+                    ', '.join('len_{} INTEGER'.format(f) for f in FIELDS)))
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS postings ('
+                'term TEXT, field INTEGER, pub_id INTEGER, tf INTEGER, '
+                'positions BLOB, PRIMARY KEY (term, field, pub_id)) '
+                'WITHOUT ROWID')
+            self.conn.execute(
+                'CREATE INDEX IF NOT EXISTS postings_pub_id '
+                'ON postings (pub_id)')
+            #number of pubs with each term, in any field
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS terms ('
+                'term TEXT PRIMARY KEY, df INTEGER) WITHOUT ROWID')
+            #indexes made before terms were kept
+            if not has_terms:
+                self.conn.execute(
+                    'INSERT INTO terms (term, df) SELECT term, '
+                    'COUNT(DISTINCT pub_id) FROM postings GROUP BY term')
+        self._stats = None
+
+
+    def _add_pub(self, path, mtime, pub):
+        '''
+        Returns postings rows of pub, to be inserted with _add_postings.
+        '''
+        fields_tokens = get_fields_tokens(pub)
+        cursor = self.conn.execute(
+            'INSERT INTO pubs (path, mtime, uid, title, year, source, {}) '
+            'VALUES (?, ?, ?, ?, ?, ?, {})'.format(
+                ', '.join('len_{}'.format(f) for f in FIELDS),
+                ', '.join('?'*len(FIELDS))),
+            [path, mtime, pub.get('uid'), pub.get('title'), get_year(pub),
+                pub.get('source')] + [len(t) for t in fields_tokens])
+        pub_id = cursor.lastrowid
+        rows = []
+        for field, tokens in enumerate(fields_tokens):
+            for term, positions in get_postings(tokens).items():
+                rows.append((term, field, pub_id, len(positions),
+                    array('I', positions).tobytes()))
+        return rows
+
+
+    def _add_postings(self, rows):
+        #inserting in primary key order is much faster
+        rows.sort(key=lambda r: r[:3])
+        self.conn.executemany(
+            'INSERT INTO postings (term, field, pub_id, tf, positions) '
+            'VALUES (?, ?, ?, ?, ?)', rows)
+        dfs = Counter(term for term, __ in {(r[0], r[2]) for r in rows})
+        self.conn.executemany(
+            'INSERT INTO terms (term, df) VALUES (?, ?) '
+            'ON CONFLICT (term) DO UPDATE SET df = df + excluded.df',
+            dfs.items())
+
+
+    def _remove_pub(self, pub_id):
+        terms = [(t,) for t, in self.conn.execute(
+            'SELECT DISTINCT term FROM postings WHERE pub_id = ?', [pub_id])]
+        self.conn.executemany(
+            'UPDATE terms SET df = df - 1 WHERE term = ?', terms)
+        self.conn.executemany(
+            'DELETE FROM terms WHERE term = ? AND df = 0', terms)
+        self.conn.execute('DELETE FROM postings WHERE pub_id = ?', [pub_id])
+        self.conn.execute('DELETE FROM pubs WHERE id = ?', [pub_id])
+
+
+    def update(self, src_dir=SRC_DIR_PATH, batch_size=BATCH_SIZE):
+        '''
+        Indexes new/modified json files in src_dir and removes deleted ones.
+        Returns number of pubs (re)indexed and removed.
+        '''
+        #not removing all pubs because of a wrong dir
+        if not os.path.isdir(src_dir):
+            raise FileNotFoundError('no dir "{}"'.format(src_dir))
+        indexed = {p: (i, m) for i, p, m in self.conn.execute(
+            'SELECT id, path, mtime FROM pubs')}
+        paths = glob.glob(os.path.join(src_dir, '*.json'))
+        to_index = []
+        for path in paths:
+            mtime = os.path.getmtime(path)
+            if path not in indexed or indexed[path][1] != mtime:
+                to_index.append((path, mtime))
+        to_remove = set(indexed.keys()) - set(paths)
+        to_remove |= {p for p, __ in to_index if p in indexed}
+        with self.conn:
+            for path in to_remove:
+                self._remove_pub(indexed[path][0])
+        for i in range(0, len(to_index), batch_size):
+            with self.conn:
+                rows = []
+                for path, mtime in to_index[i:i+batch_size]:
+                    with open(path) as f:
+                        pub = json.load(f)
+                    rows.extend(self._add_pub(path, mtime, pub))
+                self._add_postings(rows)
+        self._stats = None
+        n_removed = len(to_remove - {p for p, __ in to_index})
+        return len(to_index), n_removed
+
+
+    @property
+    def stats(self):
+        '''
+        Number of pubs and average length of each field.
+        '''
+        if self._stats is None:
+            row = self.conn.execute('SELECT COUNT(*), {} FROM pubs'.format(
+                ', '.join('AVG(len_{})'.format(f) for f in FIELDS))).fetchone()
+            self._stats = (row[0], [max(v or 0, 1) for v in row[1:]])
+        return self._stats
+
+
+    def _get_filter(self, year=None, min_year=None, max_year=None,
+            source=None):
+        conds = []
+        args = []
+        for cond, arg in [
+                ('pubs.year = ?', year),
+                ('pubs.year >= ?', min_year),
+                ('pubs.year <= ?', max_year),
+                ('pubs.source = ?', source)]:
+            if arg is not None:
+                conds.append(cond)
+                args.append(arg)
+        return ''.join(' AND ' + c for c in conds), args
+
+
+    def get_dfs(self, terms):
+        '''
+        Returns dict term: number of pubs with term, for terms in index.
+        '''
+        terms = list(set(terms))
+        dfs = {}
+        for i in range(0, len(terms), MAX_N_QUERY_IDS):
+            chunk = terms[i:i+MAX_N_QUERY_IDS]
+            dfs.update(self.conn.execute(
+                'SELECT term, df FROM terms WHERE term IN ({})'.format(
+                    ','.join('?'*len(chunk))), chunk))
+        return dfs
+
+
+    def _get_postings(self, term, filter_, pub_ids=None):
+        '''
+        Returns list of (pub_id, field, tf, positions, field length).
+        If pub_ids given, only postings of these pubs are looked up.
+        '''
+        conds, args = filter_
+        lens = 'CASE postings.field {} END'.format(' '.join(
+            'WHEN {} THEN pubs.len_{}'.format(i, f)
+            for i, f in enumerate(FIELDS)))
+        query = 'SELECT postings.pub_id, postings.field, postings.tf, ' \
+            'postings.positions, {} FROM postings ' \
+            'JOIN pubs ON pubs.id = postings.pub_id ' \
+            'WHERE postings.term = ?{}'.format(lens, conds)
+        if pub_ids is None:
+            return self.conn.execute(query, [term] + args).fetchall()
+        #field listed so that (term, field, pub_id) keys are looked up
+        query += ' AND postings.field IN ({})'.format(
+            ','.join(str(i) for i in range(len(FIELDS))))
+        postings = []
+        for i in range(0, len(pub_ids), MAX_N_QUERY_IDS):
+            chunk = pub_ids[i:i+MAX_N_QUERY_IDS]
+            postings.extend(self.conn.execute(
+                query + ' AND postings.pub_id IN ({})'.format(
+                    ','.join('?'*len(chunk))), [term] + args + chunk))
+        return postings
+
+
+    def _filter_pub_ids(self, pub_ids, filter_):
+        conds, args = filter_
+        if not conds:
+            return set(pub_ids)
+        pub_ids = list(pub_ids)
+        kept = set()
+        for i in range(0, len(pub_ids), MAX_N_QUERY_IDS):
+            chunk = pub_ids[i:i+MAX_N_QUERY_IDS]
+            kept.update(pub_id for pub_id, in self.conn.execute(
+                'SELECT id FROM pubs WHERE id IN ({}){}'.format(
+                    ','.join('?'*len(chunk)), conds), chunk + args))
+        return kept
+
+
+    def _get_phrase_postings(self, phrase, filter_):
+        '''
+        Same as _get_postings, with tf of phrase: pubs/fields where terms
+        occur in consecutive positions.
+        '''
+        postings = None
+        for offset, term in enumerate(phrase):
+            term_postings = {}
+            for pub_id, field, __, positions, len_ in \
+                    self._get_postings(term, filter_):
+                key = (pub_id, field)
+                if postings is not None and key not in postings:
+                    continue
+                positions = {p - offset for p in array('I', positions)}
+                if postings is not None:
+                    positions &= postings[key][0]
+                if positions:
+                    term_postings[key] = (positions, len_)
+            postings = term_postings
+            if not postings:
+                break
+        return [(pub_id, field, len(positions), None, len_)
+            for (pub_id, field), (positions, len_) in postings.items()]
+
+
+    def search(self, query, k=10, **filters):
+        '''
+        Returns list of up to k (score, pub) for the best matching pubs.
+        Filters: year, min_year, max_year, source. Only matching pubs are
+        ranked, with idf computed over the whole index.
+        '''
+        n_pubs, avg_lens = self.stats
+        filter_ = self._get_filter(**filters)
+        scores = defaultdict(float)
+        def add_scores(postings, idf):
+            for pub_id, field, tf, __, len_ in postings:
+                norm = 1 - BM25_B + BM25_B*len_/avg_lens[field]
+                scores[pub_id] += FIELDS_WEIGHTS[field]*idf \
+                    *tf*(BM25_K1 + 1)/(tf + BM25_K1*norm)
+        phrases = parse_query(query)
+        #phrases have no stored df: matched in full, then filtered
+        for phrase in phrases:
+            if len(phrase) > 1:
+                postings = self._get_phrase_postings(phrase, ('', []))
+                pub_ids = self._filter_pub_ids({p[0] for p in postings},
+                    filter_)
+                n_docs = len({p[0] for p in postings})
+                add_scores([p for p in postings if p[0] in pub_ids],
+                    get_idf(n_pubs, n_docs))
+        dfs = self.get_dfs(p[0] for p in phrases if len(p) == 1)
+        terms = sorted((dfs[p[0]], p[0]) for p in phrases
+            if len(p) == 1 and p[0] in dfs)
+        #score of a term in a pub is below idf*(k1 + 1)*sum of weights
+        max_scores = [get_idf(n_pubs, df)*(BM25_K1 + 1)*sum(FIELDS_WEIGHTS)
+            for df, __ in terms]
+        for i, (df, term) in enumerate(terms):
+            #pubs not seen yet can't beat the k-th best score
+            seen_only = 0 < k <= len(scores) and \
+                heapq.nlargest(k, scores.values())[-1] > sum(max_scores[i:])
+            #looking up fewer pubs than the term has
+            if seen_only and len(scores) < df:
+                postings = self._get_postings(term, filter_, list(scores))
+            else:
+                postings = self._get_postings(term, filter_)
+                if seen_only:
+                    postings = [p for p in postings if p[0] in scores]
+            add_scores(postings, get_idf(n_pubs, df))
+        best = sorted(scores.items(), key=lambda kv: (-kv[1], kv[0]))[:k]
+        pubs = self.get_pubs([pub_id for pub_id, __ in best])
+        return [(score, pubs[pub_id]) for pub_id, score in best]
+
+
+    def get_pubs(self, pub_ids):
+        pub_ids = list(pub_ids)
+        query = 'SELECT id, uid, title, year, source, path FROM pubs ' \
+            'WHERE id IN ({})'.format(','.join('?'*len(pub_ids)))
+        keys = ['uid', 'title', 'year', 'source', 'path']
+        return {row[0]: dict(zip(keys, row[1:]))
+            for row in self.conn.execute(query, pub_ids)}
+
+
+    def close(self):
+        self.conn.close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def update_index(src_dir=SRC_DIR_PATH, index_path=INDEX_PATH):
+    start = time.time()
+    with PubsIndex(index_path) as index:
+        n_indexed, n_removed = index.update(src_dir)
+        n_pubs, __ = index.stats
+    print('indexed {} pubs, removed {} pubs in {:.2f}s ({} pubs in '
+        'index "{}")'.format(n_indexed, n_removed, time.time() - start,
+        n_pubs, index_path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('cmd', choices=['update', 'search'])
+    parser.add_argument('query', nargs='?', default='')
+    parser.add_argument('-k', type=int, default=10,
+        help='number of results')
+    parser.add_argument('--year', type=int)
+    parser.add_argument('--min-year', type=int)
+    parser.add_argument('--max-year', type=int)
+    parser.add_argument('--source')
+    parser.add_argument('--index-path', default=INDEX_PATH)
+    parser.add_argument('--src-dir', default=SRC_DIR_PATH)
+    args = parser.parse_args()
+
+    if args.cmd == 'update':
+        update_index(args.src_dir, args.index_path)
+        return
+
+    with PubsIndex(args.index_path) as index:
+        start = time.time()
+        results = index.search(args.query, args.k, year=args.year,
+            min_year=args.min_year, max_year=args.max_year,
+            source=args.source)
+        elapsed = time.time() - start
+    for i, (score, pub) in enumerate(results):
+        print('#{} [{:.3f}] {} ({}, {}, {})'.format(i+1, score, pub['title'],
+            pub['year'], pub['source'], pub['uid']))
+    print('{} results in {:.1f}ms'.format(len(results), 1000*elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+
+
+'''
+Compact graph representation in CSR (compressed sparse row) format.
+Nodes are integers indexing a node names table. Neighbors of node i are
+indices[indptr[i]:indptr[i+1]] (int32 arrays), sorted.
+Graphs can optionally have edge weights (e.g. number of citations),
+aligned with indices.
+Graphs are saved as .npz files and convert to/from the {node: {nodes}}
+dicts that util.load_graph/util.save_graph use. Conversion to dicts is
+lossless except for weights, which dicts have no place for.
+
+Usage: csr_graph.py <src_path> <dst_path>
+    Converts a graph from .json to .npz or vice-versa.
+'''
+
+
+import sys
+import numpy as np
+
+import util
+
+
+def _get_index_dtype(n):
+    return np.int32 if n < np.iinfo(np.int32).max else np.int64
+
+
+class CSRGraph:
+    @classmethod
+    def from_dict(cls, graph):
+        '''
+        Nodes that are only in adjacency sets get ids after all keys,
+        so that to_dict gives back the same keys.
+        '''
+        keys = sorted(graph.keys())
+        extra_nodes = sorted(set(util.flatten(graph.values())) - set(keys))
+        nodes = keys + extra_nodes
+        node_ids = {n: i for i, n in enumerate(nodes)}
+        degrees = [len(graph[k]) for k in keys] + [0]*len(extra_nodes)
+        n_edges = sum(degrees)
+        index_dtype = _get_index_dtype(max(n_edges, len(nodes)))
+        indptr = np.zeros(len(nodes) + 1, dtype=index_dtype)
+        np.cumsum(degrees, out=indptr[1:])
+        indices = np.fromiter(
+            util.flatten(sorted(node_ids[v] for v in graph[k]) for k in keys),
+            dtype=index_dtype, count=n_edges)
+        return cls(nodes, indptr, indices, n_keys=len(keys))
+
+
+    @classmethod
+    def from_edges(cls, nodes, src, dst, n_keys=None, weights=None):
+        '''
+        Builds graph from arrays of edges (src[i], dst[i]) of node ids.
+        Weights of repeated edges are summed.
+        '''
+        n_nodes = len(nodes)
+        index_dtype = _get_index_dtype(max(len(src), n_nodes))
+        src = np.asarray(src, dtype=np.int64)
+        dst = np.asarray(dst, dtype=np.int64)
+        #sorting by source then by destination, removing repeated edges
+        order = np.lexsort((dst, src))
+        src, dst = src[order], dst[order]
+        if weights is not None:
+            weights = np.asarray(weights)[order]
+        if len(src) > 0:
+            uniq = np.ones(len(src), dtype=bool)
+            uniq[1:] = (src[1:] != src[:-1]) | (dst[1:] != dst[:-1])
+            if weights is not None:
+                weights = np.add.reduceat(weights, np.flatnonzero(uniq))
+            src, dst = src[uniq], dst[uniq]
+        indptr = np.zeros(n_nodes + 1, dtype=index_dtype)
+        np.cumsum(np.bincount(src, minlength=n_nodes), out=indptr[1:])
+        return cls(nodes, indptr, dst.astype(index_dtype), n_keys=n_keys,
+            weights=weights)
+
+
+    @classmethod
+    def from_scipy(cls, nodes, matrix, n_keys=None):
+        '''
+        Builds graph from square sparse matrix, entries becoming weights.
+        '''
+        matrix = matrix.tocsr()
+        matrix.eliminate_zeros()
+        matrix.sort_indices()
+        index_dtype = _get_index_dtype(max(matrix.nnz, len(nodes)))
+        return cls(nodes, matrix.indptr.astype(index_dtype),
+            matrix.indices.astype(index_dtype), n_keys=n_keys,
+            weights=matrix.data)
+
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            n_nodes = int(data['n_nodes'])
+            names = data['names'].tobytes().decode('utf-8')
+            nodes = names.split('\n') if n_nodes > 0 else []
+            weights = data['weights'] if 'weights' in data.files else None
+            return cls(nodes, data['indptr'], data['indices'],
+                n_keys=int(data['n_keys']), weights=weights)
+
+
+    def __init__(self, nodes, indptr, indices, n_keys=None, weights=None):
+        '''
+        Nodes with ids >= n_keys only exist as neighbors of other nodes.
+        '''
+        self.nodes = list(nodes)
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self.n_keys = len(self.nodes) if n_keys is None else n_keys
+        self._node_ids = None
+        assert len(self.indptr) == len(self.nodes) + 1
+        assert weights is None or len(weights) == len(indices)
+
+
+    def __len__(self):
+        return len(self.nodes)
+
+
+    @property
+    def n_edges(self):
+        return len(self.indices)
+
+
+    @property
+    def node_ids(self):
+        if self._node_ids is None:
+            self._node_ids = {n: i for i, n in enumerate(self.nodes)}
+        return self._node_ids
+
+
+    def neighbors(self, node_id):
+        return self.indices[self.indptr[node_id]:self.indptr[node_id+1]]
+
+
+    def out_degrees(self):
+        return np.diff(self.indptr)
+
+
+    def in_degrees(self):
+        return np.bincount(self.indices, minlength=len(self.nodes))
+
+
+    def out_weights(self):
+        '''
+        Sums of weights of out edges (out degrees if graph is unweighted).
+        '''
+        if self.weights is None:
+            return self.out_degrees()
+        src, __ = self.get_edges()
+        return np.bincount(src, weights=self.weights,
+            minlength=len(self.nodes)).astype(self.weights.dtype)
+
+
+    def get_edges(self):
+        '''
+        Returns arrays src, dst with edges (src[i], dst[i]).
+        '''
+        src = np.repeat(
+            np.arange(len(self.nodes), dtype=self.indices.dtype),
+            self.out_degrees())
+        return src, self.indices
+
+
+    def reverse(self):
+        '''
+        Reversed graph over the same node ids, in O(V+E).
+        Like util.get_rev_graph, only edges between keys are kept.
+        '''
+        src, dst = self.get_edges()
+        mask = (src < self.n_keys) & (dst < self.n_keys)
+        weights = None if self.weights is None else self.weights[mask]
+        return CSRGraph.from_edges(
+            self.nodes, dst[mask], src[mask], n_keys=self.n_keys,
+            weights=weights)
+
+
+    def subgraph(self, node_ids):
+        '''
+        Subgraph induced by node_ids, with new ids in the given order
+        (all nodes being keys). Only the neighbors slices of the given
+        nodes are read.
+        '''
+        node_ids = np.asarray(node_ids, dtype=np.int64)
+        new_ids = np.full(len(self.nodes), -1, dtype=np.int64)
+        new_ids[node_ids] = np.arange(len(node_ids))
+        starts = self.indptr[node_ids].astype(np.int64)
+        lengths = self.indptr[node_ids + 1] - starts
+        #positions in indices of all neighbors slices, concatenated
+        offsets = np.cumsum(lengths) - lengths
+        pos = np.arange(lengths.sum()) + np.repeat(starts - offsets, lengths)
+        src = np.repeat(np.arange(len(node_ids)), lengths)
+        dst = new_ids[self.indices[pos]]
+        mask = dst >= 0
+        weights = None if self.weights is None else self.weights[pos[mask]]
+        return CSRGraph.from_edges([self.nodes[i] for i in node_ids],
+            src[mask], dst[mask], weights=weights)
+
+
+    def to_dict(self):
+        '''
+        Edges weights (if any) are dropped.
+        '''
+        indptr = self.indptr.tolist()
+        indices = self.indices.tolist()
+        nodes = self.nodes
+        graph = {nodes[i]: {nodes[j] for j in indices[indptr[i]:indptr[i+1]]}
+            for i in range(self.n_keys)}
+        return graph
+
+
+    def to_scipy(self, dtype=np.float64):
+        from scipy import sparse
+        if self.weights is None:
+            data = np.ones(self.n_edges, dtype=dtype)
+        else:
+            data = self.weights.astype(dtype)
+        return sparse.csr_matrix((data, self.indices, self.indptr),
+            shape=(len(self.nodes), len(self.nodes)))
+
+
+    def save(self, path):
+        names = np.frombuffer(
+            '\n'.join(self.nodes).encode('utf-8'), dtype=np.uint8)
+        arrays = {
+            'names': names,
+            'n_nodes': np.array(len(self.nodes)),
+            'n_keys': np.array(self.n_keys),
+            'indptr': self.indptr,
+            'indices': self.indices,
+        }
+        if self.weights is not None:
+            arrays['weights'] = self.weights
+        #np.savez appends .npz to paths without it
+        with open(path, 'wb') as f:
+            np.savez(f, **arrays)
+        return path
+
+
+def load_graph(path):
+    '''
+    Loads graph in either .npz or .json format as a CSRGraph.
+    '''
+    if path.endswith('.npz'):
+        return CSRGraph.load(path)
+    return CSRGraph.from_dict(util.load_graph(path))
+
+
+def save_graph(path, graph):
+    '''
+    Saves CSRGraph in either .npz or .json format (without weights).
+    '''
+    if path.endswith('.npz'):
+        return graph.save(path)
+    return util.save_graph(path, graph.to_dict())
+
+
+def main():
+    if len(sys.argv) < 3:
+        print('usage: csr_graph.py <src_path> <dst_path>')
+        return
+    src_path, dst_path = sys.argv[1:3]
+    save_graph(dst_path, load_graph(src_path))
+    print('saved graph from "{}" to "{}"'.format(src_path, dst_path))
+
+
+if __name__ == '__main__':
+    main()
@@ -11,6 +11,7 @@ import requests
 
 import util
 import config as cfg
+import metas_table
 
 
 #script config
@@ -62,9 +63,9 @@ def download_missing_paper_pdfs():
     if not os.path.isdir(cfg.paths['pdfs-dir']):
         os.makedirs(cfg.paths['pdfs-dir'])
 
-    metas = util.load_json(cfg.paths['papers-metadata'])
+    metas = metas_table.load_papers_metas()
     metas = util.parallelize(download_paper_pdf_if_needed, metas, N_THREADS)
-    util.save_json(cfg.paths['papers-metadata'], metas)
+    metas_table.save_papers_metas(metas)
 
     print('\n----')
     print('saved updated papers metadata to "{}"'.format(
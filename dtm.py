@@ -0,0 +1,119 @@
+'''
+Sparse document-term matrices (DTM) of texts, so that texts are tokenized
+once (as in util.tokenize_many) and analyses load counts directly, e.g.:
+    mat, vocab, doc_ids = load_dtm(cfg.paths['abstract-dtm'])
+Row i has the counts of terms vocab[j] in document doc_ids[i].
+Matrices are saved as .npz files with the vocabulary and documents ids.
+'''
+
+
+import numpy as np
+from scipy import sparse
+
+import util
+
+
+#number of texts tokenized at a time
+DEF_CHUNK_SIZE = 8192
+
+
+def _get_chunks(iterable, chunk_size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def mk_dtm(texts, chunk_size=DEF_CHUNK_SIZE):
+    '''
+    Builds (texts x terms) counts matrix, tokenizing chunk_size texts at
+    a time. Returns matrix (csr, int32) and sorted vocabulary.
+    '''
+    term_ids = {}
+    mats = []
+    for chunk in _get_chunks(texts, chunk_size):
+        tokens, offsets = util.tokenize_many(chunk)
+        indices = np.fromiter(
+            (term_ids.setdefault(t, len(term_ids)) for t in tokens),
+            dtype=np.int64, count=len(tokens))
+        data = np.ones(len(tokens), dtype=np.int32)
+        mats.append((data, indices, np.array(offsets, dtype=np.int64)))
+    n_terms = len(term_ids)
+    mats = [sparse.csr_matrix(m, shape=(len(m[2]) - 1, n_terms)) for m in mats]
+    mat = sparse.vstack(mats, format='csr') if mats else \
+        sparse.csr_matrix((0, 0), dtype=np.int32)
+    mat.sum_duplicates()
+    #sorting vocabulary, renumbering columns
+    vocab = sorted(term_ids)
+    perm = np.empty(n_terms, dtype=np.int64)
+    perm[[term_ids[t] for t in vocab]] = np.arange(n_terms)
+    mat = sparse.csr_matrix((mat.data, perm[mat.indices], mat.indptr),
+        shape=mat.shape)
+    mat.sort_indices()
+    return mat, vocab
+
+
+def get_tfidf(mat):
+    '''
+    TF-IDF matrix with smooth idf = log((1 + n_docs)/(1 + df)) + 1
+    and rows with unit L2 norm.
+    '''
+    mat = sparse.csr_matrix(mat, dtype=np.float32)
+    n_docs = mat.shape[0]
+    dfs = np.bincount(mat.indices, minlength=mat.shape[1])
+    idfs = np.log((1 + n_docs)/(1 + dfs)) + 1
+    mat.data *= idfs[mat.indices].astype(np.float32)
+    norms = np.sqrt(np.asarray(mat.multiply(mat).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    mat.data /= np.repeat(norms, np.diff(mat.indptr)).astype(np.float32)
+    return mat
+
+
+def get_terms_counts(mat, vocab):
+    '''
+    Counts of each term in all documents, from matrix columns sums.
+    '''
+    sums = np.asarray(mat.sum(axis=0)).ravel().tolist()
+    return {t: s for t, s in zip(vocab, sums) if s > 0}
+
+
+def _to_buffer(strings):
+    return np.frombuffer('\n'.join(strings).encode('utf-8'), dtype=np.uint8)
+
+
+def _from_buffer(buf, n):
+    return buf.tobytes().decode('utf-8').split('\n') if n > 0 else []
+
+
+def save_dtm(path, mat, vocab, doc_ids):
+    assert mat.shape == (len(doc_ids), len(vocab))
+    mat = mat.tocsr()
+    #np.savez appends .npz to paths without it
+    with open(path, 'wb') as f:
+        np.savez(f,
+            data=mat.data,
+            indices=mat.indices,
+            indptr=mat.indptr,
+            vocab=_to_buffer(vocab),
+            n_terms=np.array(len(vocab)),
+            doc_ids=_to_buffer(doc_ids),
+            n_docs=np.array(len(doc_ids)),
+        )
+    return path
+
+
+def load_dtm(path):
+    '''
+    Returns matrix, vocabulary and documents ids.
+    '''
+    with np.load(path) as data:
+        vocab = _from_buffer(data['vocab'], int(data['n_terms']))
+        doc_ids = _from_buffer(data['doc_ids'], int(data['n_docs']))
+        mat = sparse.csr_matrix(
+            (data['data'], data['indices'], data['indptr']),
+            shape=(len(doc_ids), len(vocab)))
+    return mat, vocab, doc_ids
@@ -3,15 +3,28 @@
 
 '''
 Extracts references from pdf files.
+Refs are cached per pdf content, so only new or modified pdfs are processed.
+Run with --evict-cache to remove stale cache entries.
 '''
 
 
+import os
+import sys
+
 import util
 import config as cfg
+import metas_table
+from extractrefs_pool import ExtractRefsPool
 
 
 #script config
 N_THREADS = cfg.n_threads
+#use raw refs cached from previous runs
+USE_CACHE = True
+#use a pool of long-lived extractrefs.py workers instead of one process per pdf
+USE_WORKERS_POOL = True
+#number of pdfs after which a worker is restarted. can be None
+MAX_N_JOBS_PER_WORKER = 256
 
 
 def extract_refs(src_path):
@@ -23,32 +36,142 @@ def extract_refs(src_path):
         dst_path,
     ])
     refs = util.load_json(dst_path)
+    os.remove(dst_path)
     return refs
 
 
-def extract_raw_refs_from_pdf(meta):
+def get_extractor_version():
+    '''
+    Refs are extracted by the wrapper script, so its content is the version.
+    '''
+    return util.get_file_hash(cfg.extract_refs_script_path)[:16]
+
+
+def get_cache_path(pdf_hash, version):
+    filename = '{}_{}.json'.format(version, pdf_hash)
+    return os.path.join(cfg.paths['raw-refs-cache-dir'], filename)
+
+
+def load_cached_refs(pdf_hash, version):
+    path = get_cache_path(pdf_hash, version)
+    if not os.path.isfile(path):
+        return None
+    return util.load_json(path)
+
+
+def save_cached_refs(pdf_hash, version, refs):
+    path = get_cache_path(pdf_hash, version)
+    #writing to a tmp file first so a killed run doesn't leave broken entries
+    tmp_path = '{}.{}.tmp'.format(path, util.get_rand_str())
+    util.save_json(tmp_path, refs)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _extract_raw_refs_from_pdf(meta, pool=None):
+    if pool is None:
+        refs = extract_refs(meta['pdf-path'])
+    else:
+        refs = pool.extract(meta['pdf-path'])
+    refs = [r.get('raw_ref', '') for r in refs]
+    return refs
+
+
+def extract_raw_refs_from_pdf(meta, version=None, use_cache=USE_CACHE,
+        pool=None):
+    '''
+    Returns raw refs and whether they came from the cache.
+    If pool is None, runs one extractrefs.py process for the pdf.
+    '''
     print('on paper "{}"'.format(meta['norm-title']))
     try:
-        refs = extract_refs(meta['pdf-path'])
+        if not use_cache:
+            return _extract_raw_refs_from_pdf(meta, pool), False
+        version = get_extractor_version() if version is None else version
+        pdf_hash = util.get_file_hash(meta['pdf-path'])
+        refs = load_cached_refs(pdf_hash, version)
+        if refs is not None:
+            return refs, True
+        refs = _extract_raw_refs_from_pdf(meta, pool)
+        save_cached_refs(pdf_hash, version, refs)
     except Exception as e:
         print('ERROR on paper "{}": "{}"'.format(
             meta['norm-title'], e))
         refs = []
-    refs = [r.get('raw_ref', '') for r in refs]
-    return refs
-
-
-def extract_raw_refs_from_pdfs():
-    metas = util.load_json(cfg.paths['papers-metadata'])
-    refs = util.parallelize(extract_raw_refs_from_pdf, metas, N_THREADS)
-    refs = {m['uid']: r for m, r in zip(metas, refs)}
-    util.save_json(cfg.paths['raw-papers-refs'], refs)
+    return refs, False
+
+
+def _extract_paper_raw_refs(meta, version=None, use_cache=USE_CACHE,
+        pool=None):
+    refs, hit = extract_raw_refs_from_pdf(meta, version, use_cache, pool)
+    return meta['uid'], refs, hit
+
+
+def _extract_raw_refs_from_pdfs(metas, dst_file, use_cache=USE_CACHE,
+        pool=None):
+    '''
+    Appends refs of each paper to dst_file as soon as they are extracted.
+    Returns the number of cache hits.
+    '''
+    version = get_extractor_version()
+    args = [(m, version, use_cache, pool) for m in metas]
+    #with the workers pool, threads are enough to feed the worker processes
+    results = util.iparallelize(_extract_paper_raw_refs, args, N_THREADS,
+        star=True, threads=pool is not None)
+    n_hits = 0
+    for uid, refs, hit in results:
+        util.append_paper_refs(dst_file, uid, refs)
+        n_hits += int(hit)
+    return n_hits
+
+
+def extract_raw_refs_from_pdfs(use_cache=USE_CACHE,
+        use_workers_pool=USE_WORKERS_POOL):
+    util.mk_dir_if_needed(cfg.paths['raw-refs-cache-dir'])
+
+    metas = metas_table.load_papers_metas(
+        columns=['uid', 'norm-title', 'pdf-path'])
+    with open(cfg.paths['raw-papers-refs'], 'w') as f:
+        if use_workers_pool:
+            with ExtractRefsPool(N_THREADS, cfg.extract_refs_script_path,
+                    MAX_N_JOBS_PER_WORKER) as pool:
+                n_hits = _extract_raw_refs_from_pdfs(metas, f, use_cache, pool)
+        else:
+            n_hits = _extract_raw_refs_from_pdfs(metas, f, use_cache)
 
     print('saved raw papers refs to "{}"'.format(cfg.paths['raw-papers-refs']))
+    if use_cache:
+        print('cache: {} hits, {} misses'.format(n_hits, len(metas) - n_hits))
+
+
+def evict_stale_cache_entries():
+    '''
+    Removes entries of other extractor versions or of pdfs not in metadata.
+    '''
+    version = get_extractor_version()
+    metas = metas_table.load_papers_metas(columns=['pdf-path'])
+    pdfs_hashes = {util.get_file_hash(m['pdf-path'])
+        for m in metas if os.path.isfile(m['pdf-path'])}
+    cache_dir = cfg.paths['raw-refs-cache-dir']
+    filenames = os.listdir(cache_dir) if os.path.isdir(cache_dir) else []
+    n_evicted = 0
+    for filename in filenames:
+        name, __, ext = filename.partition('.')
+        version_, __, pdf_hash = name.partition('_')
+        if ext != 'json' or version_ != version or pdf_hash not in pdfs_hashes:
+            os.remove(os.path.join(cache_dir, filename))
+            n_evicted += 1
+    print('evicted {}/{} cache entries from "{}"'.format(
+        n_evicted, len(filenames), cache_dir))
 
 
 def main():
-    extract_raw_refs_from_pdfs()
+    if '--evict-cache' in sys.argv[1:]:
+        evict_stale_cache_entries()
+    else:
+        extract_raw_refs_from_pdfs(
+            use_cache='--no-cache' not in sys.argv[1:],
+            use_workers_pool='--no-workers-pool' not in sys.argv[1:])
 
 
 if __name__ == '__main__':
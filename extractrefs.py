@@ -5,9 +5,44 @@ from refextract import extract_references_from_file, extract_references_from_url
 import sys
 import json
 
+def extract(pdf_path):
+    if pdf_path.startswith('http://') or pdf_path.startswith('https://'):
+        refs = refextract.extract_references_from_url(pdf_path)
+    else:
+        refs = refextract.extract_references_from_file(pdf_path)
+    return refs
+
+def serve():
+    '''
+    Reads from stdin one json request per line in format {"pdf_path": path}.
+    For each request, writes to stdout one json line {"ref": ref} per ref
+    followed by {"done": true}, or {"error": message} on failure.
+    '''
+    out = sys.stdout
+    #refextract may print stuff, so stdout is kept only for the protocol
+    sys.stdout = sys.stderr
+    for line in iter(sys.stdin.readline, ''):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            refs = extract(json.loads(line)['pdf_path'])
+            lines = [json.dumps({'ref': ref}) for ref in refs]
+            lines.append(json.dumps({'done': True}))
+        except Exception as e:
+            lines = [json.dumps({'error': str(e)})]
+        for out_line in lines:
+            out.write(out_line + '\n')
+        out.flush()
+
 def main():
     if len(sys.argv) < 2:
         print('usage: extractrefs <pdf_path> [dst_path]')
+        print('       extractrefs --serve')
+        return
+
+    if sys.argv[1] == '--serve':
+        serve()
         return
 
     pdf_path = sys.argv[1]
@@ -15,10 +50,7 @@ def main():
     dst_path = \
         sys.argv[2] if len(sys.argv) > 2 else pdf_path.replace('.pdf', '.json')
 
-    if pdf_path.startswith('http://') or pdf_path.startswith('https://'):
-        refs = refextract.extract_references_from_url(pdf_path)
-    else:
-        refs = refextract.extract_references_from_file(pdf_path)
+    refs = extract(pdf_path)
 
     with open(dst_path, 'w') as f:
         json.dump(refs, f, indent=4)
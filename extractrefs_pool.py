@@ -0,0 +1,119 @@
+'''
+Pool of long-lived extractrefs.py workers.
+Each worker is a python2.7 process running `extractrefs.py --serve`, so
+refextract is imported once per worker instead of once per pdf.
+'''
+
+
+import json
+import queue
+import subprocess as sp
+
+
+class ExtractRefsWorker:
+    def __init__(self, script_path, max_n_jobs=None):
+        self.script_path = script_path
+        self.max_n_jobs = max_n_jobs
+        self.proc = None
+        self.n_jobs = 0
+
+
+    def start(self):
+        self.proc = sp.Popen(
+            [self.script_path, '--serve'],
+            stdin=sp.PIPE,
+            stdout=sp.PIPE,
+            universal_newlines=True,
+            bufsize=1,
+        )
+        self.n_jobs = 0
+
+
+    def stop(self, timeout=5):
+        if self.proc is None:
+            return
+        try:
+            self.proc.stdin.close()
+            self.proc.wait(timeout=timeout)
+        except (OSError, sp.TimeoutExpired):
+            self.proc.kill()
+            self.proc.wait()
+        self.proc = None
+
+
+    def restart(self):
+        self.stop()
+        self.start()
+
+
+    @property
+    def is_alive(self):
+        return self.proc is not None and self.proc.poll() is None
+
+
+    def _read_refs(self):
+        refs = []
+        for line in iter(self.proc.stdout.readline, ''):
+            msg = json.loads(line)
+            if 'ref' in msg:
+                refs.append(msg['ref'])
+            elif msg.get('done'):
+                return refs
+            elif 'error' in msg:
+                raise ValueError(msg['error'])
+        raise EOFError('worker exited')
+
+
+    def extract(self, pdf_path):
+        if not self.is_alive:
+            self.restart()
+        elif self.max_n_jobs is not None and self.n_jobs >= self.max_n_jobs:
+            self.restart()
+        self.n_jobs += 1
+        try:
+            self.proc.stdin.write(json.dumps({'pdf_path': pdf_path}) + '\n')
+            self.proc.stdin.flush()
+            refs = self._read_refs()
+        except ValueError as e:
+            if isinstance(e, json.JSONDecodeError):
+                self.stop()
+            raise
+        except (OSError, EOFError) as e:
+            #worker crashed, it'll be restarted on the next job
+            self.stop()
+            raise RuntimeError('worker crashed on "{}": "{}"'.format(
+                pdf_path, e))
+        return refs
+
+
+class ExtractRefsPool:
+    def __init__(self, n_workers, script_path, max_n_jobs_per_worker=None):
+        self.workers = [ExtractRefsWorker(script_path, max_n_jobs_per_worker)
+            for __ in range(n_workers)]
+        self.idle_workers = queue.Queue()
+        for worker in self.workers:
+            self.idle_workers.put(worker)
+
+
+    def extract(self, pdf_path):
+        '''
+        Extracts refs from pdf using the first idle worker. Thread-safe.
+        '''
+        worker = self.idle_workers.get()
+        try:
+            return worker.extract(pdf_path)
+        finally:
+            self.idle_workers.put(worker)
+
+
+    def close(self):
+        for worker in self.workers:
+            worker.stop()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,111 @@
+'''
+Asynchronous FreeCite client.
+Sends several citations per request over persistent keep-alive connections,
+with a cap on the number of requests in flight and retries with exponential
+backoff on server errors.
+'''
+
+
+import asyncio
+import random
+import aiohttp
+
+
+PARSING_API_URL = 'http://freecite.library.brown.edu/citations/create'
+#number of citations per request
+DEF_BATCH_SIZE = 16
+#maximum number of requests in flight
+DEF_MAX_N_IN_FLIGHT = 16
+#maximum number of retries of a request on server/connection errors
+DEF_MAX_N_RETRIES = 5
+#time to wait before the first retry, doubled at each retry
+DEF_BACKOFF = 0.5
+#timeout in seconds for each request
+DEF_TIMEOUT = 60
+
+
+class FreeCiteError(Exception):
+    pass
+
+
+class FreeCiteClient:
+    def __init__(self, url=PARSING_API_URL, batch_size=DEF_BATCH_SIZE,
+            max_n_in_flight=DEF_MAX_N_IN_FLIGHT,
+            max_n_retries=DEF_MAX_N_RETRIES, backoff=DEF_BACKOFF,
+            timeout=DEF_TIMEOUT, verbose=True):
+        self.url = url
+        self.batch_size = batch_size
+        self.max_n_in_flight = max_n_in_flight
+        self.max_n_retries = max_n_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.info = print if verbose else (lambda *a, **ka: None)
+
+
+    async def _post(self, session, refs):
+        data = [('citation[]', r) for r in refs]
+        async with session.post(self.url, data=data,
+                headers={'Accept': 'application/json'}) as resp:
+            if resp.status >= 500:
+                raise FreeCiteError('server error, status = {}'.format(
+                    resp.status))
+            resp.raise_for_status()
+            results = await resp.json(content_type=None)
+        if not isinstance(results, list) or len(results) != len(refs):
+            raise ValueError('expected {} results, got "{}"'.format(
+                len(refs), results))
+        return results
+
+
+    async def parse_batch(self, session, semaphore, refs):
+        '''
+        Returns one dict per ref, empty if the ref could not be parsed.
+        '''
+        for i in range(self.max_n_retries + 1):
+            try:
+                async with semaphore:
+                    return await self._post(session, refs)
+            except (FreeCiteError, aiohttp.ClientConnectionError,
+                    asyncio.TimeoutError) as e:
+                if i == self.max_n_retries:
+                    error = e
+                    break
+                wait_time = self.backoff*(2**i)*random.uniform(1, 1.5)
+                self.info('FAIL #{} with batch of {} refs: "{}" - '
+                    'trying again in {:.2f}s'.format(
+                    i+1, len(refs), e, wait_time))
+                await asyncio.sleep(wait_time)
+            except (aiohttp.ClientError, ValueError) as e:
+                error = e
+                break
+        self.info('ERROR with batch of {} refs: "{}"'.format(len(refs), error))
+        return [{} for __ in refs]
+
+
+    async def parse(self, refs):
+        semaphore = asyncio.Semaphore(self.max_n_in_flight)
+        connector = aiohttp.TCPConnector(limit=self.max_n_in_flight)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(
+                connector=connector, timeout=timeout) as session:
+            batches = [refs[i:i+self.batch_size]
+                for i in range(0, len(refs), self.batch_size)]
+            results = await asyncio.gather(
+                *[self.parse_batch(session, semaphore, b) for b in batches])
+        return [r for results_ in results for r in results_]
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def parse_refs(refs, **kwargs):
+    '''
+    Parses refs with FreeCite, returning one dict per ref (empty on errors).
+    '''
+    client = FreeCiteClient(**kwargs)
+    return run(client.parse(refs))
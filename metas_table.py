@@ -0,0 +1,123 @@
+'''
+Columnar (Parquet) storage for pre-processed papers metadata, so that
+stages can load only the fields they need, e.g.:
+    metas = load_papers_metas(columns=['uid', 'norm-title'])
+The json file is still saved and used as fallback if pyarrow is missing.
+'''
+
+
+import os
+import json
+
+import util
+import config as cfg
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+
+#key in table schema metadata with columns stored as json strings
+_JSON_COLS_KEY = b'json-columns'
+
+
+def _is_str_col(values):
+    return all(v is None or isinstance(v, str) for v in values)
+
+
+def _is_str_list_col(values):
+    return all(v is None or (isinstance(v, list)
+        and all(isinstance(v_, str) for v_ in v)) for v in values)
+
+
+def mk_table(metas):
+    '''
+    Columns of strings/lists of strings are stored as such,
+    columns of other/mixed types are stored as json strings.
+    Assumes all metas have the same keys.
+    '''
+    keys = sorted(set(util.flatten(m.keys() for m in metas)))
+    arrays = []
+    json_cols = []
+    for k in keys:
+        values = [m.get(k) for m in metas]
+        if _is_str_col(values):
+            arrays.append(pa.array(values, type=pa.string()))
+        elif _is_str_list_col(values):
+            arrays.append(pa.array(values, type=pa.list_(pa.string())))
+        else:
+            arrays.append(pa.array([json.dumps(v) for v in values],
+                type=pa.string()))
+            json_cols.append(k)
+    table = pa.Table.from_arrays(arrays, names=keys)
+    table = table.replace_schema_metadata(
+        {_JSON_COLS_KEY: json.dumps(json_cols).encode()})
+    return table
+
+
+def save_table(path, metas):
+    pq.write_table(mk_table(metas), path)
+    return path
+
+
+def _check_columns(columns, names):
+    '''
+    No names means no metas, with any columns.
+    '''
+    missing = [c for c in columns if c not in names]
+    if names and missing:
+        raise KeyError('unknown columns {}. options: {}'.format(
+            missing, ', '.join(sorted(names))))
+
+
+def load_table(path, columns=None):
+    '''
+    Raises KeyError if any of columns isn't in table.
+    '''
+    schema = pq.read_schema(path)
+    if columns is not None:
+        _check_columns(columns, schema.names)
+    table = pq.read_table(path, columns=columns)
+    json_cols = set(json.loads(
+        (schema.metadata or {}).get(_JSON_COLS_KEY, b'[]').decode()))
+    cols = {}
+    for name in table.column_names:
+        values = table.column(name).to_pylist()
+        if name in json_cols:
+            values = [json.loads(v) for v in values]
+        cols[name] = values
+    metas = [dict(zip(cols.keys(), row))
+        for row in zip(*cols.values())] if cols \
+        else [{} for __ in range(table.num_rows)]
+    return metas
+
+
+def save_papers_metas(metas):
+    '''
+    Saves metas in json and, if pyarrow is available, in columnar format.
+    '''
+    util.save_json(cfg.paths['papers-metadata'], metas)
+    if pa is not None:
+        save_table(cfg.paths['papers-metadata-table'], metas)
+    return metas
+
+
+def load_papers_metas(columns=None):
+    '''
+    Loads papers metas with only the given fields (all if None).
+    Raises KeyError if any of the fields isn't in metas.
+    '''
+    table_path = cfg.paths['papers-metadata-table']
+    json_path = cfg.paths['papers-metadata']
+    #not using table if it's older than json, e.g. saved without pyarrow
+    if pa is not None and os.path.isfile(table_path) \
+            and (not os.path.isfile(json_path) or os.path.getmtime(
+                table_path) >= os.path.getmtime(json_path)):
+        return load_table(table_path, columns)
+    metas = util.load_json(cfg.paths['papers-metadata'])
+    if columns is not None:
+        _check_columns(columns, set(util.flatten(m.keys() for m in metas)))
+        metas = [{k: m[k] for k in columns if k in m} for m in metas]
+    return metas
@@ -7,83 +7,444 @@ Makes citation graphs for authors and titles, in the style of:
     - author: {authors that cite author in collection of papers}
     - title: {titles cited by title in collection of papers}
     - title: {titles that cite title in collection of papers}
+Authors graphs are weighted by number of citations.
+Also saves citations histograms (number of titles/authors citing each
+title/author), as mk_histograms.py does with default settings.
+
+Usage: mk_citation_graphs.py [--delta] [--uids UID [UID ...]]
+    With --delta, if there's a state of a previous run, graphs are updated
+    only for papers that were added/changed/removed since then (plus the
+    given uids). The result is the same as a full rebuild (the default).
 '''
 
 
-from functools import reduce
+import os
+import argparse
+import numpy as np
+from scipy import sparse
+from collections import defaultdict
 
 import util
 import config as cfg
+from csr_graph import CSRGraph
+import metas_table
+import title_index
+from title_index import TitleIndex
 
 
-def get_all_nodes(graph):
-    all_nodes = set(graph.keys())
-    #all_nodes |= reduce(lambda a, b: set(a) | set(b), graph.values(), set())
-    return all_nodes
+#also save graphs in json format (slower, but human-readable)
+SAVE_JSON_GRAPHS = True
+#match refs to collection papers by title similarity instead of equality
+#(slower, and may add edges that exact matching doesn't)
+FUZZY_TITLE_MATCHING = False
+#minimum similarity (jaccard of char trigrams) for titles to match
+TITLE_SIMILARITY_THRESHOLD = 0.8
+#update graphs of previous run with changed papers instead of rebuilding
+#(also enabled with --delta)
+DELTA_UPDATES = False
 
 
-def get_rev_graph(graph):
-    all_nodes = get_all_nodes(graph)
-    rev_graph = {node: set() for node in all_nodes}
-    for to_node in all_nodes:
-        for from_node, nodes in graph.items():
-            if to_node in nodes and from_node in all_nodes:
-                rev_graph[to_node].add(from_node)
-    return rev_graph
+def get_refs_titles(papers_refs):
+    '''
+    Gets for each paper uid the set of titles of its refs.
+    Reads (paper uid, refs) items one at a time.
+    '''
+    return {uid: {r['norm-title'] for r in refs_}
+        for uid, refs_ in papers_refs}
 
 
-def get_title_refs_graph(metas, refs):
+def get_cited(metas, refs_titles, title_index=None, stats=None, uids=None):
+    '''
+    Gets for each paper uid (all in refs_titles or only the given ones)
+    the titles of the collection papers it cites.
+    If title_index is given, refs titles are matched by similarity.
+    If stats is given, counts in it exact and total title matches.
+    '''
     all_titles = {m['norm-title'] for m in metas}
+    if title_index is None:
+        match = lambda t: t if t in all_titles else None
+    else:
+        match = title_index.match
+    if uids is None:
+        uids = refs_titles.keys()
+    cited = {}
+    for uid in uids:
+        cited_titles = {match(t) for t in refs_titles[uid]} - {None}
+        cited[uid] = cited_titles
+        if stats is not None:
+            stats['n-exact'] += len(refs_titles[uid] & cited_titles)
+            stats['n-total'] += len(cited_titles)
+    return cited
+
+
+def get_fuzzy_matches(title_index):
+    return {k: (t, s) for k, (t, s) in title_index.fuzzy_matches.items()
+        if t is not None}
+
+
+def save_fuzzy_matches_report(path, fuzzy_matches):
+    matches = [(k, t, s) for k, (t, s) in fuzzy_matches.items()]
+    matches.sort(key=lambda m: (m[2], m[0]))
+    lines = ['ref-title,matched-title,similarity']
+    lines.extend('{},{},{:.3f}'.format(*m) for m in matches)
+    util.save_lines(path, lines)
+    print('saved fuzzy title matches to "{}"'.format(path))
+    return path
+
+
+def get_title_refs_graph(metas, cited):
     graph = {}
     for meta in metas:
-        refs_ = refs.get(meta['uid'], [])
-        cited_titles = {r['norm-title'] for r in refs_}
-        cited_titles &= all_titles
-        graph[meta['norm-title']] = cited_titles
+        graph[meta['norm-title']] = set(cited.get(meta['uid'], set()))
     return graph
 
 
-def get_author_refs_graph(metas, refs):
-    all_titles = {m['norm-title'] for m in metas}
-    all_authors = set(util.flatten(m['norm-authors'] for m in metas))
-    graph = {a: set() for a in all_authors}
-    for meta in metas:
-        refs_ = refs.get(meta['uid'], [])
-        refs_ = [r for r in refs_ if r['norm-title'] in all_titles]
-        cited_authors = set(util.flatten(r['norm-authors'] for r in refs_))
-        cited_authors &= all_authors
-        for a in meta['norm-authors']:
-            graph[a] |= cited_authors
-    return graph
+def get_citations_matrix(metas, cited, src_uids=None, dst_uids=None):
+    '''
+    Papers x papers sparse matrix C, with C[i, j] = 1 if metas[i] cites
+    metas[j] (papers with the same title are all cited).
+    If src_uids/dst_uids are given, only citations from papers in src_uids
+    or to papers in dst_uids are kept.
+    '''
+    title_ids = defaultdict(list)
+    for j, meta in enumerate(metas):
+        title_ids[meta['norm-title']].append(j)
+    if src_uids is not None or dst_uids is not None:
+        src_uids = set(src_uids or ())
+        dst_uids = set(dst_uids or ())
+        dst_titles = {m['norm-title'] for m in metas if m['uid'] in dst_uids}
+    rows = []
+    cols = []
+    for i, meta in enumerate(metas):
+        titles = cited.get(meta['uid'], ())
+        if src_uids is not None and meta['uid'] not in src_uids:
+            titles = dst_titles.intersection(titles)
+        for title in titles:
+            ids = title_ids[title]
+            if src_uids is not None and meta['uid'] not in src_uids:
+                ids = [j for j in ids if metas[j]['uid'] in dst_uids]
+            cols.extend(ids)
+            rows.extend([i]*len(ids))
+    data = np.ones(len(rows), dtype=np.int64)
+    return sparse.csr_matrix(
+        (data, (rows, cols)), shape=(len(metas), len(metas)))
+
+
+def get_authorship_matrix(metas, authors):
+    '''
+    Authors x papers sparse matrix A, with A[a, i] = 1 if authors[a]
+    is an author of metas[i].
+    '''
+    author_ids = {a: i for i, a in enumerate(authors)}
+    rows = []
+    cols = []
+    for i, meta in enumerate(metas):
+        ids = {author_ids[a] for a in meta['norm-authors']}
+        rows.extend(ids)
+        cols.extend([i]*len(ids))
+    data = np.ones(len(rows), dtype=np.int64)
+    return sparse.csr_matrix(
+        (data, (rows, cols)), shape=(len(authors), len(metas)))
+
+
+def get_author_refs_graph(metas, cited):
+    '''
+    Gets authors graph as the product A*C*A^T of the authorship (A) and
+    citations (C) matrices, without building per-author sets.
+    Weight of edge (a, b) is the number of citations of papers of b
+    in papers of a.
+    '''
+    authors = sorted(set(util.flatten(m['norm-authors'] for m in metas)))
+    auth_mat = get_authorship_matrix(metas, authors)
+    cits_mat = get_citations_matrix(metas, cited)
+    graph_mat = auth_mat.dot(cits_mat).dot(auth_mat.T)
+    return CSRGraph.from_scipy(authors, graph_mat)
+
+
+def save_citations_hist(rev_csr_graph, term):
+    '''
+    Saves number of nodes citing each node, from reversed graph.
+    '''
+    degrees = rev_csr_graph.out_degrees()[:rev_csr_graph.n_keys].tolist()
+    hist = dict(zip(rev_csr_graph.nodes[:rev_csr_graph.n_keys], degrees))
+    path = cfg.paths['{}-refs-hist'.format(term)]
+    util.save_csv_hist(path, hist)
+    print('saved .csv citations hist for "{}" to "{}"'.format(term, path))
+
+
+def save_graphs(csr_graph, term, save_json=SAVE_JSON_GRAPHS):
+    '''
+    Saves graph and its reverse in CSR format (and in json format if set),
+    and the citations histogram.
+    The reverse is recomputed from graph, in O(V+E).
+    '''
+    rev_csr_graph = csr_graph.reverse()
+    for key, graph_, descr in [
+            ('{}-refs-graph', csr_graph, ''),
+            ('{}-refs-rev-graph', rev_csr_graph, 'reversed ')]:
+        key = key.format(term)
+        graph_.save(cfg.paths['{}-csr'.format(key)])
+        print('saved {}{} refs graph to "{}"'.format(
+            descr, term, cfg.paths['{}-csr'.format(key)]))
+        if save_json:
+            util.save_graph(cfg.paths[key], graph_.to_dict())
+            print('saved {}{} refs graph to "{}"'.format(
+                descr, term, cfg.paths[key]))
+    save_citations_hist(rev_csr_graph, term)
+
+
+def get_state_config():
+    '''
+    Settings that must be the same for delta updates on a previous state.
+    '''
+    return {
+        'fuzzy-title-matching': FUZZY_TITLE_MATCHING,
+        'title-similarity-threshold': TITLE_SIMILARITY_THRESHOLD,
+        'title-index-hash': util.get_file_hash(title_index.__file__),
+    }
+
+
+def save_state(metas, refs_titles, cited, fuzzy_matches):
+    state = {
+        'config': get_state_config(),
+        'metas': [[m['uid'], m['norm-title'], m['norm-authors']]
+            for m in metas],
+        'refs-titles': {k: sorted(v) for k, v in refs_titles.items()},
+        'cited': {k: sorted(v) for k, v in cited.items()},
+        'fuzzy-matches': fuzzy_matches,
+    }
+    util.save_json(cfg.paths['citation-graphs-state'], state)
+    print('saved citation graphs state to "{}"'.format(
+        cfg.paths['citation-graphs-state']))
+
+
+def load_state():
+    '''
+    Returns state of previous run or None if it's missing/incompatible.
+    '''
+    paths = [cfg.paths[k] for k in ['citation-graphs-state',
+        'titles-refs-graph-csr', 'authors-refs-graph-csr']]
+    if not all(os.path.isfile(p) for p in paths):
+        return None
+    state = util.load_json(cfg.paths['citation-graphs-state'])
+    if state['config'] != get_state_config():
+        return None
+    state['metas'] = [{'uid': u, 'norm-title': t, 'norm-authors': a}
+        for u, t, a in state['metas']]
+    state['refs-titles'] = {k: set(v) for k, v in state['refs-titles'].items()}
+    state['cited'] = {k: set(v) for k, v in state['cited'].items()}
+    state['fuzzy-matches'] = {k: tuple(v)
+        for k, v in state['fuzzy-matches'].items()}
+    return state
+
+
+def mk_title_index(metas):
+    return TitleIndex(
+        [m['norm-title'] for m in metas], TITLE_SIMILARITY_THRESHOLD)
+
+
+def get_changed_uids(old_metas, metas, old_refs_titles, refs_titles):
+    '''
+    Gets uids of papers added, removed or changed (metadata or refs).
+    '''
+    old_metas = {m['uid']: m for m in old_metas}
+    metas = {m['uid']: m for m in metas}
+    changed = set(old_metas.keys()) ^ set(metas.keys())
+    changed |= {k for k, m in metas.items() if old_metas.get(k, m) != m}
+    changed |= set(old_refs_titles.keys()) ^ set(refs_titles.keys())
+    changed |= {k for k, v in refs_titles.items()
+        if old_refs_titles.get(k, v) != v}
+    return changed
+
+
+def get_affected_uids(refs_titles, old_cited, changed_uids, added_titles,
+        removed_titles):
+    '''
+    Gets uids of papers whose cited titles may change: changed papers,
+    papers with refs that match an added title and papers citing a
+    removed title. Matches of other refs can't change.
+    '''
+    if FUZZY_TITLE_MATCHING:
+        added_index = TitleIndex(added_titles, TITLE_SIMILARITY_THRESHOLD)
+        match = added_index.match
+    else:
+        match = lambda t: t if t in added_titles else None
+    affected = set(changed_uids) & set(refs_titles.keys())
+    for uid, titles in refs_titles.items():
+        if uid in affected:
+            continue
+        if old_cited[uid] & removed_titles \
+                or any(match(t) is not None for t in titles):
+            affected.add(uid)
+    return affected
+
+
+def get_last_uids(metas):
+    '''
+    Gets for each title the uid of its last paper (used in titles graph).
+    '''
+    return {m['norm-title']: m['uid'] for m in metas}
+
+
+def update_title_refs_graph(graph, old_metas, metas, cited, uids):
+    '''
+    Updates CSR titles graph of old_metas to metas, given uids of papers
+    changed or with changed cited titles. Only rows of titles whose (last)
+    paper changed are rebuilt, other rows are copied with ids remapped.
+    '''
+    old_last_uids = get_last_uids(old_metas)
+    last_uids = get_last_uids(metas)
+    titles = {t for t in old_last_uids.keys() | last_uids.keys()
+        if old_last_uids.get(t) != last_uids.get(t) or last_uids[t] in uids}
+    nodes = sorted(last_uids.keys())
+    node_ids = {n: i for i, n in enumerate(nodes)}
+    #edges of unchanged rows, with ids in the new nodes
+    new_ids = np.array([node_ids.get(n, -1) for n in graph.nodes],
+        dtype=np.int64)
+    changed = np.zeros(len(graph), dtype=bool)
+    changed[[graph.node_ids[t] for t in titles if t in graph.node_ids]] = True
+    src, dst = graph.get_edges()
+    mask = ~changed[src]
+    src, dst = new_ids[src[mask]], new_ids[dst[mask]]
+    mask = (src >= 0) & (dst >= 0)
+    srcs = [src[mask]]
+    dsts = [dst[mask]]
+    #edges of changed rows
+    for title in titles & last_uids.keys():
+        ids = [node_ids[t] for t in cited.get(last_uids[title], ())]
+        srcs.append(np.full(len(ids), node_ids[title], dtype=np.int64))
+        dsts.append(np.array(ids, dtype=np.int64))
+    return CSRGraph.from_edges(nodes, np.concatenate(srcs),
+        np.concatenate(dsts))
+
+
+def update_author_refs_graph(graph, old_metas, metas, old_cited, cited,
+        src_uids, dst_uids):
+    '''
+    Updates authors graph (A*C*A^T) of old_metas to metas, subtracting old
+    and adding new weights of citations from papers in src_uids (with
+    changed cited titles) or to papers in dst_uids (with changed authors).
+    '''
+    old_authors = graph.nodes[:graph.n_keys]
+    authors = sorted(set(util.flatten(m['norm-authors'] for m in metas)))
+    all_authors = sorted(set(old_authors) | set(authors))
+    all_author_ids = {a: i for i, a in enumerate(all_authors)}
+    #selection matrices from authors/old authors to all authors
+    sel_mats = []
+    for authors_ in [old_authors, authors]:
+        rows = [all_author_ids[a] for a in authors_]
+        sel_mats.append(sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.int64), (rows, range(len(rows)))),
+            shape=(len(all_authors), len(authors_))))
+    old_sel_mat, sel_mat = sel_mats
+    graph_mat = graph.to_scipy(dtype=np.int64)[:graph.n_keys, :graph.n_keys]
+    graph_mat = old_sel_mat.dot(graph_mat).dot(old_sel_mat.T)
+    for metas_, cited_, sign in [
+            (old_metas, old_cited, -1),
+            (metas, cited, 1)]:
+        auth_mat = get_authorship_matrix(metas_, all_authors)
+        cits_mat = get_citations_matrix(metas_, cited_, src_uids, dst_uids)
+        graph_mat = graph_mat + sign*auth_mat.dot(cits_mat).dot(auth_mat.T)
+    graph_mat = sel_mat.T.dot(graph_mat).dot(sel_mat)
+    return CSRGraph.from_scipy(authors, graph_mat)
 
 
 def mk_citation_graphs():
-    metas = util.load_json(cfg.paths['papers-metadata'])
-    refs = util.load_json(cfg.paths['papers-refs'])
+    metas = metas_table.load_papers_metas(
+        columns=['uid', 'norm-title', 'norm-authors'])
+    #streaming refs, keeping only what's needed for graphs
+    refs_titles = get_refs_titles(
+        util.iter_papers_refs(cfg.paths['papers-refs']))
+    fuzzy_matches = {}
+    if FUZZY_TITLE_MATCHING:
+        title_index_ = mk_title_index(metas)
+        stats = {'n-exact': 0, 'n-total': 0}
+        cited = get_cited(metas, refs_titles, title_index_, stats)
+        print('titles graph edges: {} with exact matching, {} with fuzzy '
+            'matching ({} recovered)'.format(stats['n-exact'],
+            stats['n-total'], stats['n-total'] - stats['n-exact']))
+        fuzzy_matches = get_fuzzy_matches(title_index_)
+        save_fuzzy_matches_report(
+            cfg.paths['fuzzy-title-matches'], fuzzy_matches)
+    else:
+        cited = get_cited(metas, refs_titles)
+
+    graph = get_title_refs_graph(metas, cited)
+    save_graphs(CSRGraph.from_dict(graph), 'titles')
 
-    graph = get_title_refs_graph(metas, refs)
-    util.save_graph(cfg.paths['titles-refs-graph'], graph)
-    print('saved titles refs graph to "{}"'.format(
-        cfg.paths['titles-refs-graph']))
+    graph = get_author_refs_graph(metas, cited)
+    save_graphs(graph, 'authors')
 
-    rev_graph = get_rev_graph(graph)
-    util.save_graph(cfg.paths['titles-refs-rev-graph'], rev_graph)
-    print('saved reversed titles refs graph to "{}"'.format(
-        cfg.paths['titles-refs-rev-graph']))
+    save_state(metas, refs_titles, cited, fuzzy_matches)
 
-    graph = get_author_refs_graph(metas, refs)
-    util.save_graph(cfg.paths['authors-refs-graph'], graph)
-    print('saved authors refs graph to "{}"'.format(
-        cfg.paths['authors-refs-graph']))
 
-    rev_graph = get_rev_graph(graph)
-    util.save_graph(cfg.paths['authors-refs-rev-graph'], rev_graph)
-    print('saved reversed authors refs graph to "{}"'.format(
-        cfg.paths['authors-refs-rev-graph']))
+def update_citation_graphs(uids=()):
+    '''
+    Updates graphs of previous run given papers added/changed/removed since
+    then (detected from metadata/refs, plus the given uids).
+    '''
+    state = load_state()
+    if state is None:
+        print('no compatible state of previous run, rebuilding graphs')
+        mk_citation_graphs()
+        return
+    old_metas = state['metas']
+    old_cited = state['cited']
+    metas = metas_table.load_papers_metas(
+        columns=['uid', 'norm-title', 'norm-authors'])
+    refs_titles = get_refs_titles(
+        util.iter_papers_refs(cfg.paths['papers-refs']))
+    changed_uids = set(uids) | get_changed_uids(
+        old_metas, metas, state['refs-titles'], refs_titles)
+    old_titles = {m['norm-title'] for m in old_metas}
+    titles = {m['norm-title'] for m in metas}
+    affected_uids = get_affected_uids(refs_titles, old_cited, changed_uids,
+        titles - old_titles, old_titles - titles)
+    print('{} changed papers, updating cited titles of {} papers'.format(
+        len(changed_uids), len(affected_uids)))
+
+    title_index_ = mk_title_index(metas) if FUZZY_TITLE_MATCHING else None
+    cited = {k: v for k, v in old_cited.items() if k in refs_titles}
+    cited.update(get_cited(metas, refs_titles, title_index_,
+        uids=affected_uids))
+    fuzzy_matches = {}
+    if FUZZY_TITLE_MATCHING:
+        #matches of refs of other papers are the same
+        others_titles = set(util.flatten(
+            v for k, v in refs_titles.items() if k not in affected_uids))
+        fuzzy_matches = {k: v for k, v in state['fuzzy-matches'].items()
+            if k in others_titles}
+        fuzzy_matches.update(get_fuzzy_matches(title_index_))
+        save_fuzzy_matches_report(
+            cfg.paths['fuzzy-title-matches'], fuzzy_matches)
+
+    graph = CSRGraph.load(cfg.paths['titles-refs-graph-csr'])
+    graph = update_title_refs_graph(
+        graph, old_metas, metas, cited, changed_uids | affected_uids)
+    save_graphs(graph, 'titles')
+
+    graph = CSRGraph.load(cfg.paths['authors-refs-graph-csr'])
+    graph = update_author_refs_graph(graph, old_metas, metas, old_cited,
+        cited, changed_uids | affected_uids, changed_uids)
+    save_graphs(graph, 'authors')
+
+    save_state(metas, refs_titles, cited, fuzzy_matches)
 
 
 def main():
-    mk_citation_graphs()
+    parser = argparse.ArgumentParser(description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--delta', action='store_true',
+        default=DELTA_UPDATES,
+        help='update graphs of previous run with changed papers')
+    parser.add_argument('--uids', nargs='+', default=[],
+        help='uids of papers to update besides the detected ones')
+    args = parser.parse_args()
+
+    if args.delta:
+        update_citation_graphs(args.uids)
+    else:
+        mk_citation_graphs()
 
 
 if __name__ == '__main__':
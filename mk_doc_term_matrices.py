@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+
+
+'''
+Makes document-term (counts) and TF-IDF sparse matrices of papers
+abstracts/titles, see dtm.py.
+
+Usage: mk_doc_term_matrices.py [--pubs-csv PATH]
+    --pubs-csv uses a crawled pubs table (crawl/mk_pubs_table.py) instead
+    of papers metadata, saving matrices to paths with suffix -pubs.
+'''
+
+
+import sys
+import csv
+
+import util
+import config as cfg
+import metas_table
+import dtm
+
+
+def iter_csv_docs(path, term, doc_ids):
+    '''
+    Yields texts of term from pubs table, appending their uids to doc_ids.
+    '''
+    with open(path, newline='') as f:
+        for i, row in enumerate(csv.DictReader(f)):
+            doc_ids.append(row.get('uid') or str(i))
+            yield row.get(term) or ''
+
+
+def mk_doc_term_matrices(pubs_csv_path=None):
+    if pubs_csv_path is None:
+        metas = metas_table.load_papers_metas(
+            columns=['uid', 'abstract', 'title'])
+    suffix = '' if pubs_csv_path is None else '-pubs'
+    for term in ['abstract', 'title']:
+        if pubs_csv_path is None:
+            doc_ids = [m['uid'] for m in metas]
+            texts = (m.get(term) or '' for m in metas)
+        else:
+            doc_ids = []
+            texts = iter_csv_docs(pubs_csv_path, term, doc_ids)
+        mat, vocab = dtm.mk_dtm(texts)
+        print('{} matrix: {} docs, {} terms, {} non-zeros'.format(
+            term, mat.shape[0], mat.shape[1], mat.nnz))
+        for key, mat_ in [
+                ('{}-dtm', mat),
+                ('{}-tfidf', dtm.get_tfidf(mat))]:
+            path = util.add_path_suffix(cfg.paths[key.format(term)], suffix)
+            dtm.save_dtm(path, mat_, vocab, doc_ids)
+            print('saved {} matrix to "{}"'.format(key.format(term), path))
+
+
+def main():
+    pubs_csv_path = None
+    if '--pubs-csv' in sys.argv[1:-1]:
+        pubs_csv_path = sys.argv[sys.argv.index('--pubs-csv') + 1]
+    mk_doc_term_matrices(pubs_csv_path)
+
+
+if __name__ == '__main__':
+    main()
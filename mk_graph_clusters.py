@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+
+
+'''
+Clusters nodes of titles/authors citation graphs into communities with
+the Louvain method (greedy modularity optimization), on the undirected
+version of the graphs. Works on sparse matrices of the CSR graphs: nodes
+are moved between communities using plain int/float lists, and each
+level's communities are aggregated into nodes with a sparse product.
+Also finds (weakly) connected components: communities never span
+more than one component.
+Saves for each graph:
+    - cluster labels, as a .csv histogram in format {node: cluster}
+    - clusters summaries (.csv): component, number of nodes, internal
+      edges/weight and most cited nodes of each cluster
+Clusters are labeled by size in decreasing order (0 is the largest).
+'''
+
+
+import csv
+import numpy as np
+from scipy import sparse
+from scipy.sparse import csgraph
+
+import util
+import config as cfg
+from csr_graph import CSRGraph
+
+
+#higher values give more/smaller communities
+RESOLUTION = 1.0
+#minimum modularity gain for a node to change community
+MIN_GAIN = 1e-9
+#maximum number of sweeps over all nodes in each level
+MAX_N_SWEEPS = 32
+#seed for random order of nodes visits
+SEED = 42
+#use edges weights (e.g. number of citations) in modularity
+USE_WEIGHTS = True
+#number of most cited nodes to list in summary of each cluster
+N_TOP_NODES = 5
+
+
+def get_components(mat):
+    '''
+    Returns weakly connected components labels (by size, 0 is largest).
+    '''
+    __, labels = csgraph.connected_components(
+        mat, directed=True, connection='weak')
+    return relabel_by_size(labels)
+
+
+def relabel_by_size(labels):
+    '''
+    Relabels to 0..n-1 by decreasing size (ties by first node).
+    '''
+    uniq, first_ids, labels = np.unique(
+        labels, return_index=True, return_inverse=True)
+    sizes = np.bincount(labels)
+    order = np.lexsort((first_ids, -sizes))
+    new_labels = np.empty(len(uniq), dtype=np.int64)
+    new_labels[order] = np.arange(len(uniq))
+    return new_labels[labels]
+
+
+def get_undirected(mat):
+    mat = mat.tocsr().astype(np.float64)
+    return (mat + mat.T).tocsr()
+
+
+def get_modularity(mat, labels, resolution=RESOLUTION):
+    '''
+    Modularity of partition labels of undirected graph mat.
+    '''
+    m2 = mat.sum()
+    if m2 == 0:
+        return 0.0
+    degrees = np.asarray(mat.sum(axis=1)).ravel()
+    mat = mat.tocoo()
+    internal = labels[mat.row] == labels[mat.col]
+    in_weights = np.bincount(labels[mat.row[internal]],
+        weights=mat.data[internal], minlength=labels.max() + 1)
+    tot_weights = np.bincount(labels, weights=degrees)
+    return float((in_weights/m2 - resolution*(tot_weights/m2)**2).sum())
+
+
+def _move_nodes(mat, resolution, rng, min_gain=MIN_GAIN,
+        max_n_sweeps=MAX_N_SWEEPS):
+    '''
+    Louvain local moving phase: moves each node to the neighbor community
+    with the best modularity gain until no node moves.
+    Returns communities and number of moves.
+    '''
+    n = mat.shape[0]
+    indptr = mat.indptr.tolist()
+    indices = mat.indices.tolist()
+    weights = mat.data.tolist()
+    degrees = np.asarray(mat.sum(axis=1)).ravel().tolist()
+    m2 = sum(degrees)
+    comms = list(range(n))
+    tots = list(degrees)
+    n_moves = 0
+    if m2 == 0:
+        return np.array(comms), n_moves
+    order = rng.permutation(n).tolist()
+    for __ in range(max_n_sweeps):
+        n_sweep_moves = 0
+        for i in order:
+            comm_weights = {}
+            for p in range(indptr[i], indptr[i+1]):
+                j = indices[p]
+                if j != i:
+                    c = comms[j]
+                    comm_weights[c] = comm_weights.get(c, 0) + weights[p]
+            comm = comms[i]
+            factor = resolution*degrees[i]/m2
+            tots[comm] -= degrees[i]
+            best_comm = comm
+            best_gain = comm_weights.get(comm, 0) - factor*tots[comm]
+            for c, w in comm_weights.items():
+                gain = w - factor*tots[c]
+                if gain > best_gain + min_gain:
+                    best_comm, best_gain = c, gain
+            tots[best_comm] += degrees[i]
+            if best_comm != comm:
+                comms[i] = best_comm
+                n_sweep_moves += 1
+        n_moves += n_sweep_moves
+        if n_sweep_moves == 0:
+            break
+    return np.array(comms), n_moves
+
+
+def get_louvain_clusters(mat, resolution=RESOLUTION, seed=SEED):
+    '''
+    Assumes mat is undirected (symmetric).
+    Returns clusters labels (by size, 0 is largest) and number of levels.
+    '''
+    rng = np.random.RandomState(seed)
+    labels = np.arange(mat.shape[0])
+    n_levels = 0
+    while True:
+        comms, n_moves = _move_nodes(mat, resolution, rng)
+        if n_moves == 0:
+            break
+        n_levels += 1
+        __, comms = np.unique(comms, return_inverse=True)
+        labels = comms[labels]
+        #aggregating communities into nodes
+        memb_mat = sparse.csr_matrix(
+            (np.ones(len(comms)), (np.arange(len(comms)), comms)),
+            shape=(len(comms), comms.max() + 1))
+        mat = memb_mat.T.dot(mat).dot(memb_mat).tocsr()
+    return relabel_by_size(labels), n_levels
+
+
+def get_clusters_summaries(graph, comps, clusters, n_top_nodes=N_TOP_NODES):
+    '''
+    Returns list of summaries of clusters, in clusters order.
+    Nodes are ranked by (weighted) number of citations they get.
+    '''
+    n_clusters = clusters.max() + 1 if len(clusters) > 0 else 0
+    src, dst = graph.get_edges()
+    weights = np.ones(graph.n_edges) if graph.weights is None \
+        else graph.weights
+    internal = clusters[src] == clusters[dst]
+    n_edges = np.bincount(clusters[src[internal]], minlength=n_clusters)
+    in_weights = np.bincount(clusters[src[internal]],
+        weights=weights[internal], minlength=n_clusters)
+    sizes = np.bincount(clusters, minlength=n_clusters)
+    cluster_comps = np.zeros(n_clusters, dtype=np.int64)
+    cluster_comps[clusters] = comps
+    #most cited nodes of each cluster
+    scores = np.bincount(dst, weights=weights, minlength=len(graph))
+    order = np.lexsort((-scores, clusters))
+    starts = np.searchsorted(clusters[order], np.arange(n_clusters))
+    summaries = []
+    for c in range(n_clusters):
+        top_ids = order[starts[c]:starts[c] + min(sizes[c], n_top_nodes)]
+        summaries.append({
+            'cluster': c,
+            'component': int(cluster_comps[c]),
+            'n-nodes': int(sizes[c]),
+            'n-edges': int(n_edges[c]),
+            'weight': int(in_weights[c]) if in_weights[c].is_integer()
+                else float(in_weights[c]),
+            'top-nodes': '; '.join(graph.nodes[i] for i in top_ids),
+        })
+    return summaries
+
+
+def save_clusters_summaries(path, summaries):
+    keys = ['cluster', 'component', 'n-nodes', 'n-edges', 'weight',
+        'top-nodes']
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=keys)
+        writer.writeheader()
+        writer.writerows(summaries)
+
+
+def load_clusters(path):
+    '''
+    Loads {node: cluster} mapping saved by this script.
+    '''
+    return util.load_csv_hist(path)
+
+
+def mk_graph_clusters(use_weights=USE_WEIGHTS, resolution=RESOLUTION):
+    for term in ['titles', 'authors']:
+        graph = CSRGraph.load(cfg.paths['{}-refs-graph-csr'.format(term)])
+        mat = graph.to_scipy()
+        if not use_weights:
+            mat.data[:] = 1
+        print('{} graph: {} nodes, {} edges'.format(
+            term, len(graph), graph.n_edges))
+
+        comps = get_components(mat)
+        print('{} connected components (largest: {} nodes)'.format(
+            comps.max() + 1 if len(comps) > 0 else 0,
+            np.bincount(comps).max() if len(comps) > 0 else 0))
+        mat = get_undirected(mat)
+        clusters, n_levels = get_louvain_clusters(mat, resolution)
+        print('{} clusters in {} levels, modularity: {:.4f}'.format(
+            clusters.max() + 1 if len(clusters) > 0 else 0, n_levels,
+            get_modularity(mat, clusters, resolution)))
+
+        path = cfg.paths['{}-clusters'.format(term)]
+        util.save_csv_hist(path, dict(zip(graph.nodes, clusters.tolist())),
+            sort_by_freqs=False)
+        print('saved {} clusters to "{}"'.format(term, path))
+        path = cfg.paths['{}-clusters-summaries'.format(term)]
+        save_clusters_summaries(path,
+            get_clusters_summaries(graph, comps, clusters))
+        print('saved {} clusters summaries to "{}"'.format(term, path))
+
+
+def main():
+    mk_graph_clusters()
+
+
+if __name__ == '__main__':
+    main()
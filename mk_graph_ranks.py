@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+
+
+'''
+Ranks nodes of titles/authors citation graphs by PageRank and HITS
+(hubs and authorities scores), computed by power iteration on sparse
+matrices. Scores are saved as .csv histograms, in format {node: score},
+and as arrays indexed by graph node ids (.npz), to be used along the graph.
+'''
+
+
+import numpy as np
+
+import util
+import config as cfg
+from csr_graph import CSRGraph
+
+
+#probability of following a citation (instead of jumping to any node)
+DAMPING = 0.85
+#iterations stop when the L1 norm of the scores change is below tolerance
+TOLERANCE = 1e-10
+MAX_N_ITERS = 200
+#use edges weights (e.g. number of citations) in transition probabilities
+USE_WEIGHTS = True
+
+
+def get_pagerank(mat, damping=DAMPING, tol=TOLERANCE,
+        max_n_iters=MAX_N_ITERS):
+    '''
+    Assumes mat[i, j] is the weight of edge from node i to node j.
+    Mass of nodes without out edges (dangling) is spread to all nodes.
+    Returns scores (summing to 1) and number of iterations.
+    '''
+    n = mat.shape[0]
+    if n == 0:
+        return np.zeros(0), 0
+    out_weights = np.asarray(mat.sum(axis=1)).ravel()
+    dangling = out_weights == 0
+    inv_out_weights = np.zeros(n)
+    inv_out_weights[~dangling] = 1/out_weights[~dangling]
+    mat_t = mat.T.tocsr()
+    scores = np.full(n, 1/n)
+    for i in range(max_n_iters):
+        prev_scores = scores
+        scores = mat_t.dot(prev_scores*inv_out_weights)
+        scores += prev_scores[dangling].sum()/n
+        scores = damping*scores + (1 - damping)/n
+        if np.abs(scores - prev_scores).sum() < tol:
+            break
+    else:
+        print('WARNING: pagerank did not converge in {} iterations'.format(
+            max_n_iters))
+    return scores, i + 1
+
+
+def get_hits(mat, tol=TOLERANCE, max_n_iters=MAX_N_ITERS):
+    '''
+    Assumes mat[i, j] is the weight of edge from node i to node j.
+    Returns hubs and authorities scores (each summing to 1) and number
+    of iterations.
+    '''
+    n = mat.shape[0]
+    if n == 0 or mat.nnz == 0:
+        return np.full(n, 1/max(n, 1)), np.full(n, 1/max(n, 1)), 0
+    mat = mat.tocsr()
+    mat_t = mat.T.tocsr()
+    hubs = np.full(n, 1/n)
+    for i in range(max_n_iters):
+        auths = mat_t.dot(hubs)
+        auths /= auths.sum()
+        prev_hubs = hubs
+        hubs = mat.dot(auths)
+        hubs /= hubs.sum()
+        if np.abs(hubs - prev_hubs).sum() < tol:
+            break
+    else:
+        print('WARNING: hits did not converge in {} iterations'.format(
+            max_n_iters))
+    return hubs, auths, i + 1
+
+
+def get_scores_hist(graph, scores):
+    '''
+    Only nodes that are keys of graph are kept.
+    '''
+    scores = scores[:graph.n_keys].tolist()
+    return dict(zip(graph.nodes[:graph.n_keys], scores))
+
+
+def get_keys_scores(graph, scores):
+    '''
+    Scores by node id, with nodes that are not keys of graph scored 0 (as
+    they are missing from scores hists).
+    '''
+    scores = scores.copy()
+    scores[graph.n_keys:] = 0
+    return scores
+
+
+def mk_graph_ranks(use_weights=USE_WEIGHTS):
+    for term in ['titles', 'authors']:
+        graph = CSRGraph.load(cfg.paths['{}-refs-graph-csr'.format(term)])
+        mat = graph.to_scipy()
+        if not use_weights:
+            mat.data[:] = 1
+        print('{} graph: {} nodes, {} edges'.format(
+            term, len(graph), graph.n_edges))
+
+        scores, n_iters = get_pagerank(mat)
+        print('pagerank converged in {} iterations'.format(n_iters))
+        hubs, auths, n_iters = get_hits(mat)
+        print('hits converged in {} iterations'.format(n_iters))
+
+        for key, scores_ in [
+                ('{}-pagerank-hist', scores),
+                ('{}-hubs-hist', hubs),
+                ('{}-authorities-hist', auths)]:
+            path = cfg.paths[key.format(term)]
+            util.save_csv_hist(path, get_scores_hist(graph, scores_))
+            print('saved {} to "{}"'.format(key.format(term), path))
+        path = cfg.paths['{}-ranks'.format(term)]
+        np.savez(path, **{name: get_keys_scores(graph, scores_)
+            for name, scores_ in [
+                ('pagerank', scores), ('hubs', hubs), ('authorities', auths)]})
+        print('saved {}-ranks to "{}"'.format(term, path))
+
+
+def main():
+    mk_graph_ranks()
+
+
+if __name__ == '__main__':
+    main()
@@ -3,16 +3,36 @@
 
 '''
 Produces the following set of histograms:
-    - word count for all abstracts/titles in papers
+    - word (or n-gram) count for all abstracts/titles in papers
     - title/author citation count
+
+Usage: mk_histograms.py [--ngram N] [--top-k] [--pubs-csv PATH] [--norm]
+        [--percentile P] [--max-n-terms K]
+    N = 2 or 3 counts bigrams/trigrams of words, saved to the word freqs
+    hists paths with suffix -Ngrams.
+    --top-k counts only (approximately) the most frequent words in fixed
+    memory, see topk_counter.py.
+    --pubs-csv counts words in a crawled pubs table (crawl/mk_pubs_table.py)
+    instead of papers metadata, saved to paths with suffix -pubs.
+    --norm, --percentile and --max-n-terms post-process all histograms,
+    see NORM_HIST, PERCENTILE and MAX_N_TERMS.
 '''
 
 
+import os
+import csv
+import argparse
+import numpy as np
+import nltk
 from nltk.corpus import stopwords
-from collections import defaultdict
+from collections import defaultdict, Counter
 
 import util
 import config as cfg
+from csr_graph import CSRGraph
+import metas_table
+from topk_counter import SpaceSavingCounter
+import dtm
 
 
 #stopwords, ie, words to not be considered in counting
@@ -32,20 +52,79 @@ STOPWORDS |= {
 NORM_HIST = False
 #gets only words >= percentile
 PERCENTILE = None
+#gets only the most frequent terms. can be None
+MAX_N_TERMS = None
+#count citations using graph edge weights (if any) instead of edges.
+#for authors, counts citations instead of citing authors (see config.py)
+USE_CITATIONS_WEIGHTS = False
+#size of n-grams of words to count in abstracts/titles
+NGRAM = 1
+#number of processes counting words and number of texts per process job
+N_PROCS = os.cpu_count()
+SHARD_SIZE = 4096
+#maximum number of shards read and not yet counted, per process
+N_PENDING_SHARDS_PER_PROC = 2
+#count words exactly ('exact') or only the most frequent ones ('top-k')
+WORD_FREQS_BACKEND = 'exact'
+#maximum number of words monitored by each top-k counter
+TOP_K_CAPACITY = 1 << 15
+#number of most frequent words saved with top-k backend
+TOP_K = 1000
+#get words counts from document-term matrices (if present) instead of texts
+USE_DTM = True
+
+
+def get_percentile_ids(freqs, percentile):
+    '''
+    Indexes of freqs >= percentile (linearly interpolated, as np.percentile),
+    selecting only the needed order statistics instead of sorting.
+    '''
+    if len(freqs) == 0:
+        return np.arange(0)
+    pos = (len(freqs) - 1)*percentile/100
+    low, high = int(np.floor(pos)), int(np.ceil(pos))
+    part = np.partition(freqs, [low, high])
+    perc = part[low] + (part[high] - part[low])*(pos - low)
+    return np.flatnonzero(freqs >= perc)
+
+
+def get_top_k_ids(freqs, k):
+    '''
+    Indexes of the k largest freqs (in any order).
+    '''
+    if k >= len(freqs):
+        return np.arange(len(freqs))
+    if k <= 0:
+        return np.arange(0)
+    return np.argpartition(freqs, len(freqs) - k)[len(freqs) - k:]
+
+
+def proc_hist(hist, percentile=None, max_n_terms=None, norm=False):
+    '''
+    Crops hist by percentile and/or to the max_n_terms most frequent terms
+    and normalizes it, working on an array of frequencies.
+    Returns hist with terms in decreasing frequency order.
+    '''
+    terms = list(hist.keys())
+    freqs = np.array(list(hist.values()))
+    ids = np.arange(len(terms))
+    if percentile is not None:
+        ids = get_percentile_ids(freqs, percentile)
+    if max_n_terms is not None:
+        ids = ids[get_top_k_ids(freqs[ids], max_n_terms)]
+    ids = ids[np.argsort(-freqs[ids], kind='stable')]
+    freqs = freqs[ids]
+    if norm:
+        freqs = freqs/max(freqs.sum(), 1)
+    return dict(zip([terms[i] for i in ids], freqs.tolist()))
 
 
 def norm_hist(hist):
-    total = sum(hist.values())
-    hist = {k: v/max(total, 1) for k, v in hist.items()}
-    return hist
+    return proc_hist(hist, norm=True)
 
 
 def crop_hist_by_percentile(hist, percentile):
-    hist = list(hist.items())
-    hist.sort(key=lambda kv: kv[1], reverse=True)
-    perc = np.percentile([v for __, v in hist], percentile)
-    hist = {k: v for k, v in hist if v >= perc}
-    return hist
+    return proc_hist(hist, percentile=percentile)
 
 
 def get_words_hist(words):
@@ -64,6 +143,17 @@ def get_citations_hist(graph):
     return hist
 
 
+def get_csr_citations_hist(graph, weighted=USE_CITATIONS_WEIGHTS):
+    '''
+    Assumes CSRGraph in format author: {authors citing author}
+    If weighted, sums edges weights (number of citations) for each author.
+    '''
+    degrees = graph.out_weights() if weighted else graph.out_degrees()
+    degrees = degrees[:graph.n_keys].tolist()
+    hist = dict(zip(graph.nodes[:graph.n_keys], degrees))
+    return hist
+
+
 def get_words(text):
     words = util.slugify(text).split('-')
     words = [w for w in words if w]
@@ -71,13 +161,119 @@ def get_words(text):
 
 
 def get_all_words(metas, key):
-    words = []
-    for meta in metas:
-        text = meta.get(key, '')
-        words.extend(get_words(text))
+    words, __ = util.tokenize_many(m.get(key) or '' for m in metas)
     return words
 
 
+def get_texts_words_hist(texts):
+    '''
+    Counts words of all texts at once, without building a list of words.
+    '''
+    hist = util.count_tokens(texts)
+    hist = {w: f for w, f in hist.items() if w not in STOPWORDS}
+    return hist
+
+
+def _iter_ngrams(texts, n):
+    '''
+    Yields n-grams (words joined by spaces) of texts, ignoring n-grams
+    that start or end with a stopword.
+    '''
+    tokens, offsets = util.tokenize_many(texts)
+    for start, end in zip(offsets[:-1], offsets[1:]):
+        doc = tokens[start:end]
+        ngrams = zip(*[doc[i:] for i in range(n)])
+        yield from (' '.join(ng) for ng in ngrams
+            if ng[0] not in STOPWORDS and ng[-1] not in STOPWORDS)
+
+
+def _count_ngrams(texts, n):
+    if n == 1:
+        hist = util.count_tokens(texts)
+        return Counter({w: f for w, f in hist.items() if w not in STOPWORDS})
+    return Counter(_iter_ngrams(texts, n))
+
+
+def _count_top_ngrams(texts, n, capacity):
+    counter = SpaceSavingCounter(capacity)
+    counter.update(_iter_ngrams(texts, n))
+    return counter
+
+
+def get_shards(iterable, shard_size=SHARD_SIZE):
+    shard = []
+    for item in iterable:
+        shard.append(item)
+        if len(shard) >= shard_size:
+            yield shard
+            shard = []
+    if shard:
+        yield shard
+
+
+def get_texts_ngrams_hist(texts, n=NGRAM, n_procs=N_PROCS):
+    '''
+    Counts n-grams of texts in shards in parallel, merging partial counts.
+    Texts are read lazily: at most N_PENDING_SHARDS_PER_PROC*n_procs shards
+    are in flight at a time.
+    '''
+    shards = ((shard, n) for shard in get_shards(texts))
+    hist = Counter()
+    for hist_ in util.iparallelize(_count_ngrams, shards, n_procs, star=True,
+            max_n_pending=N_PENDING_SHARDS_PER_PROC*n_procs):
+        hist.update(hist_)
+    return dict(hist)
+
+
+def get_texts_top_ngrams_hist(texts, n=NGRAM, k=TOP_K,
+        capacity=TOP_K_CAPACITY, n_procs=N_PROCS):
+    '''
+    Approximately counts the k most frequent n-grams of texts, with each
+    process holding at most capacity n-grams at a time.
+    Total memory is about n_procs*capacity counters, plus the
+    N_PENDING_SHARDS_PER_PROC*n_procs shards of SHARD_SIZE texts in flight.
+    Counts are overestimated by at most the error bound printed.
+    '''
+    shards = ((shard, n, capacity) for shard in get_shards(texts))
+    max_n_pending = N_PENDING_SHARDS_PER_PROC*n_procs
+    counter = SpaceSavingCounter(capacity)
+    for counter_ in util.iparallelize(_count_top_ngrams, shards, n_procs,
+            star=True, max_n_pending=max_n_pending):
+        counter = counter.merge(counter_)
+    top = counter.most_common(k)
+    print('memory: {} procs x {} counters + at most {} shards x {} texts '
+        'in flight'.format(n_procs, capacity, max_n_pending, SHARD_SIZE))
+    print('top {} of {} n-grams: counts overestimated by at most {} '
+        '(bound n/capacity = {:.1f}), first {} surely in top {}'.format(
+        len(top), counter.n, counter.max_error(), counter.n/capacity,
+        counter.get_n_guaranteed(k), k))
+    hist = {w: c for w, c, __ in top}
+    return hist
+
+
+def get_dtm_words_hist(path):
+    '''
+    Gets words counts from columns sums of document-term matrix.
+    '''
+    mat, vocab, __ = dtm.load_dtm(path)
+    hist = dtm.get_terms_counts(mat, vocab)
+    hist = {w: f for w, f in hist.items() if w not in STOPWORDS}
+    return hist
+
+
+def iter_csv_texts(path, term):
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            yield row.get(term) or ''
+
+
+def get_word_freqs_hist_path(term, ngram=1, suffix=''):
+    path = cfg.paths['{}-word-freqs-hist'.format(term)]
+    if ngram > 1:
+        suffix = '-{}grams{}'.format(ngram, suffix)
+    return util.add_path_suffix(path, suffix)
+
+
 def plot_words(hist, max_n_words=None, term=None):
     #converting word freq hist to sorted list of words and frequencies
     words_freqs = sorted(hist.items(), key=lambda kv: kv[1], reverse=True)
@@ -119,36 +315,74 @@ def get_word_freqs(metas, term, norm=False, percentile=None):
         term, cfg.paths['{}-word-freq-csv'.format(term)]))
 
 
-def mk_word_freq_hists(norm=False, percentile=None):
-    metas = util.load_json(cfg.paths['papers-metadata'])
+def mk_word_freq_hists(norm=NORM_HIST, percentile=PERCENTILE,
+        max_n_terms=MAX_N_TERMS, ngram=NGRAM, backend=WORD_FREQS_BACKEND,
+        pubs_csv_path=None):
+    suffix = '' if pubs_csv_path is None else '-pubs'
+    metas = None
     for term in ['abstract', 'title']:
-        words = get_all_words(metas, term)
-        hist = get_words_hist(words)
-        if percentile is not None:
-            hist = crop_hist_by_percentile(hist, percentile)
-        if norm:
-            hist = norm_hist(hist)
-        path = cfg.paths['{}-word-freqs-hist'.format(term)]
-        util.save_csv_hist(path, hist)
+        dtm_path = util.add_path_suffix(
+            cfg.paths['{}-dtm'.format(term)], suffix)
+        use_dtm = USE_DTM and ngram == 1 and backend == 'exact' \
+            and os.path.isfile(dtm_path)
+        if use_dtm:
+            texts = None
+        elif pubs_csv_path is not None:
+            texts = iter_csv_texts(pubs_csv_path, term)
+        else:
+            if metas is None:
+                metas = metas_table.load_papers_metas(
+                    columns=['abstract', 'title'])
+            texts = (m.get(term) or '' for m in metas)
+        if use_dtm:
+            hist = get_dtm_words_hist(dtm_path)
+            print('got "{}" words counts from "{}"'.format(term, dtm_path))
+        elif backend == 'top-k':
+            hist = get_texts_top_ngrams_hist(texts, ngram)
+        else:
+            hist = get_texts_ngrams_hist(texts, ngram)
+        hist = proc_hist(hist, percentile, max_n_terms, norm)
+        path = get_word_freqs_hist_path(term, ngram, suffix)
+        util.save_csv_hist(path, hist, sort_by_freqs=False)
         print('saved .csv word freq hist for "{}" to "{}"'.format(term, path))
 
 
-def mk_citation_hists(norm=False, percentile=None):
+def mk_citation_hists(norm=NORM_HIST, percentile=PERCENTILE,
+        max_n_terms=MAX_N_TERMS):
     for term in ['authors', 'titles']:
-        graph = util.load_json(cfg.paths['{}-refs-rev-graph'.format(term)])
-        hist = get_citations_hist(graph)
+        graph = CSRGraph.load(cfg.paths['{}-refs-rev-graph-csr'.format(term)])
+        hist = get_csr_citations_hist(graph)
+        hist = proc_hist(hist, percentile, max_n_terms, norm)
         path = cfg.paths['{}-refs-hist'.format(term)]
-        util.save_csv_hist(path, hist)
+        util.save_csv_hist(path, hist, sort_by_freqs=False)
         print('saved .csv citations hist for "{}" to "{}"'.format(term, path))
 
 
-def mk_histograms():
-    mk_word_freq_hists()
-    mk_citation_hists()
+def mk_histograms(norm=NORM_HIST, percentile=PERCENTILE,
+        max_n_terms=MAX_N_TERMS, ngram=NGRAM, backend=WORD_FREQS_BACKEND):
+    mk_word_freq_hists(norm, percentile, max_n_terms, ngram, backend)
+    mk_citation_hists(norm, percentile, max_n_terms)
 
 
 def main():
-    mk_histograms()
+    parser = argparse.ArgumentParser(description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ngram', type=int, choices=[1, 2, 3], default=NGRAM)
+    parser.add_argument('--top-k', action='store_true',
+        help='use top-k backend for word freqs')
+    parser.add_argument('--pubs-csv', default=None)
+    parser.add_argument('--norm', action='store_true', default=NORM_HIST)
+    parser.add_argument('--percentile', type=float, default=PERCENTILE)
+    parser.add_argument('--max-n-terms', type=int, default=MAX_N_TERMS)
+    args = parser.parse_args()
+
+    backend = 'top-k' if args.top_k else WORD_FREQS_BACKEND
+    if args.pubs_csv is not None:
+        mk_word_freq_hists(args.norm, args.percentile, args.max_n_terms,
+            args.ngram, backend, args.pubs_csv)
+        return
+    mk_histograms(args.norm, args.percentile, args.max_n_terms, args.ngram,
+        backend)
 
 
 if __name__ == '__main__':
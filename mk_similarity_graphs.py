@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+
+
+'''
+Makes similarity graphs of papers/refs from the papers refs:
+    - co-citation: titles cited together, weighted by the number of
+      papers that cite both (product C^T*C)
+    - bibliographic coupling: papers (by uid) with refs in common,
+      weighted by the number of shared refs titles (product C*C^T)
+where C is the papers x refs titles binary matrix.
+Products are computed in blocks of rows, keeping only the top-k
+neighbors of each node, so memory is bounded by the graphs size.
+Graphs are saved in CSR format (see csr_graph.py), with weights.
+Each node keeps its own top-k, so graphs are not symmetric.
+
+Usage:
+    mk_similarity_graphs.py [--top-k K] [--min-weight W] [--max-col-nnz N]
+'''
+
+
+import argparse
+import numpy as np
+from scipy import sparse
+
+import util
+import config as cfg
+from csr_graph import CSRGraph
+
+
+#maximum number of neighbors to keep for each node
+TOP_K = 32
+#minimum weight (refs in common/papers citing both) for an edge
+MIN_WEIGHT = 1
+#refs cited by more papers (for coupling) and papers with more refs (for
+#co-citation) can be ignored: they barely tell nodes apart and their cost
+#is quadratic in the number of entries. None to keep all of them
+MAX_COL_NNZ = None
+#maximum number of (row entry, column entry) products per block
+MAX_BLOCK_WORK = 1 << 25
+
+
+def get_refs_matrix(papers_refs):
+    '''
+    Gets papers x refs titles binary sparse matrix C, papers uids and
+    refs titles (sorted). Reads (paper uid, refs) items one at a time.
+    '''
+    uids = []
+    title_ids = {}
+    indptr = [0]
+    indices = []
+    for uid, refs in papers_refs:
+        ids = {title_ids.setdefault(r['norm-title'], len(title_ids))
+            for r in refs if r.get('norm-title')}
+        uids.append(uid)
+        indices.extend(ids)
+        indptr.append(len(indices))
+    #relabeling titles ids in sorted order
+    titles = sorted(title_ids.keys())
+    new_ids = np.empty(len(titles), dtype=np.int32)
+    new_ids[[title_ids[t] for t in titles]] = np.arange(
+        len(titles), dtype=np.int32)
+    indices = new_ids[np.array(indices, dtype=np.int64)]
+    data = np.ones(len(indices), dtype=np.int32)
+    mat = sparse.csr_matrix((data, indices, indptr),
+        shape=(len(uids), len(titles)))
+    mat.sort_indices()
+    return mat, uids, titles
+
+
+def get_blocks(costs, max_work=MAX_BLOCK_WORK):
+    '''
+    Splits rows in consecutive blocks (start, end) with sum of costs up to
+    max_work (or a single row).
+    '''
+    cum_costs = np.cumsum(costs)
+    blocks = []
+    start = 0
+    while start < len(costs):
+        base = cum_costs[start - 1] if start > 0 else 0
+        end = np.searchsorted(cum_costs, base + max_work, side='right')
+        end = max(end, start + 1)
+        blocks.append((start, end))
+        start = end
+    return blocks
+
+
+def get_top_k_rows(mat, row_offset, k, min_weight):
+    '''
+    Returns (rows, cols, weights) of the k largest entries of each row of
+    mat (ties broken by column), without diagonal entries.
+    '''
+    mat = mat.tocoo()
+    rows = mat.row.astype(np.int64) + row_offset
+    mask = (rows != mat.col) & (mat.data >= min_weight)
+    rows, cols, data = rows[mask], mat.col[mask], mat.data[mask]
+    order = np.lexsort((cols, -data, rows))
+    rows, cols, data = rows[order], cols[order], data[order]
+    ranks = np.arange(len(rows)) - np.searchsorted(rows, rows, side='left')
+    mask = ranks < k
+    return rows[mask], cols[mask], data[mask]
+
+
+def get_top_k_product(mat, k=TOP_K, min_weight=MIN_WEIGHT,
+        max_col_nnz=MAX_COL_NNZ, max_work=MAX_BLOCK_WORK):
+    '''
+    Computes mat*mat^T keeping only the top-k entries of each row.
+    Columns with more than max_col_nnz entries are ignored (if not None),
+    printing how many.
+    Rows are multiplied in blocks of bounded work, so a block product
+    never holds more than max_work entries.
+    '''
+    mat = mat.tocsr()
+    if max_col_nnz is not None:
+        cols_nnz = np.bincount(mat.indices, minlength=mat.shape[1])
+        dropped = cols_nnz > max_col_nnz
+        print('max col nnz {}: dropped {} of {} columns ({} of {} '
+            'entries)'.format(max_col_nnz, dropped.sum(), mat.shape[1],
+            cols_nnz[dropped].sum(), mat.nnz))
+        mat = mat.dot(sparse.diags((~dropped).astype(mat.dtype),
+            dtype=mat.dtype)).tocsr()
+        mat.eliminate_zeros()
+    mat_t = mat.T.tocsr()
+    #work of row i: sum over its columns j of the number of entries in j
+    costs = mat.dot(np.diff(mat_t.indptr))
+    rows = []
+    cols = []
+    data = []
+    for start, end in get_blocks(costs, max_work):
+        block = mat[start:end].dot(mat_t)
+        rows_, cols_, data_ = get_top_k_rows(block, start, k, min_weight)
+        rows.append(rows_)
+        cols.append(cols_)
+        data.append(data_)
+    n = mat.shape[0]
+    if not rows:
+        return sparse.csr_matrix((n, n), dtype=mat.dtype)
+    return sparse.csr_matrix(
+        (np.concatenate(data), (np.concatenate(rows), np.concatenate(cols))),
+        shape=(n, n))
+
+
+def mk_similarity_graphs(k=TOP_K, min_weight=MIN_WEIGHT,
+        max_col_nnz=MAX_COL_NNZ):
+    refs_mat, uids, titles = get_refs_matrix(
+        util.iter_papers_refs(cfg.paths['papers-refs']))
+    print('refs matrix: {} papers, {} titles, {} refs'.format(
+        refs_mat.shape[0], refs_mat.shape[1], refs_mat.nnz))
+
+    for key, nodes, mat in [
+            ('cocitation-graph-csr', titles, refs_mat.T),
+            ('coupling-graph-csr', uids, refs_mat)]:
+        graph = CSRGraph.from_scipy(
+            nodes, get_top_k_product(mat, k, min_weight, max_col_nnz))
+        graph.save(cfg.paths[key])
+        print('saved {} ({} nodes, {} edges) to "{}"'.format(
+            key, len(graph), graph.n_edges, cfg.paths[key]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--top-k', type=int, default=TOP_K,
+        help='maximum number of neighbors of each node')
+    parser.add_argument('--min-weight', type=int, default=MIN_WEIGHT,
+        help='minimum weight of edges')
+    parser.add_argument('--max-col-nnz', type=int, default=MAX_COL_NNZ,
+        help='ignore refs/papers with more entries (default: keep all)')
+    args = parser.parse_args()
+
+    mk_similarity_graphs(args.top_k, args.min_weight, args.max_col_nnz)
+
+
+if __name__ == '__main__':
+    main()
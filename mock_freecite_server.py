@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+
+
+'''
+Local stand-in for the FreeCite web service, for offline benchmarks.
+Parses citations with the local parser (refparser.py) after a simulated
+latency, failing a fraction of the requests with status 503.
+'''
+
+
+import time
+import random
+import asyncio
+import argparse
+from aiohttp import web
+
+import refparser
+import freecite_client
+
+
+DEF_HOST = '127.0.0.1'
+DEF_PORT = 8089
+
+
+def mk_app(latency=0.1, error_rate=0.0):
+    async def create_citations(request):
+        await asyncio.sleep(latency)
+        if random.random() < error_rate:
+            raise web.HTTPServiceUnavailable()
+        form = await request.post()
+        refs = form.getall('citation[]', []) or form.getall('citation', [])
+        return web.json_response([refparser.parse_ref(r) for r in refs])
+
+    app = web.Application()
+    app.router.add_post('/citations/create', create_citations)
+    return app
+
+
+async def start_server(app, host=DEF_HOST, port=DEF_PORT):
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    return runner
+
+
+async def _bench(refs, url, **kwargs):
+    client = freecite_client.FreeCiteClient(url=url, verbose=False, **kwargs)
+    latencies = []
+    parse_batch = client.parse_batch
+
+    async def timed_parse_batch(*args):
+        start = time.perf_counter()
+        results = await parse_batch(*args)
+        latencies.append(time.perf_counter() - start)
+        return results
+
+    client.parse_batch = timed_parse_batch
+    start = time.perf_counter()
+    results = await client.parse(refs)
+    elapsed = time.perf_counter() - start
+    return results, elapsed, sorted(latencies)
+
+
+async def bench(refs, latency, error_rate, port=DEF_PORT, **kwargs):
+    app = mk_app(latency=latency, error_rate=error_rate)
+    runner = await start_server(app, port=port)
+    url = 'http://{}:{}/citations/create'.format(DEF_HOST, port)
+    try:
+        results, elapsed, latencies = await _bench(refs, url, **kwargs)
+    finally:
+        await runner.cleanup()
+    n_ok = sum(int(bool(r)) for r in results)
+    print('parsed {}/{} refs in {:.3f}s ({:.1f} refs/s)'.format(
+        n_ok, len(refs), elapsed, len(refs)/elapsed))
+    print('batch latency incl. queueing (s): '
+        'p50 = {:.3f}, p95 = {:.3f}, max = {:.3f}'.format(
+        latencies[len(latencies)//2], latencies[int(0.95*len(latencies))],
+        latencies[-1]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=DEF_PORT)
+    parser.add_argument('--latency', type=float, default=0.1,
+        help='simulated latency per request, in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+        help='fraction of requests that fail with status 503')
+    parser.add_argument('--bench', type=int, default=None, metavar='N_REFS',
+        help='benchmark the async client with N_REFS refs and exit')
+    parser.add_argument('--batch-size', type=int,
+        default=freecite_client.DEF_BATCH_SIZE)
+    parser.add_argument('--max-n-in-flight', type=int,
+        default=freecite_client.DEF_MAX_N_IN_FLIGHT)
+    args = parser.parse_args()
+
+    if args.bench is not None:
+        refs = ['[{}] D. Bahdanau, K. Cho, and Y. Bengio. Neural machine '
+            'translation by jointly learning to align and translate. '
+            'In ICLR, 2015.'.format(i) for i in range(args.bench)]
+        freecite_client.run(bench(refs, args.latency, args.error_rate,
+            port=args.port, batch_size=args.batch_size,
+            max_n_in_flight=args.max_n_in_flight))
+        return
+
+    app = mk_app(latency=args.latency, error_rate=args.error_rate)
+    web.run_app(app, host=DEF_HOST, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
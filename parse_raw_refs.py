@@ -2,34 +2,54 @@
 
 
 '''
-Extracts references from pdf files.
+Parses raw references strings into authors/title/year.
+Uses by default a local rule-based parser (refparser.py).
+Run with --parser freecite to use the FreeCite web service instead.
+Distinct refs are parsed once and cached for later runs (--no-cache to skip).
 '''
 
 
 import os
+import sys
 import requests
 
 import util
 import config as cfg
+import refparser
+import refs_cache
+import freecite_client
 
 
 #script config
-N_THREADS = cfg.n_threads*4
-PARSING_API_URL = 'http://freecite.library.brown.edu/citations/create'
+#parsing backend: 'local' (offline, in-process) or 'freecite' (web service)
+PARSER = 'local'
+#reuse refs parsed in previous runs/collections
+USE_CACHE = True
+#number of processes for local parser
+N_THREADS = os.cpu_count() or cfg.n_threads
+#number of refs sent to each process at a time
+BATCH_SIZE = 512
+#number of refs read/parsed/saved at a time, bounding memory use
+CHUNK_SIZE = 32768
+PARSING_API_URL = freecite_client.PARSING_API_URL
+#number of refs sent in each freecite request
+FREECITE_BATCH_SIZE = freecite_client.DEF_BATCH_SIZE
+#maximum number of freecite requests in flight
+FREECITE_MAX_N_IN_FLIGHT = freecite_client.DEF_MAX_N_IN_FLIGHT
 
 
 def normalize_fields(data):
     if data.get('authors') is None:
         data['authors'] = []
-    authors = {util.normalize_author(a) for a in data['authors']}
+    authors = set(util.normalize_authors(data['authors']))
     data['norm-authors'] = sorted(authors)
     if data.get('title') is None:
         data['title'] = ''
-    data['norm-title'] = util.normalize_title(data['title'])
+    data['norm-title'] = util.normalize_titles([data['title']])[0]
     return data
 
 
-def parse_raw_ref(ref):
+def parse_raw_ref_with_freecite(ref):
     resp = requests.post(
         PARSING_API_URL,
         headers={
@@ -49,27 +69,142 @@ def parse_raw_ref(ref):
     return data
 
 
+def _parse_raw_ref_locally(ref):
+    try:
+        data = refparser.parse_ref(ref)
+    except Exception as e:
+        print('ERROR with ref "{}": "{}"'.format(ref, e))
+        data = {}
+    return data
+
+
+def parse_raw_ref_locally(ref):
+    data = _parse_raw_ref_locally(ref)
+    return normalize_fields(data) if data else data
+
+
+def parse_raw_ref(ref, parser=PARSER):
+    if parser == 'local':
+        return parse_raw_ref_locally(ref)
+    if parser == 'freecite':
+        return parse_raw_ref_with_freecite(ref)
+    raise ValueError('unknown parser "{}"'.format(parser))
+
+
 def _parse_raw_refs(refs):
+    return [_parse_raw_ref_locally(r) for r in refs]
+
+
+def get_batches(items, batch_size):
+    return [items[i:i+batch_size] for i in range(0, len(items), batch_size)]
+
+
+def _parse_unique_raw_refs(refs, parser=PARSER):
+    '''
+    Parses refs without normalizing fields. Empty dicts are parsing errors.
+    '''
+    if parser == 'local':
+        #parsing refs in fixed-size batches to balance processes load
+        batches = get_batches(refs, BATCH_SIZE)
+        return list(util.flatten(
+            util.parallelize(_parse_raw_refs, batches, N_THREADS)))
+    if parser == 'freecite':
+        #batched concurrent requests over keep-alive connections
+        return freecite_client.parse_refs(refs,
+            url=PARSING_API_URL,
+            batch_size=FREECITE_BATCH_SIZE,
+            max_n_in_flight=FREECITE_MAX_N_IN_FLIGHT,
+        )
+    raise ValueError('unknown parser "{}"'.format(parser))
+
+
+def get_cache_namespace(parser=PARSER):
+    if parser == 'local':
+        return 'local-{}'.format(
+            util.get_file_hash(refparser.__file__)[:16])
+    return parser
+
+
+def parse_unique_raw_refs(refs, parser=PARSER, use_cache=USE_CACHE):
+    '''
+    Parses each distinct ref (in canonical form) only once, reusing results
+    cached by previous runs. Returns one dict per ref, empty on errors.
+    '''
+    keys = [refs_cache.get_ref_key(r) for r in refs]
+    uniq_refs = dict(zip(keys, refs))
+    if use_cache:
+        util.mk_dirname_if_needed(cfg.paths['parsed-refs-cache'])
+        cache = refs_cache.ParsedRefsCache(
+            cfg.paths['parsed-refs-cache'], get_cache_namespace(parser))
+        parsed = cache.get_many(uniq_refs.keys())
+    else:
+        parsed = {}
+    n_cached = len(parsed)
+    keys_to_parse = [k for k in uniq_refs.keys() if k not in parsed]
+    new_parsed = _parse_unique_raw_refs(
+        [uniq_refs[k] for k in keys_to_parse], parser)
+    new_parsed = {k: d for k, d in zip(keys_to_parse, new_parsed) if d}
+    if use_cache:
+        cache.put_many(new_parsed.items())
+        cache.close()
+    parsed.update(new_parsed)
+    print('{} refs, {} distinct: {} cached, {} parsed ({} errors)'.format(
+        len(refs), len(uniq_refs), n_cached, len(keys_to_parse),
+        len(keys_to_parse) - len(new_parsed)))
+
     data = []
-    for ref in refs:
-        data_ = parse_raw_ref(ref)
-        print('parsed "{}" to "{}"'.format(ref, data_))
+    for key, ref in zip(keys, refs):
+        data_ = parsed.get(key, {})
         if data_:
-            data.append(data_)
+            data_ = normalize_fields(dict(data_, raw_string=ref))
+        data.append(data_)
     return data
 
 
-def parse_raw_refs():
-    refs = util.load_json(cfg.paths['raw-papers-refs'])
-    data = util.parallelize(_parse_raw_refs, list(refs.values()), N_THREADS)
-    refs = {k: v for k, v in zip(refs.keys(), data)}
-    util.save_json(cfg.paths['papers-refs'], refs)
+def get_papers_refs_chunks(papers_refs, chunk_size=CHUNK_SIZE):
+    '''
+    Groups (paper uid, refs) items in chunks of about chunk_size refs.
+    '''
+    chunk = []
+    n_refs = 0
+    for uid, refs in papers_refs:
+        chunk.append((uid, refs))
+        n_refs += len(refs)
+        if n_refs >= chunk_size:
+            yield chunk
+            chunk = []
+            n_refs = 0
+    if chunk:
+        yield chunk
+
+
+def _parse_papers_raw_refs(papers_refs, parser=PARSER, use_cache=USE_CACHE):
+    uids_refs = [(k, r) for k, v in papers_refs for r in v]
+    data = parse_unique_raw_refs(
+        [r for __, r in uids_refs], parser=parser, use_cache=use_cache)
+    refs = {k: [] for k, __ in papers_refs}
+    for (k, __), data_ in zip(uids_refs, data):
+        if data_:
+            refs[k].append(data_)
+    return refs
+
+
+def parse_raw_refs(parser=PARSER, use_cache=USE_CACHE):
+    papers_refs = util.iter_papers_refs(cfg.paths['raw-papers-refs'])
+    with open(cfg.paths['papers-refs'], 'w') as f:
+        for chunk in get_papers_refs_chunks(papers_refs):
+            refs = _parse_papers_raw_refs(chunk, parser, use_cache)
+            for uid, refs_ in refs.items():
+                util.append_paper_refs(f, uid, refs_)
 
     print('saved papers refs to "{}"'.format(cfg.paths['papers-refs']))
 
 
 def main():
-    parse_raw_refs()
+    parser = PARSER
+    if '--parser' in sys.argv[1:-1]:
+        parser = sys.argv[sys.argv.index('--parser') + 1]
+    parse_raw_refs(parser, use_cache='--no-cache' not in sys.argv[1:])
 
 
 if __name__ == '__main__':
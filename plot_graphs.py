@@ -7,6 +7,7 @@ Plots reference graphs for authors and titles.
 
 
 import networkx as nx
+import numpy as np
 from collections import defaultdict
 from matplotlib import pyplot as plt
 from matplotlib import style
@@ -16,6 +17,8 @@ import math
 
 import util
 import config as cfg
+from csr_graph import CSRGraph
+import mk_graph_clusters
 
 
 #maximum number of nodes to plot. will select the most cited nodes
@@ -24,6 +27,13 @@ MAX_N_TITLE_NODES = 48
 #relabel titles/authors to use number instead of the title
 RELABEL_TITLES = False
 RELABEL_AUTHORS = False
+#nodes importance used to select and size nodes: 'refs' (citations count)
+#or 'pagerank' (see mk_graph_ranks.py)
+NODES_RANKING = 'refs'
+#nodes colors: 'out-degree' or 'cluster' (see mk_graph_clusters.py)
+NODES_COLORING = 'out-degree'
+#number of distinct colors for clusters (clusters ids modulo it)
+N_CLUSTER_COLORS = 20
 #graph drawing layouts to be tried in preference order
 PREFERRED_LAYOUTS = [
     lambda g: nx.drawing.nx_pydot.graphviz_layout(g, prog='neato'),
@@ -39,50 +49,51 @@ def get_savefig_size(n_nodes):
 
 
 def get_nx_graph(graph):
+    '''
+    Converts CSR graph (meant to be small) to networkx graph.
+    Nodes without edges are not included.
+    '''
     nx_graph = nx.DiGraph()
-    for u, vs in graph.items():
-        nx_graph.add_edges_from([(u, v) for v in vs])
+    src, dst = graph.get_edges()
+    nodes = graph.nodes
+    nx_graph.add_edges_from(
+        (nodes[u], nodes[v]) for u, v in zip(src.tolist(), dst.tolist()))
     return nx_graph
 
 
-def get_graph(nx_graph):
-    graph = {n: set() for n in nx_graph.nodes()}
-    for u, v in nx_graph.edges():
-        graph[u].add(v)
-    return graph
-
-
-def filter_graph(graph, nodes):
-    nodes = set(nodes)
-    graph = {k: v for k, v in graph.items() if k in nodes}
-    graph = {k: {v_ for v_ in v if v_ in nodes} for k, v in graph.items()}
-    return graph
-
-
-def get_all_nodes(graph):
-    all_nodes = set(graph.keys()) | set(util.flatten(graph.values()))
-    return all_nodes
-
-
-def select_nodes(nodes, hist, max_n_nodes=None):
-    nodes = sorted(nodes, key=lambda n: hist.get(n, 0), reverse=True)
-    nodes = set(nodes[slice(max_n_nodes)])
-    return nodes
-
-
-def reduce_graph(graph, hist, max_n_nodes=None):
-    all_nodes = get_all_nodes(graph)
-    nodes = select_nodes(all_nodes, hist, max_n_nodes)
-    graph = filter_graph(graph, nodes)
-    return graph
-
-
-def relabel_graph(graph, mapping=None):
-    if mapping is None:
-        mapping = {k: i for i, k in enumerate(get_all_nodes(graph))}
-    graph = {k: {mapping[v_] for v_ in v} for k, v in graph.items()}
-    graph = {mapping[k]: v for k, v in graph.items()}
-    return graph, mapping
+def load_nodes_scores(graph, term, ranking=NODES_RANKING):
+    '''
+    Scores of nodes of CSR graph, by node id: citations counts from the
+    reversed graph for 'refs', else ranks saved by mk_graph_ranks.py.
+    '''
+    if ranking == 'refs':
+        return graph.reverse().out_degrees().astype(np.float64)
+    with np.load(cfg.paths['{}-ranks'.format(term)]) as data:
+        scores = data[ranking]
+    if len(scores) != len(graph):
+        raise ValueError('{} {} scores for a graph of {} nodes'.format(
+            len(scores), ranking, len(graph)))
+    return scores
+
+
+def get_top_node_ids(scores, max_n_nodes=None):
+    '''
+    Ids of the max_n_nodes (all if None) highest scores, in decreasing
+    order of score, selected by partition instead of sorting all nodes.
+    '''
+    n = len(scores) if max_n_nodes is None else min(max_n_nodes, len(scores))
+    if n <= 0:
+        return np.arange(0)
+    ids = np.argpartition(-scores, n - 1)[:n]
+    return ids[np.lexsort((ids, -scores[ids]))]
+
+
+def reduce_graph(graph, scores, max_n_nodes=None):
+    '''
+    Subgraph of CSR graph induced by its max_n_nodes top nodes by scores
+    (indexed by node id).
+    '''
+    return graph.subgraph(get_top_node_ids(scores, max_n_nodes))
 
 
 def get_def_dict(dct, typ):
@@ -125,27 +136,39 @@ def get_plot_layout(nx_graph, layouts=PREFERRED_LAYOUTS):
     raise
 
 
-def get_node_colors(nx_graph):
-    graph = get_graph(nx_graph)
-    hist = {k: len(v) for k, v in graph.items()}
-    colors = [hist[n] for n in nx_graph.nodes()]
+def get_colors_hist(graph, clusters=None):
+    '''
+    Colors of nodes of CSR graph: clusters ({node: cluster}) if given,
+    else out degrees.
+    '''
+    if clusters is not None:
+        return {n: clusters.get(n, 0) % N_CLUSTER_COLORS for n in graph.nodes}
+    return dict(zip(graph.nodes, graph.out_degrees().tolist()))
+
+
+def get_node_colors(nx_graph, colors_hist):
+    colors = [colors_hist[n] for n in nx_graph.nodes()]
     return colors
 
 
-def plot_nx_graph(graph, hist, **kwargs):
-    norm_hist = unit_norm_hist(hist)
+def plot_nx_graph(graph, hist, colors_hist, by_cluster=False, **kwargs):
+    if not by_cluster:
+        cmap_kwargs = {'cmap': plt.cm.YlOrRd}
+    else:
+        cmap_kwargs = {'cmap': plt.cm.tab20, 'vmin': 0,
+            'vmax': N_CLUSTER_COLORS - 1}
     fig, ax = plt.subplots()
     nx.draw_networkx(
         graph,
         pos=get_plot_layout(graph),
         ax=ax,
         node_size=get_node_sizes(graph, hist),
-        node_color=get_node_colors(graph),
-        cmap=plt.cm.YlOrRd,
+        node_color=get_node_colors(graph, colors_hist),
         edge_color='grey',
         arrowsize=10,
         arrowstyle='->',
         font_color='black',
+        **cmap_kwargs,
         **kwargs,
     )
     if kwargs.get('title') is not None:
@@ -157,24 +180,41 @@ def plot_nx_graph(graph, hist, **kwargs):
     return fig, ax
 
 
-def plot_graph(graph, hist, relabel=False, max_n_nodes=None, title=None):
-    graph = reduce_graph(graph, hist, max_n_nodes)
+def plot_graph(graph, hist, scores, relabel=False, max_n_nodes=None,
+        title=None, clusters=None):
+    graph = reduce_graph(graph, scores, max_n_nodes)
+    colors_hist = get_colors_hist(graph, clusters)
     if relabel:
-        graph, mapping = relabel_graph(graph)
+        mapping = {n: i for i, n in enumerate(graph.nodes)}
         hist = relabel_hist(hist, mapping)
+        colors_hist = relabel_hist(colors_hist, mapping)
+        graph = CSRGraph(list(range(len(graph))), graph.indptr,
+            graph.indices, weights=graph.weights)
     else:
         mapping = None
     nx_graph = get_nx_graph(graph)
-    fig, ax = plot_nx_graph(nx_graph, hist,
-        title='citation graph (top {} cited nodes)'.format(max_n_nodes))
+    fig, ax = plot_nx_graph(nx_graph, hist, colors_hist,
+        by_cluster=clusters is not None,
+        title='citation graph (top {} {} nodes)'.format(max_n_nodes,
+            'cited' if NODES_RANKING == 'refs' else NODES_RANKING))
     return fig, ax, mapping
 
 
+def load_clusters(term):
+    if NODES_COLORING != 'cluster':
+        return None
+    return mk_graph_clusters.load_clusters(
+        cfg.paths['{}-clusters'.format(term)])
+
+
 def plot_titles_graph():
-    graph = util.load_graph(cfg.paths['titles-refs-graph'])
-    hist = util.load_csv_hist(cfg.paths['titles-refs-hist'])
+    graph = CSRGraph.load(cfg.paths['titles-refs-graph-csr'])
+    hist = util.load_csv_hist(
+        cfg.paths['titles-{}-hist'.format(NODES_RANKING)])
     fig, ax, mapping = plot_graph(
-        graph, hist, relabel=RELABEL_TITLES, max_n_nodes=MAX_N_TITLE_NODES)
+        graph, hist, load_nodes_scores(graph, 'titles'),
+        relabel=RELABEL_TITLES, max_n_nodes=MAX_N_TITLE_NODES,
+        clusters=load_clusters('titles'))
 
     fig.set_size_inches(get_savefig_size(MAX_N_TITLE_NODES), forward=False)
     fig.savefig(cfg.paths['titles-graph-plot'], dpi=333)
@@ -187,11 +227,13 @@ def plot_titles_graph():
 
 
 def plot_authors_graph():
-    graph = util.load_graph(cfg.paths['authors-refs-graph'])
-    hist = get_def_dict(
-        util.load_csv_hist(cfg.paths['authors-refs-hist']), int)
+    graph = CSRGraph.load(cfg.paths['authors-refs-graph-csr'])
+    hist = get_def_dict(util.load_csv_hist(
+        cfg.paths['authors-{}-hist'.format(NODES_RANKING)]), int)
     fig, ax, mapping = plot_graph(
-        graph, hist, relabel=RELABEL_AUTHORS, max_n_nodes=MAX_N_AUTHOR_NODES)
+        graph, hist, load_nodes_scores(graph, 'authors'),
+        relabel=RELABEL_AUTHORS, max_n_nodes=MAX_N_AUTHOR_NODES,
+        clusters=load_clusters('authors'))
 
     fig.set_size_inches(get_savefig_size(MAX_N_AUTHOR_NODES), forward=False)
     fig.savefig(cfg.paths['authors-graph-plot'], dpi=333)
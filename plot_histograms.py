@@ -72,6 +72,15 @@ def plot_citations_freqs(hist, term, max_n_terms=None, savefig_dpi=300):
     print('saved citation hist plot for "{}" to "{}"'.format(term, path))
 
 
+def plot_ranks(hist, term, max_n_terms=None, savefig_dpi=300):
+    title = '{} pagerank scores in citations graph'.format(term)
+    fig = plot_hist(hist, max_n_terms=max_n_terms, title=title)
+    fig.axes[0].set_xlabel('score')
+    path = cfg.paths['{}-pagerank-hist-plot'.format(term)]
+    fig.savefig(path, dpi=savefig_dpi)
+    print('saved pagerank plot for "{}" to "{}"'.format(term, path))
+
+
 def plot_histograms():
     for term in 'title', 'abstract':
         hist = util.load_csv_hist(cfg.paths['{}-word-freqs-hist'.format(term)])
@@ -79,6 +88,9 @@ def plot_histograms():
     for term in 'authors', 'titles':
         hist = util.load_csv_hist(cfg.paths['{}-refs-hist'.format(term)])
         plot_citations_freqs(hist, term, max_n_terms=MAX_N_TERMS)
+    for term in 'authors', 'titles':
+        hist = util.load_csv_hist(cfg.paths['{}-pagerank-hist'.format(term)])
+        plot_ranks(hist, term, max_n_terms=MAX_N_TERMS)
 
 
 def main():
@@ -15,6 +15,7 @@ import hashlib
 
 import util
 import config as cfg
+import metas_table
 
 
 def load_ris(path):
@@ -70,7 +71,7 @@ def normalize_title(meta):
 
 
 def normalize_authors(meta):
-    authors = {util.normalize_author(a) for a in meta['authors']}
+    authors = set(util.normalize_authors(meta['authors']))
     meta['norm-authors'] = sorted(authors)
     return meta
 
@@ -108,7 +109,7 @@ def _pre_proc_paper_metas(metas):
 def pre_proc_papers_metas():
     raw_metas = load_ris(cfg.paths['raw-papers-metadata'])
     metas = _pre_proc_paper_metas(raw_metas)
-    util.save_json(cfg.paths['papers-metadata'], metas)
+    metas_table.save_papers_metas(metas)
     print('saved updated papers metadata to "{}"'.format(
         cfg.paths['papers-metadata']))
 
@@ -0,0 +1,107 @@
+'''
+Rule-based parser of raw reference strings, runs offline and in-process.
+Extracts authors, title and year in the format FreeCite produces, e.g.:
+    "[3] D. Bahdanau, K. Cho, and Y. Bengio. Neural machine translation by
+    jointly learning to align and translate. In ICLR, 2015."
+    -> {'authors': ['D. Bahdanau', 'K. Cho', 'Y. Bengio'],
+        'title': 'Neural machine translation by jointly learning to align
+        and translate', 'year': 2015, ...}
+'''
+
+
+import re
+
+
+#leading index of the reference in the list, like "[12]", "12." or "(12)"
+_INDEX_REGEX = re.compile(r'^\s*(?:\[\s*\d+\s*\]|\(\s*\d+\s*\)|\d+\.)\s*')
+_YEAR_REGEX = re.compile(r'\b((?:19|20)\d{2})[a-z]?\b')
+_QUOTED_REGEX = re.compile(r'["“”„‘’`]{1,2}'
+    r'([^"“”„]{8,}?)[,.]?["“”’\']{1,2}')
+#authors in format "Last, F. G., Last, F. and Last, F."
+_LAST_NAME = r"[A-Z][\w'\-]+(?:\s(?:[a-z]{1,3}\s)?[A-Z][\w'\-]+)*"
+_INITIALS = r'(?:[A-Z]\.\s?-?)+'
+_LAST_FIRST_AUTHOR = r'{},\s*{}'.format(_LAST_NAME, _INITIALS)
+_LAST_FIRST_AUTHORS_REGEX = re.compile(
+    r'^{0}(?:,?\s*(?:and\s+|&\s*)?{0})*(?:,?\s*et\s+al\.?)?'.format(
+        _LAST_FIRST_AUTHOR))
+_LAST_FIRST_AUTHOR_REGEX = re.compile(_LAST_FIRST_AUTHOR)
+#authors in format "Last FG, Last F, Last F." (vancouver style),
+#ending with period or with year in parenthesis
+_LAST_INITIALS_AUTHOR = r"([A-Z][\w'\-]+)\s([A-Z]{1,3})\b"
+_LAST_INITIALS_AUTHORS_REGEX = re.compile(
+    r'^{0}(?:,\s*{0})*(?:,?\s*et\s+al)?(?:\.|(?=\s*\())'.format(
+        _LAST_INITIALS_AUTHOR))
+_LAST_INITIALS_AUTHOR_REGEX = re.compile(_LAST_INITIALS_AUTHOR)
+#year in parenthesis right after authors, like "(2015)."
+_PAREN_YEAR_REGEX = re.compile(r'^\s*\(\s*(?:19|20)\d{2}[a-z]?\s*\)\s*[.,:]?')
+#sentence ends on periods not preceded by an initial ("D.")
+_SENTENCE_END_REGEX = re.compile(r'(?<!\b[A-Z])\.\s+')
+_AUTHORS_SEP_REGEX = re.compile(r'\s*(?:,\s*and\s+|\band\s+|&|;|,)\s*')
+_ET_AL_REGEX = re.compile(r'\bet\.?\s+al\b\.?', re.IGNORECASE)
+_STRIP_CHARS = ' \t\n.,;:"\'“”‘’'
+
+
+def strip_index(ref):
+    return _INDEX_REGEX.sub('', ref, count=1)
+
+
+def get_year(ref):
+    years = _YEAR_REGEX.findall(ref)
+    return int(years[-1]) if years else None
+
+
+def split_authors(text):
+    text = _ET_AL_REGEX.sub('', text).strip(' ,;')
+    if _LAST_FIRST_AUTHORS_REGEX.match(text):
+        authors = [m.group(0) for m in _LAST_FIRST_AUTHOR_REGEX.finditer(text)]
+    elif _LAST_INITIALS_AUTHORS_REGEX.match(text + '.'):
+        #using comma format so last names are recognized in normalization
+        authors = ['{}, {}'.format(*m.groups())
+            for m in _LAST_INITIALS_AUTHOR_REGEX.finditer(text)]
+    else:
+        authors = _AUTHORS_SEP_REGEX.split(text)
+    authors = [a.strip(' ,;') for a in authors]
+    authors = [a for a in authors if a]
+    return authors
+
+
+def _split_title(text):
+    text = _PAREN_YEAR_REGEX.sub('', text, count=1)
+    title = _SENTENCE_END_REGEX.split(text.strip(_STRIP_CHARS), 1)[0]
+    return title
+
+
+def split_authors_title(ref):
+    '''
+    Gets raw authors and title strings from ref without leading index.
+    '''
+    #title in quotes, authors before it
+    match = _QUOTED_REGEX.search(ref)
+    if match is not None:
+        return ref[:match.start()], match.group(1)
+    #authors in formats with initials, optionally followed by year
+    for regex in [_LAST_FIRST_AUTHORS_REGEX, _LAST_INITIALS_AUTHORS_REGEX]:
+        match = regex.match(ref)
+        if match is not None:
+            return match.group(0), _split_title(ref[match.end():])
+    #authors in first sentence, title in the second
+    sentences = _SENTENCE_END_REGEX.split(ref.strip(), 1)
+    authors = sentences[0]
+    title = _split_title(sentences[1]) if len(sentences) > 1 else ''
+    return authors, title
+
+
+def parse_ref(ref):
+    ref_ = strip_index(ref)
+    authors, title = split_authors_title(ref_)
+    data = {
+        'authors': split_authors(authors),
+        'title': title.strip(_STRIP_CHARS),
+        'year': get_year(ref_),
+        'raw_string': ref,
+    }
+    return data
+
+
+def parse_refs(refs):
+    return [parse_ref(r) for r in refs]
@@ -0,0 +1,105 @@
+'''
+Persistent cache of parsed raw references, shared by runs and collections.
+Raw refs are keyed by a canonical form of the string, so the same paper
+cited in different papers (with different indexes, spacing or punctuation)
+is parsed only once.
+Backed by sqlite, so it's safe to use from several processes at once.
+'''
+
+
+import os
+import re
+import json
+import sqlite3
+import hashlib
+
+import refparser
+
+
+_NON_WORD_REGEX = re.compile(r'[\W_]+')
+#maximum number of variables in a sqlite query
+_MAX_N_QUERY_VARS = 512
+
+
+def canonicalize_ref(ref):
+    ref = refparser.strip_index(ref)
+    ref = _NON_WORD_REGEX.sub(' ', ref.lower())
+    return ref.strip()
+
+
+def get_ref_key(ref):
+    return hashlib.sha1(canonicalize_ref(ref).encode('utf-8')).hexdigest()
+
+
+class ParsedRefsCache:
+    def __init__(self, path, namespace, timeout=60):
+        '''
+        Entries are separated by namespace, e.g. parser name and version.
+        '''
+        self.path = path
+        self.namespace = namespace
+        self.timeout = timeout
+        self._conn = None
+        self._pid = None
+
+
+    @property
+    def conn(self):
+        #sqlite connections can't be shared by forked processes
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, timeout=self.timeout)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS refs ('
+                'namespace TEXT, key TEXT, data TEXT, '
+                'PRIMARY KEY (namespace, key))')
+            self._pid = os.getpid()
+        return self._conn
+
+
+    def get_many(self, keys):
+        '''
+        Returns dict key: parsed ref for the keys in cache.
+        '''
+        keys = list(set(keys))
+        found = {}
+        for i in range(0, len(keys), _MAX_N_QUERY_VARS):
+            keys_ = keys[i:i+_MAX_N_QUERY_VARS]
+            query = 'SELECT key, data FROM refs WHERE namespace = ? ' \
+                'AND key IN ({})'.format(','.join('?'*len(keys_)))
+            for key, data in self.conn.execute(query, [self.namespace] + keys_):
+                found[key] = json.loads(data)
+        return found
+
+
+    def put_many(self, items):
+        '''
+        Saves items in format (key, parsed ref).
+        '''
+        with self.conn:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO refs (namespace, key, data) '
+                'VALUES (?, ?, ?)',
+                [(self.namespace, k, json.dumps(v)) for k, v in items])
+
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+
+    def put(self, key, data):
+        self.put_many([(key, data)])
+
+
+    def close(self):
+        if self._conn is not None and self._pid == os.getpid():
+            self._conn.close()
+        self._conn = None
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+
+
+'''
+Runs the pipeline stages declared in config.pipeline_stages.
+A stage is skipped if the content hashes of its inputs, outputs and code
+didn't change since its last successful run.
+Stages that don't depend on each other are run in parallel.
+'''
+
+
+import os
+import sys
+import argparse
+import hashlib
+from multiprocessing.pool import ThreadPool
+
+import util
+import config as cfg
+
+
+#path to this file's dir, where stage scripts are
+_FILE_DIR = os.path.dirname(os.path.abspath(__file__))
+#code used by all stages
+COMMON_CODE = ['util.py', 'config.py']
+
+
+def get_file_hash(path, file_hashes):
+    '''
+    Content hash of a file, reusing the previous hash if size/mtime match.
+    '''
+    stat = os.stat(path)
+    key = [stat.st_size, stat.st_mtime_ns]
+    cached = file_hashes.get(path)
+    if cached is not None and cached[:2] == key:
+        return cached[2]
+    hsh = util.get_file_hash(path)
+    file_hashes[path] = key + [hsh]
+    return hsh
+
+
+def get_dir_hash(path, file_hashes):
+    hsh = hashlib.sha256()
+    for dir_path, dir_names, filenames in os.walk(path):
+        dir_names.sort()
+        for filename in sorted(filenames):
+            file_path = os.path.join(dir_path, filename)
+            line = '{}:{}\n'.format(
+                os.path.relpath(file_path, path),
+                get_file_hash(file_path, file_hashes))
+            hsh.update(line.encode())
+    return hsh.hexdigest()
+
+
+def get_path_hash(path, file_hashes):
+    if os.path.isdir(path):
+        return get_dir_hash(path, file_hashes)
+    if os.path.isfile(path):
+        return get_file_hash(path, file_hashes)
+    return None
+
+
+def get_script_path(stage):
+    return os.path.join(_FILE_DIR, '{}.py'.format(stage['name']))
+
+
+def get_stage_hashes(stage, file_hashes):
+    code_paths = [get_script_path(stage)]
+    code_paths += [os.path.join(_FILE_DIR, p)
+        for p in COMMON_CODE + stage.get('code', [])]
+    hashes = {
+        'inputs': {k: get_path_hash(cfg.paths[k], file_hashes)
+            for k in stage['inputs']},
+        'outputs': {k: get_path_hash(cfg.paths[k], file_hashes)
+            for k in stage['outputs']},
+        'code': {os.path.basename(p): get_path_hash(p, file_hashes)
+            for p in code_paths},
+    }
+    return hashes
+
+
+def get_rewritten_outputs(stage, stages):
+    '''
+    Outputs of stage that later stages also write (e.g. updating them in
+    place), so their hashes are expected to change after stage runs.
+    '''
+    names = [s['name'] for s in stages]
+    if stage['name'] not in names:
+        return set()
+    later_stages = stages[names.index(stage['name']) + 1:]
+    return set(stage['outputs']) & set(util.flatten(
+        s['outputs'] for s in later_stages))
+
+
+def is_up_to_date(stage, state, file_hashes, stages=None):
+    '''
+    Outputs rewritten by later stages are only required to exist: the
+    later stages check their hashes.
+    '''
+    last_hashes = state['stages'].get(stage['name'])
+    if last_hashes is None:
+        return False
+    hashes = get_stage_hashes(stage, file_hashes)
+    if any(h is None for h in hashes['outputs'].values()):
+        return False
+    rewritten = get_rewritten_outputs(
+        stage, cfg.pipeline_stages if stages is None else stages)
+    hashes, last_hashes = [
+        dict(h, outputs={k: v for k, v in h['outputs'].items()
+            if k not in rewritten})
+        for h in [hashes, last_hashes]]
+    return hashes == last_hashes
+
+
+def get_stages_deps(stages):
+    '''
+    Gets, for each stage, the indexes of the stages it depends on.
+    A stage depends on the last previous stage that outputs each of its inputs.
+    '''
+    deps = []
+    for i, stage in enumerate(stages):
+        deps_ = set()
+        for key in stage['inputs']:
+            for j in reversed(range(i)):
+                if key in stages[j]['outputs']:
+                    deps_.add(j)
+                    break
+        deps.append(deps_)
+    return deps
+
+
+def get_stages_waves(stages):
+    '''
+    Groups stages in waves where each stage depends only on previous waves.
+    '''
+    deps = get_stages_deps(stages)
+    levels = []
+    for deps_ in deps:
+        levels.append(1 + max((levels[j] for j in deps_), default=-1))
+    waves = [[] for __ in range(max(levels, default=-1) + 1)]
+    for stage, level in zip(stages, levels):
+        waves[level].append(stage)
+    return waves
+
+
+def select_stages(stages, from_stage=None, only_stages=None):
+    names = [s['name'] for s in stages]
+    for name in [from_stage] + list(only_stages or []):
+        if name is not None and name not in names:
+            raise ValueError('unknown stage "{}". options: {}'.format(
+                name, ', '.join(names)))
+    if from_stage is not None:
+        stages = stages[names.index(from_stage):]
+    if only_stages is not None:
+        stages = [s for s in stages if s['name'] in only_stages]
+    return stages
+
+
+def run_stage(stage, state, file_hashes, force=False):
+    info = util.get_info_fn('[{}]'.format(stage['name']))
+    if not force and is_up_to_date(stage, state, file_hashes):
+        info('inputs, outputs and code unchanged, skipping')
+        return True
+    info('running')
+    try:
+        util.run_cmd([sys.executable, get_script_path(stage)], cwd=_FILE_DIR)
+    except Exception as e:
+        info('ERROR: "{}"'.format(e))
+        return False
+    state['stages'][stage['name']] = get_stage_hashes(stage, file_hashes)
+    info('done')
+    return True
+
+
+def load_state(path):
+    if not os.path.isfile(path):
+        return {'stages': {}, 'file-hashes': {}}
+    return util.load_json(path)
+
+
+def run_pipeline(stages, force=False, n_threads=None):
+    state = load_state(cfg.paths['pipeline-state'])
+    file_hashes = state['file-hashes']
+    for wave in get_stages_waves(stages):
+        pool = ThreadPool(n_threads or len(wave))
+        oks = pool.map(
+            lambda s: run_stage(s, state, file_hashes, force=force), wave)
+        pool.close()
+        util.save_json(cfg.paths['pipeline-state'], state)
+        if not all(oks):
+            failed = [s['name'] for s, ok in zip(wave, oks) if not ok]
+            print('ERROR: stages {} failed, stopping'.format(failed))
+            return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--from', dest='from_stage', default=None,
+        help='run only this stage and the ones after it')
+    parser.add_argument('--only', nargs='+', default=None,
+        help='run only these stages')
+    parser.add_argument('--force', action='store_true',
+        help='run selected stages even if they are up to date')
+    parser.add_argument('--n-threads', type=int, default=None,
+        help='max. number of stages to run in parallel')
+    parser.add_argument('--list', action='store_true',
+        help='list stages and exit')
+    args = parser.parse_args()
+
+    stages = select_stages(cfg.pipeline_stages, args.from_stage, args.only)
+    if args.list:
+        for i, wave in enumerate(get_stages_waves(stages)):
+            print('wave #{}: {}'.format(i+1, ', '.join(s['name'] for s in wave)))
+        return
+
+    ok = run_pipeline(stages, force=args.force, n_threads=args.n_threads)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
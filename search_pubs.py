@@ -11,6 +11,7 @@ import sys
 import scholarly as scholar
 import util
 import config as cfg
+import metas_table
 import random
 import time
 
@@ -94,7 +95,8 @@ def main():
         queries = util.read_lines(queries_list_path)
         queries = list(enumerate(queries))
     else:
-        papers_metadata = util.load_json(cfg.paths['papers-metadata'])
+        papers_metadata = metas_table.load_papers_metas(
+            columns=['uid', 'title'])
         queries = [(m['uid'], m['title']) for m in papers_metadata]
         results_dir_path = cfg.paths['search-pubs-results-dir']
 
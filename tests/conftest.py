@@ -0,0 +1,22 @@
+import os
+import sys
+import pytest
+
+
+_ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [_ROOT_DIR, os.path.join(_ROOT_DIR, 'crawl')]
+
+import config as cfg
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    '''
+    Redirects all paths in the data dir to a temporary dir.
+    '''
+    src_dir = cfg.paths['data-dir']
+    for key, path in list(cfg.paths.items()):
+        if isinstance(path, str) and path.startswith(src_dir):
+            monkeypatch.setitem(
+                cfg.paths, key, str(tmp_path) + path[len(src_dir):])
+    return tmp_path
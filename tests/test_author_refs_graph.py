@@ -0,0 +1,57 @@
+import random
+from collections import Counter
+
+import mk_citation_graphs
+from csr_graph import CSRGraph
+
+
+def _mk_random_metas_cited(seed, n_papers=40, n_authors=15, n_titles=30):
+    rng = random.Random(seed)
+    metas = [{
+        'uid': 'u{}'.format(i),
+        'norm-title': 't{}'.format(rng.randrange(n_titles)),
+        'norm-authors': ['a{}'.format(rng.randrange(n_authors))
+            for __ in range(rng.randint(1, 3))],
+    } for i in range(n_papers)]
+    titles = sorted({m['norm-title'] for m in metas})
+    cited = {m['uid']: set(rng.sample(titles, rng.randint(0, 5)))
+        for m in metas}
+    return metas, cited
+
+
+def _get_author_refs_counts(metas, cited):
+    '''
+    Brute force: one count per (citing paper, cited paper, citing author,
+    cited author).
+    '''
+    counts = Counter()
+    for meta in metas:
+        for meta_ in metas:
+            if meta_['norm-title'] in cited[meta['uid']]:
+                for a in set(meta['norm-authors']):
+                    for b in set(meta_['norm-authors']):
+                        counts[a, b] += 1
+    return counts
+
+
+def test_author_refs_graph_matches_brute_force():
+    for seed in range(10):
+        metas, cited = _mk_random_metas_cited(seed)
+        graph = mk_citation_graphs.get_author_refs_graph(metas, cited)
+        counts = _get_author_refs_counts(metas, cited)
+        src, dst = graph.get_edges()
+        edges = {(graph.nodes[u], graph.nodes[v]): w
+            for u, v, w in zip(src, dst, graph.weights)}
+        assert edges == dict(counts)
+
+
+def test_weights_survive_npz_round_trip(tmp_path):
+    metas, cited = _mk_random_metas_cited(0)
+    graph = mk_citation_graphs.get_author_refs_graph(metas, cited)
+    path = str(tmp_path / 'graph.npz')
+    loaded = CSRGraph.load(graph.save(path))
+    assert loaded.nodes == graph.nodes
+    assert (loaded.weights == graph.weights).all()
+    assert (loaded.out_weights() == graph.out_weights()).all()
+    rev = loaded.reverse()
+    assert rev.weights.sum() == graph.weights.sum()
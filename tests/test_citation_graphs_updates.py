@@ -0,0 +1,142 @@
+import os
+import filecmp
+import random
+import pytest
+import numpy as np
+
+import util
+import config as cfg
+import mk_citation_graphs
+
+
+_WORDS = ['attention', 'neural', 'machine', 'translation', 'learning',
+    'deep', 'graph', 'model', 'sparse', 'networks', 'bayesian', 'policy']
+_AUTHORS = ['a-{}'.format(i) for i in range(30)]
+
+
+class _Collection:
+    '''
+    Random papers metadata/refs, with random changes.
+    '''
+    def __init__(self, seed, n_papers=50):
+        self.rng = random.Random(seed)
+        self.n_uids = 0
+        self.metas = [self.mk_meta() for __ in range(n_papers)]
+        self.refs = {m['uid']: self.mk_refs() for m in self.metas}
+
+
+    def mk_title(self):
+        return '-'.join(self.rng.choices(_WORDS, k=self.rng.randint(2, 6)))
+
+
+    def mk_meta(self):
+        self.n_uids += 1
+        return {
+            'uid': 'u{}'.format(self.n_uids),
+            'norm-title': self.mk_title(),
+            'norm-authors': self.rng.sample(
+                _AUTHORS, self.rng.randint(1, 3)),
+        }
+
+
+    def mk_refs(self):
+        refs = []
+        for __ in range(self.rng.randint(0, 8)):
+            title = self.rng.choice(self.metas)['norm-title'] \
+                if self.metas and self.rng.random() < 0.6 else self.mk_title()
+            if self.rng.random() < 0.3:
+                #typo, matched only by similarity
+                i = self.rng.randrange(len(title))
+                title = title[:i] + title[i+1:]
+            refs.append({'norm-title': title,
+                'norm-authors': self.rng.sample(_AUTHORS, 1)})
+        return refs
+
+
+    def change(self):
+        rng = self.rng
+        for __ in range(rng.randint(1, 4)):
+            op = rng.random()
+            if op < 0.3:
+                meta = self.mk_meta()
+                if rng.random() < 0.3:
+                    meta['norm-title'] = rng.choice(self.metas)['norm-title']
+                self.metas.insert(rng.randrange(len(self.metas) + 1), meta)
+                self.refs[meta['uid']] = self.mk_refs()
+            elif op < 0.45 and len(self.metas) > 5:
+                meta = self.metas.pop(rng.randrange(len(self.metas)))
+                del self.refs[meta['uid']]
+            elif op < 0.6:
+                rng.choice(self.metas)['norm-title'] = self.mk_title()
+            elif op < 0.75:
+                rng.choice(self.metas)['norm-authors'] = rng.sample(
+                    _AUTHORS, rng.randint(1, 3))
+            else:
+                self.refs[rng.choice(self.metas)['uid']] = self.mk_refs()
+
+
+    def save(self):
+        util.save_json(cfg.paths['papers-metadata'], self.metas)
+        with open(cfg.paths['papers-refs'], 'w') as f:
+            for meta in self.metas:
+                util.append_paper_refs(f, meta['uid'], self.refs[meta['uid']])
+
+
+def _set_data_dir(paths, src_dir, dst_dir):
+    for key, path in paths.items():
+        if isinstance(path, str) and path.startswith(src_dir):
+            cfg.paths[key] = dst_dir + path[len(src_dir):]
+
+
+def _assert_same_files(dir_1, dir_2):
+    for filename in sorted(os.listdir(dir_2)):
+        path_1 = os.path.join(dir_1, filename)
+        path_2 = os.path.join(dir_2, filename)
+        if filename.endswith('.npz'):
+            with np.load(path_1) as data_1, np.load(path_2) as data_2:
+                assert sorted(data_1.files) == sorted(data_2.files)
+                for key in data_2.files:
+                    assert data_1[key].dtype == data_2[key].dtype
+                    assert (data_1[key] == data_2[key]).all(), \
+                        (filename, key)
+        else:
+            assert filecmp.cmp(path_1, path_2, shallow=False), filename
+
+
+@pytest.mark.parametrize('fuzzy', [False, True])
+def test_updates_match_full_builds(data_dir, capsys, monkeypatch, fuzzy):
+    monkeypatch.setattr(mk_citation_graphs, 'FUZZY_TITLE_MATCHING', fuzzy)
+    paths = dict(cfg.paths)
+    delta_dir = data_dir / 'delta'
+    full_dir = data_dir / 'full'
+    delta_dir.mkdir()
+    full_dir.mkdir()
+    collection = _Collection(seed=0)
+
+    _set_data_dir(paths, str(data_dir), str(delta_dir))
+    collection.save()
+    mk_citation_graphs.mk_citation_graphs()
+    for __ in range(10):
+        collection.change()
+        _set_data_dir(paths, str(data_dir), str(delta_dir))
+        collection.save()
+        mk_citation_graphs.update_citation_graphs()
+        _set_data_dir(paths, str(data_dir), str(full_dir))
+        collection.save()
+        mk_citation_graphs.mk_citation_graphs()
+        _assert_same_files(str(delta_dir), str(full_dir))
+        #citations hists are updated too, from the patched graphs
+        _set_data_dir(paths, str(data_dir), str(delta_dir))
+        for term in ['titles', 'authors']:
+            rev_graph = util.load_graph(
+                cfg.paths['{}-refs-rev-graph'.format(term)])
+            assert util.load_csv_hist(cfg.paths['{}-refs-hist'.format(term)]) \
+                == {k: len(v) for k, v in rev_graph.items()}
+
+
+def test_update_without_state_rebuilds(data_dir, capsys):
+    collection = _Collection(seed=1)
+    collection.save()
+    mk_citation_graphs.update_citation_graphs()
+    assert 'rebuilding' in capsys.readouterr().out
+    assert os.path.isfile(cfg.paths['citation-graphs-state'])
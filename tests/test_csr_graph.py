@@ -0,0 +1,102 @@
+import random
+import numpy as np
+import pytest
+
+import util
+import csr_graph
+from csr_graph import CSRGraph
+
+
+def _get_rand_graph(n_nodes, n_extra_nodes, seed):
+    '''
+    Graph with edges to nodes that are not keys, like refs titles.
+    '''
+    rng = random.Random(seed)
+    nodes = ['node-{}'.format(i) for i in range(n_nodes + n_extra_nodes)]
+    return {n: set(rng.sample(nodes, rng.randint(0, 8)))
+        for n in nodes[:n_nodes]}
+
+
+def _assert_equal_graphs(graph, graph_):
+    assert graph.nodes == graph_.nodes
+    assert graph.n_keys == graph_.n_keys
+    assert np.array_equal(graph.indptr, graph_.indptr)
+    assert np.array_equal(graph.indices, graph_.indices)
+    if graph.weights is None:
+        assert graph_.weights is None
+    else:
+        assert np.array_equal(graph.weights, graph_.weights)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_dict_round_trip(seed):
+    graph = _get_rand_graph(40, 10, seed)
+    csr = CSRGraph.from_dict(graph)
+    assert csr.to_dict() == graph
+    assert csr.nodes[:csr.n_keys] == sorted(graph.keys())
+    #degrees against brute force
+    out_degrees = [len(graph[n]) for n in csr.nodes[:csr.n_keys]]
+    assert csr.out_degrees()[:csr.n_keys].tolist() == out_degrees
+    in_degrees = [sum(n in v for v in graph.values()) for n in csr.nodes]
+    assert csr.in_degrees().tolist() == in_degrees
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_reverse_matches_rev_graph(seed):
+    graph = _get_rand_graph(40, 10, seed)
+    assert CSRGraph.from_dict(graph).reverse().to_dict() == \
+        util.get_rev_graph(graph)
+
+
+def test_from_edges_sums_weights():
+    graph = CSRGraph.from_edges(['a', 'b', 'c'],
+        [2, 0, 0, 2, 0], [0, 1, 1, 0, 2], weights=[1, 2, 3, 4, 5])
+    assert graph.to_dict() == {'a': {'b', 'c'}, 'b': set(), 'c': {'a'}}
+    assert graph.weights.tolist() == [5, 5, 5]
+    assert graph.out_weights().tolist() == [10, 0, 5]
+
+
+@pytest.mark.parametrize('weighted', [False, True])
+def test_npz_round_trip(tmp_path, weighted):
+    graph = CSRGraph.from_dict(_get_rand_graph(40, 10, 0))
+    if weighted:
+        graph.weights = np.arange(graph.n_edges, dtype=np.int64)
+    path = graph.save(str(tmp_path / 'graph.npz'))
+    _assert_equal_graphs(graph, CSRGraph.load(path))
+
+
+def test_empty_graph(tmp_path):
+    graph = CSRGraph.from_dict({})
+    assert graph.to_dict() == {}
+    _assert_equal_graphs(graph,
+        CSRGraph.load(graph.save(str(tmp_path / 'graph.npz'))))
+
+
+def test_json_and_npz_files(tmp_path):
+    graph = _get_rand_graph(40, 10, 0)
+    json_path = str(tmp_path / 'graph.json')
+    npz_path = str(tmp_path / 'graph.npz')
+    util.save_graph(json_path, graph)
+    csr_graph.save_graph(npz_path, csr_graph.load_graph(json_path))
+    assert csr_graph.load_graph(npz_path).to_dict() == graph
+    csr_graph.save_graph(json_path, csr_graph.load_graph(npz_path))
+    assert util.load_graph(json_path) == graph
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_subgraph_matches_induced_dict(seed):
+    rng = random.Random(seed)
+    graph = _get_rand_graph(40, 10, seed)
+    csr = CSRGraph.from_dict(graph)
+    csr.weights = np.arange(1, csr.n_edges + 1)
+    weights = {(csr.nodes[u], csr.nodes[v]): w for u, v, w in zip(
+        *csr.get_edges(), csr.weights.tolist())}
+    node_ids = rng.sample(range(len(csr)), rng.randint(0, len(csr)))
+    nodes = [csr.nodes[i] for i in node_ids]
+    sub = csr.subgraph(node_ids)
+    assert sub.nodes == nodes
+    assert sub.to_dict() == {n: graph.get(n, set()) & set(nodes)
+        for n in nodes}
+    assert {(sub.nodes[u], sub.nodes[v]): w for u, v, w in zip(
+        *sub.get_edges(), sub.weights.tolist())} == {
+        e: w for e, w in weights.items() if e[0] in nodes and e[1] in nodes}
@@ -0,0 +1,86 @@
+import json
+import random
+import numpy as np
+import pandas as pd
+
+import dedup_pubs
+
+
+def _mk_pub(uid, title, authors, source, **kwargs):
+    pub = {'uid': uid, 'title': title, 'authors': authors, 'year': 2019,
+        'source': source, 'abstract': 'abstract of ' + title, 'url': ''}
+    pub.update(kwargs)
+    return pub
+
+
+def test_main_saves_canonical_pubs(tmp_path, monkeypatch):
+    src_dir = tmp_path / 'jsons'
+    src_dir.mkdir()
+    pubs = [
+        _mk_pub('dblp-1', 'Attention Is All You Need',
+            ['Ashish Vaswani', 'Noam Shazeer'], 'dblp', url='u'),
+        _mk_pub('arxiv-1', 'Attention is all you need.',
+            ['Vaswani, Ashish', 'Shazeer, Noam'], 'arxiv', url='u'),
+        _mk_pub('dblp-2', 'Deep Residual Learning for Image Recognition',
+            ['Kaiming He'], 'dblp', url='u'),
+    ]
+    for pub in pubs:
+        with open(str(src_dir / (pub['uid'] + '.json')), 'w') as f:
+            json.dump(pub, f)
+    monkeypatch.setattr(dedup_pubs, 'SRC_DIR_PATH', str(src_dir))
+    monkeypatch.setattr(dedup_pubs, 'DST_PATH', str(tmp_path / 'dedup.csv'))
+    monkeypatch.setattr(
+        dedup_pubs, 'DUPS_DST_PATH', str(tmp_path / 'dups.csv'))
+
+    dedup_pubs.main()
+
+    df = pd.read_csv(str(tmp_path / 'dedup.csv'))
+    assert sorted(df['uid']) == ['arxiv-1', 'dblp-2']
+    dups = pd.read_csv(str(tmp_path / 'dups.csv'))
+    assert dict(zip(dups['uid'], dups['canonical-uid'])) == {
+        'arxiv-1': 'arxiv-1', 'dblp-1': 'arxiv-1', 'dblp-2': 'dblp-2'}
+
+
+def test_get_clusters_empty():
+    sigs = np.empty((0, dedup_pubs.N_BANDS*dedup_pubs.N_ROWS),
+        dtype=np.uint32)
+    labels = dedup_pubs.get_clusters(sigs)
+    assert len(labels) == 0
+    assert labels.dtype.kind == 'i'
+    assert dedup_pubs.dedup_pubs([]) == ([], {})
+
+
+def _jaccard(a, b):
+    return len(a & b)/len(a | b)
+
+
+def test_dedup_matches_exact_jaccard():
+    rng = random.Random(0)
+    words = ['neural', 'networks', 'graph', 'learning', 'sparse', 'attention',
+        'bayesian', 'inference', 'policy', 'optimization', 'models', 'deep']
+    pubs = []
+    for i in range(60):
+        title = ' '.join(rng.sample(words, 6))
+        authors = ['Author{} Name'.format(rng.randrange(1000))
+            for __ in range(2)]
+        pubs.append(_mk_pub('p{}'.format(i), title, authors, 'dblp'))
+        if i % 3 == 0:
+            #near duplicate: same pub with a typo in the title
+            pubs.append(_mk_pub('d{}'.format(i), title + 's', authors,
+                'arxiv'))
+    canon_ids, canon_uids = dedup_pubs.dedup_pubs(pubs)
+    #same results reading pubs in chunks
+    assert dedup_pubs.dedup_pubs(iter(pubs), chunk_size=7) == \
+        (canon_ids, canon_uids)
+    assert {pubs[i]['uid'] for i in canon_ids} == set(canon_uids.values())
+
+    shingles = [dedup_pubs.get_shingles(p) for p in pubs]
+    for i in range(len(pubs)):
+        for j in range(i + 1, len(pubs)):
+            sim = _jaccard(shingles[i], shingles[j])
+            same = canon_uids[pubs[i]['uid']] == canon_uids[pubs[j]['uid']]
+            #far from the threshold, lsh is virtually always right
+            if sim >= 0.9:
+                assert same, (pubs[i]['title'], pubs[j]['title'], sim)
+            elif sim <= 0.3:
+                assert not same, (pubs[i]['title'], pubs[j]['title'], sim)
@@ -0,0 +1,64 @@
+import random
+import numpy as np
+import pytest
+from collections import Counter
+
+import dtm
+import util
+
+
+_WORDS = ['deep', 'learning', 'of', 'the', 'neural', 'networks', 'graph',
+    'citation', 'Analysis', 'models', 'ünicode']
+
+
+def _get_rand_texts(n_texts, seed):
+    rng = random.Random(seed)
+    return [' '.join(rng.choice(_WORDS) for __ in range(rng.randint(0, 20)))
+        + rng.choice(['', '.', ', 2020!']) for __ in range(n_texts)]
+
+
+def _get_words(text):
+    return [w for w in util.slugify(text).split('-') if w]
+
+
+@pytest.mark.parametrize('seed', range(3))
+@pytest.mark.parametrize('chunk_size', [1, 7, 100])
+def test_dtm_matches_words_counts(seed, chunk_size):
+    texts = _get_rand_texts(50, seed)
+    mat, vocab = dtm.mk_dtm(texts, chunk_size)
+    assert vocab == sorted(set(w for t in texts for w in _get_words(t)))
+    assert mat.shape == (len(texts), len(vocab))
+    for i, text in enumerate(texts):
+        row = mat.getrow(i)
+        assert dict(zip([vocab[j] for j in row.indices], row.data.tolist())) \
+            == Counter(_get_words(text))
+    assert dtm.get_terms_counts(mat, vocab) == util.count_tokens(texts)
+
+
+def test_tfidf_matches_dense_formula():
+    texts = _get_rand_texts(30, 0) + ['']
+    mat, __ = dtm.mk_dtm(texts)
+    counts = mat.toarray().astype(np.float64)
+    dfs = (counts > 0).sum(axis=0)
+    tfidf = counts*(np.log((1 + len(texts))/(1 + dfs)) + 1)
+    norms = np.linalg.norm(tfidf, axis=1, keepdims=True)
+    tfidf /= np.where(norms == 0, 1, norms)
+    assert np.allclose(dtm.get_tfidf(mat).toarray(), tfidf, atol=1e-6)
+
+
+def test_save_load_round_trip(tmp_path):
+    texts = _get_rand_texts(30, 0)
+    mat, vocab = dtm.mk_dtm(texts)
+    doc_ids = ['doc-{}'.format(i) for i in range(len(texts))]
+    path = dtm.save_dtm(str(tmp_path / 'dtm.npz'), mat, vocab, doc_ids)
+    mat_, vocab_, doc_ids_ = dtm.load_dtm(path)
+    assert (mat_ != mat).nnz == 0
+    assert (vocab_, doc_ids_) == (vocab, doc_ids)
+
+
+def test_empty_texts(tmp_path):
+    mat, vocab = dtm.mk_dtm([])
+    assert mat.shape == (0, 0) and vocab == []
+    mat_, vocab_, doc_ids_ = dtm.load_dtm(
+        dtm.save_dtm(str(tmp_path / 'dtm.npz'), mat, vocab, []))
+    assert mat_.shape == (0, 0) and vocab_ == doc_ids_ == []
@@ -0,0 +1,91 @@
+import os
+import sys
+import stat
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+
+import config as cfg
+import extract_raw_refs_from_pdfs as extract
+from extractrefs_pool import ExtractRefsPool, ExtractRefsWorker
+
+
+#stands in for extractrefs.py (same cli and protocol): one ref per line
+_SCRIPT = '''#!{}
+import os
+import sys
+import json
+
+def extract(path):
+    if 'crash' in path:
+        os._exit(1)
+    with open(path) as f:
+        return [{{'raw_ref': l.strip(), 'pid': os.getpid()}}
+            for l in f if l.strip()]
+
+if sys.argv[1] == '--serve':
+    for line in iter(sys.stdin.readline, ''):
+        try:
+            refs = extract(json.loads(line)['pdf_path'])
+            lines = [json.dumps({{'ref': r}}) for r in refs]
+            lines.append(json.dumps({{'done': True}}))
+        except Exception as e:
+            lines = [json.dumps({{'error': str(e)}})]
+        sys.stdout.write(''.join(l + '\\n' for l in lines))
+        sys.stdout.flush()
+else:
+    with open(sys.argv[2], 'w') as f:
+        json.dump(extract(sys.argv[1]), f)
+'''
+
+
+@pytest.fixture
+def script_path(tmp_path, monkeypatch):
+    path = str(tmp_path / 'extractrefs.py')
+    with open(path, 'w') as f:
+        f.write(_SCRIPT.format(sys.executable))
+    os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+    monkeypatch.setattr(cfg, 'extract_refs_script_path', path)
+    return path
+
+
+def _mk_pdfs(tmp_path, n):
+    paths = []
+    for i in range(n):
+        path = str(tmp_path / '{}.pdf'.format(i))
+        with open(path, 'w') as f:
+            f.write(''.join('ref {} {}\n'.format(i, j) for j in range(i % 4)))
+        paths.append(path)
+    return paths
+
+
+def _get_raw_refs(refs):
+    return [r['raw_ref'] for r in refs]
+
+
+def test_pool_matches_one_process_per_pdf(script_path, tmp_path):
+    paths = _mk_pdfs(tmp_path, 12)
+    expected = [_get_raw_refs(extract.extract_refs(p)) for p in paths]
+    with ExtractRefsPool(3, script_path) as pool:
+        with ThreadPoolExecutor(3) as executor:
+            refs = list(executor.map(pool.extract, paths))
+    assert [_get_raw_refs(r) for r in refs] == expected
+
+
+def test_worker_restarts(script_path, tmp_path):
+    paths = _mk_pdfs(tmp_path, 6)
+    worker = ExtractRefsWorker(script_path, max_n_jobs=2)
+    try:
+        pids = [worker.extract(p)[0]['pid'] for p in paths[1:4]]
+        assert pids[0] == pids[1] != pids[2]
+        #crashed worker raises and is replaced on the next job
+        crash_path = str(tmp_path / 'crash.pdf')
+        open(crash_path, 'w').close()
+        with pytest.raises(RuntimeError):
+            worker.extract(crash_path)
+        assert _get_raw_refs(worker.extract(paths[5])) == ['ref 5 0']
+        #extraction errors don't kill the worker
+        with pytest.raises(ValueError):
+            worker.extract(str(tmp_path / 'missing.pdf'))
+        assert worker.is_alive
+    finally:
+        worker.stop()
@@ -0,0 +1,55 @@
+import random
+import socket
+import pytest
+
+pytest.importorskip('aiohttp')
+
+import refparser
+import freecite_client
+import mock_freecite_server
+
+
+def _get_free_port():
+    with socket.socket() as s:
+        s.bind((mock_freecite_server.DEF_HOST, 0))
+        return s.getsockname()[1]
+
+
+def _parse_with_mock_server(refs, error_rate=0.0, **kwargs):
+    async def parse():
+        port = _get_free_port()
+        runner = await mock_freecite_server.start_server(
+            mock_freecite_server.mk_app(latency=0.01, error_rate=error_rate),
+            port=port)
+        url = 'http://{}:{}/citations/create'.format(
+            mock_freecite_server.DEF_HOST, port)
+        client = freecite_client.FreeCiteClient(
+            url=url, verbose=False, **kwargs)
+        try:
+            return await client.parse(refs)
+        finally:
+            await runner.cleanup()
+    return freecite_client.run(parse())
+
+
+_REFS = ['[{}] A. Author, B. Other{}. Title number {} of a paper. '
+    'In Conf, {}.'.format(i, i % 5, i, 2000 + i % 20) for i in range(37)]
+
+
+def test_batches_match_one_request_per_ref():
+    expected = [refparser.parse_ref(r) for r in _REFS]
+    assert _parse_with_mock_server(_REFS, batch_size=1) == expected
+    assert _parse_with_mock_server(
+        _REFS, batch_size=8, max_n_in_flight=2) == expected
+
+
+def test_retries_on_server_errors():
+    random.seed(0)
+    expected = [refparser.parse_ref(r) for r in _REFS]
+    assert _parse_with_mock_server(_REFS, error_rate=0.3, batch_size=4,
+        max_n_retries=16, backoff=0.001) == expected
+
+
+def test_failed_batches_give_empty_results():
+    assert _parse_with_mock_server(_REFS, error_rate=1.0, batch_size=4,
+        max_n_retries=1, backoff=0.001) == [{} for __ in _REFS]
@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+from scipy import sparse
+
+import mk_graph_clusters
+from csr_graph import CSRGraph
+
+
+def _get_planted_mat(n_blocks, block_size, p_in, p_out, seed):
+    '''
+    Directed graph with dense blocks of nodes and sparse edges between them.
+    '''
+    rng = np.random.RandomState(seed)
+    n = n_blocks*block_size
+    blocks = np.repeat(np.arange(n_blocks), block_size)
+    probs = np.where(blocks[:, None] == blocks[None, :], p_in, p_out)
+    dense = (rng.rand(n, n) < probs)*rng.randint(1, 4, (n, n))
+    np.fill_diagonal(dense, 0)
+    return sparse.csr_matrix(dense), blocks
+
+
+def _dense_modularity(mat, labels, resolution):
+    dense = mat.toarray()
+    degrees = dense.sum(axis=1)
+    m2 = dense.sum()
+    same = labels[:, None] == labels[None, :]
+    return ((dense - resolution*np.outer(degrees, degrees)/m2)*same).sum()/m2
+
+
+def _is_same_partition(labels, labels_):
+    pairs = set(zip(labels.tolist(), labels_.tolist()))
+    return len(pairs) == len(set(labels.tolist())) == len(set(labels_.tolist()))
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('resolution', [0.5, 1.0, 2.0])
+def test_modularity_matches_dense(seed, resolution):
+    mat, __ = _get_planted_mat(3, 10, 0.3, 0.1, seed)
+    mat = mk_graph_clusters.get_undirected(mat)
+    labels = np.random.RandomState(seed).randint(0, 4, mat.shape[0])
+    assert mk_graph_clusters.get_modularity(mat, labels, resolution) == \
+        pytest.approx(_dense_modularity(mat, labels, resolution))
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_planted_partition_is_recovered(seed):
+    mat, blocks = _get_planted_mat(4, 15, 0.5, 0.01, seed)
+    mat = mk_graph_clusters.get_undirected(mat)
+    clusters, __ = mk_graph_clusters.get_louvain_clusters(mat)
+    assert _is_same_partition(clusters, blocks)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_clusters_modularity(seed):
+    mat, blocks = _get_planted_mat(4, 15, 0.2, 0.05, seed)
+    mat = mk_graph_clusters.get_undirected(mat)
+    clusters, n_levels = mk_graph_clusters.get_louvain_clusters(mat)
+    assert n_levels >= 1
+    #labels by decreasing size
+    sizes = np.bincount(clusters)
+    assert (np.diff(sizes) <= 0).all()
+    modularity = mk_graph_clusters.get_modularity(mat, clusters)
+    assert modularity > mk_graph_clusters.get_modularity(
+        mat, np.arange(mat.shape[0]))
+    assert modularity >= mk_graph_clusters.get_modularity(mat, blocks) - 0.02
+
+
+def test_clusters_within_components():
+    #three planted blocks without edges between them, plus isolated nodes
+    mat, blocks = _get_planted_mat(3, 10, 0.3, 0.0, 0)
+    mat = sparse.block_diag([mat, sparse.csr_matrix((4, 4))]).tocsr()
+    comps = mk_graph_clusters.get_components(mat)
+    assert _is_same_partition(comps, np.concatenate([blocks, 3 + np.arange(4)]))
+    clusters, __ = mk_graph_clusters.get_louvain_clusters(
+        mk_graph_clusters.get_undirected(mat))
+    for c in range(clusters.max() + 1):
+        assert len(set(comps[clusters == c].tolist())) == 1
+
+
+def test_clusters_summaries():
+    graph = CSRGraph.from_dict({'a': {'b'}, 'b': {'a', 'c'}, 'c': {'b'},
+        'd': {'a'}})
+    graph.weights = np.array([2, 1, 1, 1, 3])
+    clusters = np.array([0, 0, 1, 1])
+    comps = np.array([0, 0, 0, 0])
+    summaries = mk_graph_clusters.get_clusters_summaries(
+        graph, comps, clusters, n_top_nodes=1)
+    assert [(s['n-nodes'], s['n-edges'], s['weight'], s['top-nodes'])
+        for s in summaries] == [(2, 2, 3, 'a'), (2, 0, 0, 'c')]
+
+
+def test_empty_graph():
+    mat = sparse.csr_matrix((0, 0))
+    clusters, n_levels = mk_graph_clusters.get_louvain_clusters(mat)
+    assert len(clusters) == 0 and n_levels == 0
+    assert len(mk_graph_clusters.get_components(mat)) == 0
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+from scipy import sparse
+
+import util
+import config as cfg
+import mk_graph_ranks
+from csr_graph import CSRGraph
+
+
+def _get_rand_mat(n, density, seed):
+    rng = np.random.RandomState(seed)
+    mat = sparse.random(n, n, density=density, random_state=rng,
+        data_rvs=lambda size: rng.randint(1, 5, size)).tocsr()
+    mat.setdiag(0)
+    mat.eliminate_zeros()
+    return mat
+
+
+def _dense_pagerank(mat, damping):
+    '''
+    Solves the linear system of the stationary distribution.
+    '''
+    mat = mat.toarray()
+    n = mat.shape[0]
+    out_weights = mat.sum(axis=1)
+    trans = np.where(out_weights[:, None] > 0,
+        mat/np.maximum(out_weights, 1)[:, None], 1/n)
+    return np.linalg.solve(np.eye(n) - damping*trans.T,
+        np.full(n, (1 - damping)/n))
+
+
+def _get_principal_eigenvector(mat):
+    vals, vecs = np.linalg.eigh(mat)
+    vec = np.abs(vecs[:, np.argmax(vals)])
+    return vec/vec.sum()
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('density', [0.05, 0.2])
+def test_pagerank_matches_dense(seed, density):
+    mat = _get_rand_mat(40, density, seed)
+    scores, __ = mk_graph_ranks.get_pagerank(mat)
+    assert scores.sum() == pytest.approx(1)
+    assert np.allclose(scores, _dense_pagerank(mat, mk_graph_ranks.DAMPING),
+        atol=1e-9)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_hits_matches_dense(seed):
+    mat = _get_rand_mat(30, 0.3, seed)
+    hubs, auths, __ = mk_graph_ranks.get_hits(mat)
+    dense = mat.toarray().astype(np.float64)
+    assert np.allclose(hubs, _get_principal_eigenvector(dense.dot(dense.T)),
+        atol=1e-8)
+    assert np.allclose(auths, _get_principal_eigenvector(dense.T.dot(dense)),
+        atol=1e-8)
+
+
+def test_empty_graphs():
+    scores, __ = mk_graph_ranks.get_pagerank(sparse.csr_matrix((0, 0)))
+    assert len(scores) == 0
+    hubs, auths, __ = mk_graph_ranks.get_hits(sparse.csr_matrix((3, 3)))
+    assert np.allclose(hubs, 1/3) and np.allclose(auths, 1/3)
+
+
+def test_scores_hist_round_trip(tmp_path):
+    hist = {'a': 1.5e-12, 'b': 0.25, 'c': 3}
+    path = str(tmp_path / 'hist.csv')
+    util.save_csv_hist(path, hist)
+    assert util.load_csv_hist(path) == hist
+
+
+def test_ranks_match_hists(data_dir, capsys):
+    for term, seed in [('titles', 0), ('authors', 1)]:
+        rng = np.random.default_rng(seed)
+        nodes = ['n{}'.format(i) for i in range(30)]
+        graph = {n: set(rng.choice(nodes, rng.integers(0, 5)).tolist())
+            for n in nodes[:20]}
+        CSRGraph.from_dict(graph).save(
+            cfg.paths['{}-refs-graph-csr'.format(term)])
+    mk_graph_ranks.mk_graph_ranks()
+    for term in ['titles', 'authors']:
+        graph = CSRGraph.load(cfg.paths['{}-refs-graph-csr'.format(term)])
+        with np.load(cfg.paths['{}-ranks'.format(term)]) as data:
+            for name in ['pagerank', 'hubs', 'authorities']:
+                hist = util.load_csv_hist(
+                    cfg.paths['{}-{}-hist'.format(term, name)])
+                assert data[name].tolist() == [hist.get(n, 0)
+                    for n in graph.nodes]
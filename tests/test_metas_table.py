@@ -0,0 +1,57 @@
+import os
+import random
+import pytest
+
+import config as cfg
+import metas_table
+
+
+def _mk_random_metas(seed, n=30):
+    rng = random.Random(seed)
+    return [{
+        'uid': 'u{}'.format(i),
+        'title': rng.choice(['A title', 'Another, title', '', 'título']),
+        'norm-authors': ['a{}'.format(rng.randrange(9))
+            for __ in range(rng.randint(0, 3))],
+        'year': rng.choice([2018, '2019', None]),
+        'keywords': rng.choice([None, ['x', 'y'], []]),
+        'extra': {'n': i} if rng.random() < 0.5 else [i],
+    } for i in range(n)]
+
+
+def test_table_round_trip(tmp_path):
+    metas = _mk_random_metas(0)
+    path = metas_table.save_table(str(tmp_path / 'metas.parquet'), metas)
+    assert metas_table.load_table(path) == metas
+    columns = ['uid', 'year', 'extra']
+    assert metas_table.load_table(path, columns) == [
+        {k: m[k] for k in columns} for m in metas]
+    assert metas_table.load_table(path, []) == [{} for __ in metas]
+
+
+def test_unknown_columns_raise(tmp_path):
+    path = metas_table.save_table(
+        str(tmp_path / 'metas.parquet'), _mk_random_metas(1))
+    for columns in [['abstract'], ['uid', 'abstract']]:
+        with pytest.raises(KeyError):
+            metas_table.load_table(path, columns)
+
+
+def test_papers_metas_table_and_json_agree(data_dir):
+    metas = _mk_random_metas(2)
+    metas_table.save_papers_metas(metas)
+    columns = ['uid', 'norm-authors']
+    from_table = metas_table.load_papers_metas(columns)
+    os.remove(cfg.paths['papers-metadata-table'])
+    from_json = metas_table.load_papers_metas(columns)
+    assert from_table == from_json == [
+        {k: m[k] for k in columns} for m in metas]
+    with pytest.raises(KeyError):
+        metas_table.load_papers_metas(['abstract'])
+
+
+def test_papers_metas_table_without_json(data_dir):
+    metas = _mk_random_metas(3)
+    metas_table.save_papers_metas(metas)
+    os.remove(cfg.paths['papers-metadata'])
+    assert metas_table.load_papers_metas() == metas
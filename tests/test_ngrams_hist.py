@@ -0,0 +1,91 @@
+import random
+import functools
+import pytest
+from collections import Counter
+
+pytest.importorskip('nltk')
+
+import mk_histograms
+
+
+_WORDS = ['deep', 'learning', 'of', 'the', 'neural', 'networks', 'for',
+    'graph', 'via', 'citation', 'and', 'Analysis', 'models']
+
+
+def _get_rand_texts(n_texts, seed):
+    rng = random.Random(seed)
+    return [' '.join(rng.choice(_WORDS) for __ in range(rng.randint(0, 20)))
+        + rng.choice(['', '.', ', 2020!']) for __ in range(n_texts)]
+
+
+def _brute_force_ngrams_hist(texts, n):
+    hist = Counter()
+    for text in texts:
+        words = mk_histograms.get_words(text)
+        for i in range(len(words) - n + 1):
+            ngram = words[i:i+n]
+            if ngram[0] not in mk_histograms.STOPWORDS \
+                    and ngram[-1] not in mk_histograms.STOPWORDS:
+                hist[' '.join(ngram)] += 1
+    return dict(hist)
+
+
+@pytest.mark.parametrize('n', [1, 2, 3])
+@pytest.mark.parametrize('n_procs', [1, 2])
+def test_sharded_counts_match_brute_force(monkeypatch, n, n_procs):
+    monkeypatch.setattr(mk_histograms, 'get_shards',
+        functools.partial(mk_histograms.get_shards, shard_size=7))
+    texts = _get_rand_texts(50, n)
+    assert mk_histograms.get_texts_ngrams_hist(texts, n, n_procs) == \
+        _brute_force_ngrams_hist(texts, n)
+
+
+def test_unigrams_match_words_hist():
+    texts = _get_rand_texts(50, 0)
+    words = [w for t in texts for w in mk_histograms.get_words(t)]
+    assert mk_histograms.get_texts_ngrams_hist(texts, 1, 1) == \
+        mk_histograms.get_words_hist(words)
+    assert mk_histograms.get_texts_words_hist(texts) == \
+        mk_histograms.get_words_hist(words)
+
+
+def test_texts_are_read_lazily(monkeypatch):
+    monkeypatch.setattr(mk_histograms, 'get_shards',
+        functools.partial(mk_histograms.get_shards, shard_size=5))
+    n_read = [0]
+    def iter_texts():
+        for text in _get_rand_texts(200, 0):
+            n_read[0] += 1
+            yield text
+    #texts read when each shard's counts are merged
+    n_reads = []
+    iparallelize = mk_histograms.util.iparallelize
+    def iparallelize_(*args, **kwargs):
+        for result in iparallelize(*args, **kwargs):
+            n_reads.append(n_read[0])
+            yield result
+    monkeypatch.setattr(mk_histograms.util, 'iparallelize', iparallelize_)
+    mk_histograms.get_texts_ngrams_hist(iter_texts(), 1, n_procs=2)
+    max_n_pending = mk_histograms.N_PENDING_SHARDS_PER_PROC*2
+    assert len(n_reads) == 40
+    for i, n in enumerate(n_reads):
+        #shards read ahead of merged ones, plus the one being filled
+        assert n <= 5*(i + max_n_pending + 1)
+
+
+def test_top_ngrams_hist(monkeypatch, capsys):
+    monkeypatch.setattr(mk_histograms, 'get_shards',
+        functools.partial(mk_histograms.get_shards, shard_size=5))
+    texts = _get_rand_texts(100, 1)
+    hist = _brute_force_ngrams_hist(texts, 1)
+    #capacity covering all n-grams: exact counts
+    top = mk_histograms.get_texts_top_ngrams_hist(iter(texts), 1, k=5,
+        capacity=len(hist), n_procs=2)
+    assert all(hist[w] == c for w, c in top.items())
+    assert sorted(top.values()) == sorted(hist.values())[-5:]
+    assert 'in flight' in capsys.readouterr().out
+
+
+def test_shards():
+    shards = list(mk_histograms.get_shards(range(10), 4))
+    assert shards == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
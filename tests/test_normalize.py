@@ -0,0 +1,34 @@
+import random
+
+import util
+import bench_normalize
+
+
+def _get_items(fn, n=3000, seed=0):
+    rng = random.Random(seed)
+    return [fn(rng) for __ in range(n)] + ['', ' ', 'Ωmega, Ä.', '---']
+
+
+def test_normalize_authors_match_previous_implementation():
+    authors = _get_items(bench_normalize.get_rand_author)
+    expected = [bench_normalize._normalize_author(a) for a in authors]
+    assert [util.normalize_author(a) for a in authors] == expected
+    #twice, the second time from memo
+    for __ in range(2):
+        assert util.normalize_authors(authors) == expected
+
+
+def test_normalize_titles_match_previous_implementation():
+    titles = _get_items(bench_normalize.get_rand_title) + [None]
+    expected = [bench_normalize._normalize_title(t) for t in titles]
+    assert [util.normalize_title(t) for t in titles] == expected
+    for __ in range(2):
+        assert util.normalize_titles(titles) == expected
+
+
+def test_slugify_matches_previous_implementation():
+    texts = _get_items(bench_normalize.get_rand_title, seed=1) \
+        + ['naïve café', 'x y', 'ǅemal']
+    for text in texts:
+        assert util.slugify(text) == bench_normalize._slugify(text)
+        assert util.slugify(text, '_') == bench_normalize._slugify(text, '_')
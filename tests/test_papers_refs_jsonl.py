@@ -0,0 +1,46 @@
+import random
+import functools
+
+import util
+import config as cfg
+import parse_raw_refs
+
+
+def _get_rand_papers_refs(n_papers, seed):
+    rng = random.Random(seed)
+    return [('paper-{}'.format(i), [
+        '[{}] A. Author{}. Title {} of a paper. In Conf, {}.'.format(
+            j, rng.randint(0, 9), rng.randint(0, 99), rng.randint(1990, 2020))
+        for j in range(rng.randint(0, 12))]) for i in range(n_papers)]
+
+
+def test_round_trip_skips_partial_lines(tmp_path):
+    papers_refs = _get_rand_papers_refs(20, 0)
+    path = str(tmp_path / 'refs.jsonl')
+    with open(path, 'w') as f:
+        for uid, refs in papers_refs:
+            util.append_paper_refs(f, uid, refs)
+        #line of a crashed write
+        f.write('{"refs": ["[1] A. Au\n\n')
+    assert list(util.iter_papers_refs(path)) == papers_refs
+
+
+def test_chunks():
+    papers_refs = _get_rand_papers_refs(30, 1)
+    chunks = list(parse_raw_refs.get_papers_refs_chunks(papers_refs, 16))
+    assert list(util.flatten(chunks)) == papers_refs
+    assert all(sum(len(r) for __, r in c) >= 16 for c in chunks[:-1])
+
+
+def test_chunked_parsing_matches_parsing_per_paper(data_dir, monkeypatch):
+    papers_refs = _get_rand_papers_refs(30, 2)
+    with open(cfg.paths['raw-papers-refs'], 'w') as f:
+        for uid, refs in papers_refs:
+            util.append_paper_refs(f, uid, refs)
+    monkeypatch.setattr(parse_raw_refs, 'get_papers_refs_chunks',
+        functools.partial(parse_raw_refs.get_papers_refs_chunks,
+        chunk_size=16))
+    parse_raw_refs.parse_raw_refs(use_cache=False)
+    expected = [(uid, [parse_raw_refs.parse_raw_ref(r, 'local') for r in refs])
+        for uid, refs in papers_refs]
+    assert list(util.iter_papers_refs(cfg.paths['papers-refs'])) == expected
@@ -0,0 +1,30 @@
+import itertools
+import pytest
+
+import util
+
+
+def _square(x):
+    return x*x
+
+
+@pytest.mark.parametrize('threads', [False, True])
+def test_iparallelize_reads_args_lazily(threads):
+    n_read = [0]
+    def iter_args():
+        for i in range(100):
+            n_read[0] += 1
+            yield i
+    results = []
+    for result in util.iparallelize(_square, iter_args(), 2,
+            threads=threads, max_n_pending=4):
+        assert n_read[0] - len(results) <= 4
+        results.append(result)
+    assert sorted(results) == [i*i for i in range(100)]
+
+
+def test_iparallelize_stops_reading_args_when_closed():
+    results = util.iparallelize(_square, itertools.count(), 2,
+        max_n_pending=4)
+    next(results)
+    results.close()
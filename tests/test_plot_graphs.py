@@ -0,0 +1,64 @@
+import random
+import numpy as np
+import pytest
+
+pytest.importorskip('networkx')
+pytest.importorskip('matplotlib')
+
+import util
+import plot_graphs
+from csr_graph import CSRGraph
+
+
+def _old_reduce_graph(graph, hist, max_n_nodes=None):
+    '''
+    Dict-based reduction previously used in plot_graphs.
+    '''
+    all_nodes = set(graph.keys()) | set(util.flatten(graph.values()))
+    nodes = sorted(all_nodes, key=lambda n: hist.get(n, 0), reverse=True)
+    nodes = set(nodes[slice(max_n_nodes)])
+    graph = {k: v for k, v in graph.items() if k in nodes}
+    graph = {k: {v_ for v_ in v if v_ in nodes} for k, v in graph.items()}
+    return graph, nodes
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('max_n_nodes', [None, 0, 5, 30, 1000])
+def test_reduce_graph_matches_old(seed, max_n_nodes):
+    rng = random.Random(seed)
+    nodes = ['node-{}'.format(i) for i in range(50)]
+    graph = {n: set(rng.sample(nodes, rng.randint(0, 8))) for n in nodes[:40]}
+    #distinct scores, so top nodes don't depend on ties order. one node
+    #is missing in hist, with score 0
+    scores = rng.sample(range(1, 1000), len(nodes))
+    hist = dict(zip(nodes[1:], scores[1:]))
+    csr_graph = CSRGraph.from_dict(graph)
+    nodes_scores = np.array([hist.get(n, 0) for n in csr_graph.nodes],
+        dtype=float)
+    sub = plot_graphs.reduce_graph(csr_graph, nodes_scores, max_n_nodes)
+    old_graph, old_nodes = _old_reduce_graph(graph, hist, max_n_nodes)
+    assert set(sub.nodes) == old_nodes
+    assert sub.to_dict() == {n: old_graph.get(n, set()) for n in sub.nodes}
+    #nodes in decreasing score order
+    sub_scores = [hist.get(n, 0) for n in sub.nodes]
+    assert sub_scores == sorted(sub_scores, reverse=True)
+    assert plot_graphs.get_colors_hist(sub) == {
+        n: len(old_graph.get(n, ())) for n in sub.nodes}
+
+
+def test_top_node_ids():
+    scores = np.array([1., 3., 2., 3., 0.])
+    assert plot_graphs.get_top_node_ids(scores).tolist() == [1, 3, 2, 0, 4]
+    assert plot_graphs.get_top_node_ids(scores, 2).tolist() == [1, 3]
+    assert plot_graphs.get_top_node_ids(scores, 0).tolist() == []
+
+
+def test_refs_scores_match_refs_hist():
+    rng = random.Random(0)
+    nodes = ['node-{}'.format(i) for i in range(50)]
+    graph = {n: set(rng.sample(nodes, rng.randint(0, 8))) for n in nodes[:40]}
+    csr_graph = CSRGraph.from_dict(graph)
+    #refs hist as saved by mk_citation_graphs.py
+    hist = {k: len(v) for k, v in util.get_rev_graph(graph).items()}
+    scores = plot_graphs.load_nodes_scores(csr_graph, 'titles', 'refs')
+    assert scores.tolist() == [hist.get(n, 0) for n in csr_graph.nodes]
@@ -0,0 +1,61 @@
+import random
+import numpy as np
+import pytest
+
+pytest.importorskip('nltk')
+
+import mk_histograms
+
+
+def _old_crop_hist_by_percentile(hist, percentile):
+    hist = list(hist.items())
+    hist.sort(key=lambda kv: kv[1], reverse=True)
+    perc = np.percentile([v for __, v in hist], percentile)
+    return {k: v for k, v in hist if v >= perc}
+
+
+def _old_norm_hist(hist):
+    total = sum(hist.values())
+    return {k: v/max(total, 1) for k, v in hist.items()}
+
+
+def _get_rand_hist(n_terms, seed):
+    rng = random.Random(seed)
+    return {'term-{}'.format(i): rng.randint(1, 20) for i in range(n_terms)}
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('percentile', [0, 10, 33.3, 50, 90, 100])
+def test_percentile_matches_sorting(seed, percentile):
+    freqs = np.array(list(_get_rand_hist(1 + 20*seed, seed).values()))
+    perc = np.percentile(freqs, percentile)
+    assert sorted(mk_histograms.get_percentile_ids(freqs, percentile)) == \
+        np.flatnonzero(freqs >= perc).tolist()
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('k', [0, 1, 5, 100])
+def test_top_k_matches_sorting(seed, k):
+    freqs = np.array(list(_get_rand_hist(50, seed).values()))
+    ids = mk_histograms.get_top_k_ids(freqs, k)
+    assert len(ids) == min(k, len(freqs))
+    assert sorted(freqs[ids].tolist(), reverse=True) == \
+        sorted(freqs.tolist(), reverse=True)[:len(ids)]
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_proc_hist_matches_old(seed):
+    hist = _get_rand_hist(50, seed)
+    hist_ = mk_histograms.proc_hist(hist, percentile=40)
+    assert hist_ == _old_crop_hist_by_percentile(hist, 40)
+    assert list(hist_.values()) == sorted(hist_.values(), reverse=True)
+    assert mk_histograms.proc_hist(hist, norm=True) == pytest.approx(
+        _old_norm_hist(hist))
+    hist_ = mk_histograms.proc_hist(hist, max_n_terms=10)
+    assert list(hist_.values()) == sorted(hist.values(), reverse=True)[:10]
+    assert all(hist[k] == v for k, v in hist_.items())
+
+
+def test_empty_hist():
+    assert mk_histograms.proc_hist({}, percentile=50, max_n_terms=3,
+        norm=True) == {}
@@ -0,0 +1,224 @@
+import os
+import math
+import json
+import random
+import pytest
+from collections import Counter
+
+import pubs_index
+from pubs_index import PubsIndex
+
+
+_WORDS = ['neural', 'machine', 'translation', 'attention', 'graph',
+    'networks', 'deep', 'learning', 'citation', 'analysis']
+_AUTHORS = ['Ann Smith', 'Bob Jones', 'Carl Neural', 'Dora Graph']
+
+
+def _get_rand_pub(rng, i):
+    return {
+        'uid': 'pub-{}'.format(i),
+        'title': ' '.join(rng.choice(_WORDS) for __ in range(
+            rng.randint(1, 6))).title(),
+        'abstract': ' '.join(rng.choice(_WORDS) for __ in range(
+            rng.randint(0, 30))),
+        'authors': rng.sample(_AUTHORS, rng.randint(0, 3)),
+        'year': str(rng.choice([2018, 2019, 2020])),
+        'source': rng.choice(['arxiv', 'dblp']),
+    }
+
+
+def _save_pub(src_dir, pub):
+    with open(os.path.join(src_dir, pub['uid'] + '.json'), 'w') as f:
+        json.dump(pub, f)
+
+
+def _get_phrase_tf(tokens, phrase):
+    return sum(tokens[i:i+len(phrase)] == phrase
+        for i in range(len(tokens) - len(phrase) + 1))
+
+
+def _brute_force_search(pubs, query, **filters):
+    '''
+    Returns {uid: score} of all matching pubs.
+    '''
+    tokens = [pubs_index.get_fields_tokens(p) for p in pubs]
+    avg_lens = [max(sum(len(t[f]) for t in tokens)/max(len(pubs), 1), 1)
+        for f in range(len(pubs_index.FIELDS))]
+    def keep(pub):
+        year = pubs_index.get_year(pub)
+        return all([
+            filters.get('year') in [None, year],
+            filters.get('min_year') is None or year >= filters['min_year'],
+            filters.get('max_year') is None or year <= filters['max_year'],
+            filters.get('source') in [None, pub['source']],
+        ])
+    scores = {}
+    for phrase in pubs_index.parse_query(query):
+        tfs = [[_get_phrase_tf(t, phrase) for t in tokens_] if keep(p)
+            else [0, 0, 0] for p, tokens_ in zip(pubs, tokens)]
+        #document frequency over all pubs, also when filtering
+        n_docs = sum(any(_get_phrase_tf(t, phrase) for t in tokens_)
+            for tokens_ in tokens)
+        idf = math.log(1 + (len(pubs) - n_docs + 0.5)/(n_docs + 0.5))
+        for pub, tokens_, tfs_ in zip(pubs, tokens, tfs):
+            for field, tf in enumerate(tfs_):
+                if tf == 0:
+                    continue
+                norm = 1 - pubs_index.BM25_B \
+                    + pubs_index.BM25_B*len(tokens_[field])/avg_lens[field]
+                scores[pub['uid']] = scores.get(pub['uid'], 0) \
+                    + pubs_index.FIELDS_WEIGHTS[field]*idf*tf \
+                    *(pubs_index.BM25_K1 + 1)/(tf + pubs_index.BM25_K1*norm)
+    return scores
+
+
+def _search(index, query, k=1000, **filters):
+    results = index.search(query, k=k, **filters)
+    scores = [s for s, __ in results]
+    assert scores == sorted(scores, reverse=True)
+    return {p['uid']: s for s, p in results}
+
+
+def _assert_same_scores(scores, scores_):
+    assert scores.keys() == scores_.keys()
+    for uid, score in scores.items():
+        assert score == pytest.approx(scores_[uid])
+
+
+_QUERIES = [
+    ('neural', {}),
+    ('graph networks', {}),
+    ('"neural machine translation" attention', {}),
+    ('"ann smith" "smith bob"', {}),
+    ('deep', {'year': 2019}),
+    ('"deep learning" citation', {'min_year': 2019, 'source': 'dblp'}),
+    ('analysis', {'max_year': 2019}),
+    ('unknown', {}),
+]
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_search_matches_brute_force(tmp_path, seed):
+    rng = random.Random(seed)
+    pubs = [_get_rand_pub(rng, i) for i in range(40)]
+    src_dir = str(tmp_path / 'jsons')
+    os.makedirs(src_dir)
+    for pub in pubs:
+        _save_pub(src_dir, pub)
+    with PubsIndex(str(tmp_path / 'index.sqlite')) as index:
+        assert index.update(src_dir, batch_size=7) == (len(pubs), 0)
+        for query, filters in _QUERIES:
+            _assert_same_scores(_search(index, query, **filters),
+                _brute_force_search(pubs, query, **filters))
+
+
+@pytest.mark.parametrize('k', [1, 3, 10])
+def test_top_k_search_matches_brute_force(tmp_path, k):
+    rng = random.Random(k)
+    pubs = [_get_rand_pub(rng, i) for i in range(60)]
+    src_dir = str(tmp_path / 'jsons')
+    os.makedirs(src_dir)
+    for pub in pubs:
+        _save_pub(src_dir, pub)
+    with PubsIndex(str(tmp_path / 'index.sqlite')) as index:
+        index.update(src_dir)
+        for query, filters in _QUERIES + [
+                ('neural attention graph deep learning citation', {}),
+                ('"deep learning" neural smith analysis', {'year': 2020})]:
+            scores = _search(index, query, k=k, **filters)
+            scores_ = _brute_force_search(pubs, query, **filters)
+            assert len(scores) == min(k, len(scores_))
+            #ties may be broken either way
+            assert sorted(scores.values()) == pytest.approx(
+                sorted(scores_.values())[len(scores_) - len(scores):])
+            for uid, score in scores.items():
+                assert score == pytest.approx(scores_[uid])
+
+
+def test_search_prunes_common_terms(tmp_path, monkeypatch):
+    rng = random.Random(0)
+    pubs = [_get_rand_pub(rng, i) for i in range(50)]
+    for i, pub in enumerate(pubs):
+        pub['title'] += ' common' + ' rare'*(i < 3)
+    src_dir = str(tmp_path / 'jsons')
+    os.makedirs(src_dir)
+    for pub in pubs:
+        _save_pub(src_dir, pub)
+    with PubsIndex(str(tmp_path / 'index.sqlite')) as index:
+        index.update(src_dir)
+        n_postings = {}
+        get_postings = index._get_postings
+        def get_postings_(term, *args, **kwargs):
+            postings = get_postings(term, *args, **kwargs)
+            n_postings[term] = len(postings)
+            return postings
+        monkeypatch.setattr(index, '_get_postings', get_postings_)
+        scores = _search(index, 'common rare', k=2)
+        #common only looked up for pubs with rare
+        assert n_postings == {'rare': 3, 'common': 3}
+        scores_ = _brute_force_search(pubs, 'common rare')
+        assert sorted(scores.values()) == pytest.approx(
+            sorted(scores_.values())[-2:])
+
+
+def test_dfs(tmp_path):
+    rng = random.Random(0)
+    pubs = [_get_rand_pub(rng, i) for i in range(20)]
+    src_dir = str(tmp_path / 'jsons')
+    os.makedirs(src_dir)
+    for pub in pubs:
+        _save_pub(src_dir, pub)
+    def get_dfs(pubs):
+        return Counter(t for p in pubs
+            for t in set(sum(pubs_index.get_fields_tokens(p), [])))
+    index_path = str(tmp_path / 'index.sqlite')
+    with PubsIndex(index_path) as index:
+        index.update(src_dir)
+        assert index.get_dfs(get_dfs(pubs)) == get_dfs(pubs)
+        for pub in pubs[:5]:
+            os.remove(os.path.join(src_dir, pub['uid'] + '.json'))
+        index.update(src_dir)
+        assert index.get_dfs(get_dfs(pubs)) == get_dfs(pubs[5:])
+        #indexes made before dfs were kept
+        with index.conn:
+            index.conn.execute('DROP TABLE terms')
+    with PubsIndex(index_path) as index:
+        assert index.get_dfs(get_dfs(pubs)) == get_dfs(pubs[5:])
+
+
+def test_incremental_update(tmp_path):
+    rng = random.Random(0)
+    pubs = {i: _get_rand_pub(rng, i) for i in range(30)}
+    src_dir = str(tmp_path / 'jsons')
+    os.makedirs(src_dir)
+    for pub in pubs.values():
+        _save_pub(src_dir, pub)
+    with PubsIndex(str(tmp_path / 'index.sqlite')) as index:
+        index.update(src_dir)
+        assert index.update(src_dir) == (0, 0)
+        #modifying, removing and adding pubs
+        for i in range(5):
+            pubs[i] = _get_rand_pub(rng, i)
+            _save_pub(src_dir, pubs[i])
+            path = os.path.join(src_dir, pubs[i]['uid'] + '.json')
+            os.utime(path, (0, os.path.getmtime(path) + 10))
+        for i in range(5, 8):
+            os.remove(os.path.join(src_dir, pubs.pop(i)['uid'] + '.json'))
+        for i in range(30, 32):
+            pubs[i] = _get_rand_pub(rng, i)
+            _save_pub(src_dir, pubs[i])
+        assert index.update(src_dir) == (7, 3)
+        with PubsIndex(str(tmp_path / 'new-index.sqlite')) as new_index:
+            new_index.update(src_dir)
+            for query, filters in _QUERIES:
+                scores = _search(index, query, **filters)
+                _assert_same_scores(scores,
+                    _search(new_index, query, **filters))
+                _assert_same_scores(scores,
+                    _brute_force_search(list(pubs.values()), query, **filters))
+
+
+def test_missing_src_dir(tmp_path):
+    with PubsIndex(str(tmp_path / 'index.sqlite')) as index:
+        with pytest.raises(FileNotFoundError):
+            index.update(str(tmp_path / 'missing'))
@@ -0,0 +1,63 @@
+import os
+
+import util
+import config as cfg
+import extract_raw_refs_from_pdfs as extract
+
+
+class _FakeExtractor:
+    '''
+    Stands in for extractrefs.py: one ref per pdf line.
+    '''
+    def __init__(self):
+        self.n_calls = 0
+
+
+    def __call__(self, pdf_path):
+        self.n_calls += 1
+        with open(pdf_path) as f:
+            return [{'raw_ref': l.strip()} for l in f if l.strip()]
+
+
+def _mk_meta(data_dir, name, text):
+    path = str(data_dir / '{}.pdf'.format(name))
+    with open(path, 'w') as f:
+        f.write(text)
+    return {'uid': name, 'norm-title': name, 'pdf-path': path}
+
+
+def test_cached_refs_are_reused(data_dir, monkeypatch):
+    os.makedirs(cfg.paths['raw-refs-cache-dir'])
+    extractor = _FakeExtractor()
+    monkeypatch.setattr(extract, 'extract_refs', extractor)
+    meta = _mk_meta(data_dir, 'a', 'ref 1\nref 2\n')
+    refs, hit = extract.extract_raw_refs_from_pdf(meta)
+    assert (refs, hit) == (['ref 1', 'ref 2'], False)
+    #same content in another file is a hit
+    meta_ = _mk_meta(data_dir, 'b', 'ref 1\nref 2\n')
+    assert extract.extract_raw_refs_from_pdf(meta_) == (refs, True)
+    assert extractor.n_calls == 1
+    #modified content is a miss
+    meta = _mk_meta(data_dir, 'a', 'ref 3\n')
+    assert extract.extract_raw_refs_from_pdf(meta) == (
+        ['ref 3'], False)
+    assert extractor.n_calls == 2
+    #other extractor version is a miss
+    assert extract.extract_raw_refs_from_pdf(
+        meta, version='other') == (['ref 3'], False)
+    assert extractor.n_calls == 3
+
+
+def test_evict_stale_cache_entries(data_dir, monkeypatch):
+    os.makedirs(cfg.paths['raw-refs-cache-dir'])
+    monkeypatch.setattr(extract, 'extract_refs', _FakeExtractor())
+    metas = [_mk_meta(data_dir, n, n + ' ref\n') for n in ['a', 'b']]
+    for meta in metas:
+        extract.extract_raw_refs_from_pdf(meta)
+    extract.extract_raw_refs_from_pdf(metas[0], version='old')
+    util.save_json(cfg.paths['papers-metadata'], metas[:1])
+    extract.evict_stale_cache_entries()
+    version = extract.get_extractor_version()
+    assert os.listdir(cfg.paths['raw-refs-cache-dir']) == [
+        os.path.basename(extract.get_cache_path(
+            util.get_file_hash(metas[0]['pdf-path']), version))]
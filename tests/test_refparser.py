@@ -0,0 +1,33 @@
+import pytest
+
+import refparser
+
+
+@pytest.mark.parametrize('ref, authors, title, year', [
+    ('[3] D. Bahdanau, K. Cho, and Y. Bengio. Neural machine translation '
+        'by jointly learning to align and translate. In ICLR, 2015.',
+        ['D. Bahdanau', 'K. Cho', 'Y. Bengio'],
+        'Neural machine translation by jointly learning to align and '
+        'translate', 2015),
+    ('12. Smith, J. A., Doe, B. and Roe, C. (2010). Deep learning for '
+        'things. Nature, 5:1-10.',
+        ['Smith, J. A.', 'Doe, B.', 'Roe, C.'],
+        'Deep learning for things', 2010),
+    ('(4) Smith JA, Doe B. Deep learning for things. Nature. '
+        '2010;5:1-10.',
+        ['Smith, JA', 'Doe, B'], 'Deep learning for things', 2010),
+    ('A. Vaswani et al., "Attention is all you need," in NIPS, 2017.',
+        ['A. Vaswani'], 'Attention is all you need', 2017),
+])
+def test_parse_ref(ref, authors, title, year):
+    data = refparser.parse_ref(ref)
+    assert data['authors'] == authors
+    assert data['title'] == title
+    assert data['year'] == year
+    assert data['raw_string'] == ref
+
+
+def test_parse_ref_without_year():
+    assert refparser.parse_ref('J. Doe. Some title. Tech report.')['year'] \
+        is None
+
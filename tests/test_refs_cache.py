@@ -0,0 +1,73 @@
+import multiprocessing
+
+import config as cfg
+import refs_cache
+import parse_raw_refs
+from refs_cache import ParsedRefsCache
+
+
+def test_canonical_keys():
+    key = refs_cache.get_ref_key('[1] J. Doe. A title, 2010.')
+    assert refs_cache.get_ref_key('12.  J. Doe; a TITLE 2010') == key
+    assert refs_cache.get_ref_key('[1] J. Doe. Another title, 2010.') != key
+
+
+def test_cache_namespaces(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    with ParsedRefsCache(path, 'a') as cache:
+        cache.put_many([('k{}'.format(i), {'i': i}) for i in range(1000)])
+        cache.put('k0', {'i': -1})
+        assert cache.get('k0') == {'i': -1}
+        assert cache.get('missing') is None
+        found = cache.get_many(['k{}'.format(i) for i in range(0, 1200, 2)])
+        expected = {'k{}'.format(i): {'i': i} for i in range(2, 1000, 2)}
+        expected['k0'] = {'i': -1}
+        assert found == expected
+    with ParsedRefsCache(path, 'b') as cache:
+        assert cache.get_many(['k0', 'k1']) == {}
+
+
+def _put(args):
+    path, i = args
+    with ParsedRefsCache(path, 'a') as cache:
+        cache.put('k{}'.format(i), {'i': i})
+
+
+def test_cache_from_processes(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    with multiprocessing.Pool(4) as pool:
+        pool.map(_put, [(path, i) for i in range(16)])
+    with ParsedRefsCache(path, 'a') as cache:
+        assert cache.get_many(['k{}'.format(i) for i in range(16)]) == {
+            'k{}'.format(i): {'i': i} for i in range(16)}
+
+
+def test_cached_parsing_matches_uncached(tmp_path, monkeypatch):
+    monkeypatch.setitem(cfg.paths, 'parsed-refs-cache',
+        str(tmp_path / 'cache' / 'parsed-refs-cache.sqlite'))
+    refs = ['[{}] A. Author, B. Other. Title number {} of a paper. '
+        'In Conf, {}.'.format(i, i % 7, 2000 + i % 7)
+        for i in range(40)] + ['']
+    expected = parse_raw_refs.parse_unique_raw_refs(refs, use_cache=False)
+    assert parse_raw_refs.parse_unique_raw_refs(refs[:20]) == expected[:20]
+    #second run only parses refs not seen before
+    n_parsed = []
+    _parse = parse_raw_refs._parse_unique_raw_refs
+    def parse(refs, parser):
+        n_parsed.append(len(refs))
+        return _parse(refs, parser)
+    monkeypatch.setattr(parse_raw_refs, '_parse_unique_raw_refs', parse)
+    assert parse_raw_refs.parse_unique_raw_refs(refs) == expected
+    #7 distinct refs, all cached by first run, and the empty one
+    assert n_parsed == [1]
+
+
+def test_batched_parsing_matches_one_by_one():
+    refs = [
+        '[{}] A. Author{}, B. Other. Title number {} of a paper. '
+        'In Conf, {}.'.format(i, i % 3, i, 2000 + i % 20)
+        for i in range(50)
+    ] + ['', 'garbage']
+    expected = [parse_raw_refs.parse_raw_ref(r, 'local') for r in refs]
+    assert parse_raw_refs.parse_unique_raw_refs(
+        refs, 'local', use_cache=False) == expected
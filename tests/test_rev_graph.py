@@ -0,0 +1,26 @@
+import random
+import pytest
+
+import util
+import bench_rev_graph
+
+
+def _get_rand_graph(n_nodes, n_extra_nodes, seed):
+    '''
+    Graph with edges to nodes that are not keys, like refs titles.
+    '''
+    rng = random.Random(seed)
+    nodes = ['node-{}'.format(i) for i in range(n_nodes + n_extra_nodes)]
+    return {n: set(rng.sample(nodes, rng.randint(0, 8)))
+        for n in nodes[:n_nodes]}
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_rev_graph_matches_quadratic(seed):
+    graph = _get_rand_graph(50, 20, seed)
+    assert util.get_rev_graph(graph) == \
+        bench_rev_graph.get_rev_graph_quadratic(graph)
+
+
+def test_empty_graph():
+    assert util.get_rev_graph({}) == {}
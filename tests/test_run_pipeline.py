@@ -0,0 +1,77 @@
+import pytest
+
+import config as cfg
+import run_pipeline
+
+
+def _write(path, text):
+    with open(path, 'w') as f:
+        f.write(text)
+
+
+@pytest.fixture
+def stages(data_dir, monkeypatch):
+    '''
+    a -> stage_1 -> b; b -> stage_2 -> b, c (like pre-processing and
+    then updating papers metadata in place).
+    '''
+    for key in ['a', 'b', 'c']:
+        monkeypatch.setitem(cfg.paths, key, str(data_dir / key))
+    return [
+        {'name': 'stage_1', 'inputs': ['a'], 'outputs': ['b']},
+        {'name': 'stage_2', 'inputs': ['b'], 'outputs': ['b', 'c']},
+    ]
+
+
+def _run(stage, text, state, file_hashes):
+    '''
+    Simulates a run of stage, writing text to its outputs.
+    '''
+    for key in stage['outputs']:
+        _write(cfg.paths[key], text)
+    state['stages'][stage['name']] = run_pipeline.get_stage_hashes(
+        stage, file_hashes)
+
+
+def test_rewritten_outputs_dont_invalidate_stage(stages):
+    state = {'stages': {}}
+    file_hashes = {}
+    _write(cfg.paths['a'], 'raw')
+    _run(stages[0], 'pre-processed', state, file_hashes)
+    _run(stages[1], 'updated', state, file_hashes)
+    for stage in stages:
+        assert run_pipeline.is_up_to_date(stage, state, file_hashes, stages)
+
+    #stage_1 inputs change: it reruns, then stage_2 sees new inputs
+    _write(cfg.paths['a'], 'new raw')
+    assert not run_pipeline.is_up_to_date(
+        stages[0], state, file_hashes, stages)
+    _run(stages[0], 'new pre-processed', state, file_hashes)
+    assert not run_pipeline.is_up_to_date(
+        stages[1], state, file_hashes, stages)
+
+
+def test_missing_or_changed_outputs_rerun_stage(stages, data_dir):
+    state = {'stages': {}}
+    file_hashes = {}
+    _write(cfg.paths['a'], 'raw')
+    _run(stages[0], 'pre-processed', state, file_hashes)
+    _run(stages[1], 'updated', state, file_hashes)
+    _write(cfg.paths['c'], 'modified')
+    assert not run_pipeline.is_up_to_date(
+        stages[1], state, file_hashes, stages)
+    (data_dir / 'b').unlink()
+    assert not run_pipeline.is_up_to_date(
+        stages[0], state, file_hashes, stages)
+
+
+def test_stages_waves():
+    stages = [
+        {'name': 's1', 'inputs': [], 'outputs': ['x']},
+        {'name': 's2', 'inputs': ['x'], 'outputs': ['y']},
+        {'name': 's3', 'inputs': ['x'], 'outputs': ['z']},
+        {'name': 's4', 'inputs': ['y', 'z'], 'outputs': ['w']},
+    ]
+    waves = run_pipeline.get_stages_waves(stages)
+    assert [[s['name'] for s in w] for w in waves] == [
+        ['s1'], ['s2', 's3'], ['s4']]
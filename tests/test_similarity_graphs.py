@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+import mk_similarity_graphs
+
+
+def _get_rand_papers_refs(n_papers, n_titles, mean_n_refs, seed):
+    '''
+    Titles cited with zipf-like frequencies, plus refs without title.
+    '''
+    rng = np.random.RandomState(seed)
+    probs = 1/np.arange(1, n_titles + 1)**0.8
+    probs /= probs.sum()
+    papers_refs = []
+    for i in range(n_papers):
+        ids = rng.choice(n_titles, size=rng.randint(0, 2*mean_n_refs),
+            p=probs)
+        papers_refs.append(('uid-{}'.format(i),
+            [{'norm-title': 'title-{}'.format(j)} for j in ids]
+            + [{'norm-title': ''}]))
+    return papers_refs
+
+
+def _brute_force_top_k(mat, k, min_weight, max_col_nnz=None):
+    '''
+    Returns rows of mat*mat^T as {col: weight} with the top-k entries.
+    '''
+    dense = mat.toarray()
+    if max_col_nnz is not None:
+        dense[:, (dense > 0).sum(axis=0) > max_col_nnz] = 0
+    prod = dense.dot(dense.T)
+    np.fill_diagonal(prod, 0)
+    rows = []
+    for row in prod:
+        cands = sorted((-w, j) for j, w in enumerate(row) if w >= min_weight)
+        rows.append({j: -w for w, j in cands[:k]})
+    return rows
+
+
+def test_refs_matrix():
+    papers_refs = _get_rand_papers_refs(50, 80, 5, 0)
+    mat, uids, titles = mk_similarity_graphs.get_refs_matrix(papers_refs)
+    assert uids == [u for u, __ in papers_refs]
+    assert titles == sorted({r['norm-title'] for __, refs in papers_refs
+        for r in refs if r['norm-title']})
+    for i, (__, refs) in enumerate(papers_refs):
+        row = mat.getrow(i)
+        assert {titles[j] for j in row.indices} == \
+            {r['norm-title'] for r in refs if r['norm-title']}
+        assert set(row.data.tolist()) <= {1}
+
+
+@pytest.mark.parametrize('seed', range(3))
+@pytest.mark.parametrize('k', [1, 3, 1000])
+@pytest.mark.parametrize('min_weight', [1, 2])
+@pytest.mark.parametrize('transpose', [False, True])
+def test_top_k_product_matches_dense(seed, k, min_weight, transpose):
+    mat, __, __ = mk_similarity_graphs.get_refs_matrix(
+        _get_rand_papers_refs(60, 100, 6, seed))
+    if transpose:
+        mat = mat.T
+    prod = mk_similarity_graphs.get_top_k_product(
+        mat, k, min_weight, max_col_nnz=None, max_work=50).toarray()
+    rows = [{j: prod[i, j] for j in np.flatnonzero(row)}
+        for i, row in enumerate(prod)]
+    assert rows == _brute_force_top_k(mat, k, min_weight)
+
+
+def test_max_col_nnz(capsys):
+    mat, __, __ = mk_similarity_graphs.get_refs_matrix(
+        _get_rand_papers_refs(60, 100, 6, 0))
+    cols_nnz = np.bincount(mat.indices, minlength=mat.shape[1])
+    prod = mk_similarity_graphs.get_top_k_product(mat, 1000, 1,
+        max_col_nnz=5).toarray()
+    assert 'dropped {} of {} columns ({} of {} entries)'.format(
+        (cols_nnz > 5).sum(), mat.shape[1], cols_nnz[cols_nnz > 5].sum(),
+        mat.nnz) in capsys.readouterr().out
+    rows = [{j: prod[i, j] for j in np.flatnonzero(row)}
+        for i, row in enumerate(prod)]
+    assert rows == _brute_force_top_k(mat, 1000, 1, max_col_nnz=5)
+
+
+def test_blocks():
+    costs = np.array([3, 1, 10, 0, 2, 2])
+    blocks = mk_similarity_graphs.get_blocks(costs, max_work=4)
+    assert blocks == [(0, 2), (2, 3), (3, 6)]
+    assert mk_similarity_graphs.get_blocks(np.zeros(0)) == []
+
+
+def test_empty_matrix():
+    mat, uids, titles = mk_similarity_graphs.get_refs_matrix([])
+    assert mat.shape == (0, 0) and uids == titles == []
+    assert mk_similarity_graphs.get_top_k_product(mat).shape == (0, 0)
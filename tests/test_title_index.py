@@ -0,0 +1,64 @@
+import random
+import pytest
+
+import title_index
+from title_index import TitleIndex
+
+
+_WORDS = ['deep', 'learning', 'neural', 'networks', 'graph', 'citation',
+    'analysis', 'of', 'for', 'the', 'models', 'language', 'attention']
+
+
+def _get_rand_title(rng):
+    return '-'.join(rng.choice(_WORDS) for __ in range(rng.randint(2, 8)))
+
+
+def _perturb(title, rng):
+    chars = list(title)
+    for __ in range(rng.randint(0, 3)):
+        i = rng.randrange(len(chars))
+        op = rng.choice(['sub', 'del', 'ins'])
+        if op == 'sub':
+            chars[i] = rng.choice('abcdefghij')
+        elif op == 'del' and len(chars) > 1:
+            del chars[i]
+        else:
+            chars.insert(i, rng.choice('abcdefghij'))
+    return ''.join(chars)
+
+
+def _brute_force_match(titles, title, threshold, min_len):
+    if title in titles:
+        return title
+    if len(title) < min_len:
+        return None
+    grams = title_index.get_ngrams(title)
+    best_sim = 0
+    best_title = None
+    #ties broken by title order
+    for title_ in sorted(set(titles)):
+        sim = title_index.get_similarity(grams, title_index.get_ngrams(title_))
+        if sim > best_sim:
+            best_sim = sim
+            best_title = title_
+    return best_title if best_sim >= threshold else None
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('threshold', [0.5, 0.8])
+def test_match_matches_brute_force(seed, threshold):
+    rng = random.Random(seed)
+    titles = [_get_rand_title(rng) for __ in range(100)]
+    index = TitleIndex(titles, threshold=threshold)
+    queries = [_perturb(rng.choice(titles), rng) for __ in range(100)] \
+        + [_get_rand_title(rng) for __ in range(50)]
+    for query in queries:
+        assert index.match(query) == _brute_force_match(
+            titles, query, threshold, index.min_len)
+
+
+def test_match_ties_and_no_candidates():
+    index = TitleIndex(['graph-models-b', 'graph-models-a'], threshold=0.5)
+    #equally similar titles: the first in order matches
+    assert index.match('graph-models-c') == 'graph-models-a'
+    assert index.match('zzzzzzzzzzzzzzzz') is None
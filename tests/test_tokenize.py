@@ -0,0 +1,35 @@
+import random
+from collections import Counter
+
+import util
+
+
+_WORDS = ['Attention', 'is', 'all', 'you-need', 'naïve', 'Ünicode', '(NIPS)',
+    'arXiv:1706.03762', 'x\ty', ' ', '--', 'state-of-the-art', 'Łódź', '\x00']
+
+
+def _get_texts(seed, n=500):
+    rng = random.Random(seed)
+    return [' '.join(rng.choice(_WORDS) for __ in range(rng.randint(0, 15)))
+        for __ in range(n)]
+
+
+def _get_slug_tokens(text):
+    return [t for t in util.slugify(text).split('-') if t]
+
+
+def test_tokenize_many_matches_slugify():
+    for seed in range(5):
+        texts = _get_texts(seed)
+        tokens, offsets = util.tokenize_many(texts)
+        assert len(offsets) == len(texts) + 1
+        for i, text in enumerate(texts):
+            assert tokens[offsets[i]:offsets[i+1]] == _get_slug_tokens(text)
+    assert util.tokenize_many([]) == ([], [0])
+
+
+def test_count_tokens_matches_slugify():
+    texts = _get_texts(0)
+    expected = Counter(t for text in texts for t in _get_slug_tokens(text))
+    assert util.count_tokens(texts) == expected
+    assert util.count_tokens(iter(texts)) == expected
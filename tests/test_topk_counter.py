@@ -0,0 +1,76 @@
+import random
+import functools
+import pytest
+from collections import Counter
+
+from topk_counter import SpaceSavingCounter
+
+
+def _get_rand_stream(n, seed):
+    '''
+    Zipf-like stream, with a few frequent items and a long tail.
+    '''
+    rng = random.Random(seed)
+    return ['item-{}'.format(int(rng.paretovariate(1.2))) for __ in range(n)]
+
+
+def _assert_guarantees(counter, true_counts):
+    assert counter.n == sum(true_counts.values())
+    assert len(counter) <= counter.capacity
+    for item, count in counter.counts.items():
+        error = counter.errors[item]
+        assert count - error <= true_counts[item] <= count
+        assert error <= counter.n/counter.capacity
+    for item, count in true_counts.items():
+        if count > counter.n/counter.capacity:
+            assert item in counter.counts
+        if item not in counter.counts:
+            assert count <= counter.min_count()
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('capacity', [5, 20])
+def test_guarantees(seed, capacity):
+    stream = _get_rand_stream(2000, seed)
+    counter = SpaceSavingCounter(capacity)
+    counter.update(stream)
+    _assert_guarantees(counter, Counter(stream))
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_merge_guarantees(seed):
+    streams = [_get_rand_stream(500, 10*seed + i) for i in range(4)]
+    counters = []
+    for stream in streams:
+        counter = SpaceSavingCounter(10)
+        counter.update(stream)
+        counters.append(counter)
+    counter = functools.reduce(lambda a, b: a.merge(b), counters)
+    _assert_guarantees(counter, Counter(sum(streams, [])))
+
+
+def test_exact_with_enough_capacity():
+    stream = _get_rand_stream(2000, 0)
+    true_counts = Counter(stream)
+    counter = SpaceSavingCounter(len(true_counts))
+    counter.update(stream[:1000])
+    counter_ = SpaceSavingCounter(len(true_counts))
+    counter_.update(stream[1000:])
+    merged = counter.merge(counter_)
+    assert counter.max_error() == merged.max_error() == 0
+    assert merged.counts == dict(true_counts)
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('k', [1, 3, 10])
+def test_guaranteed_top_k(seed, k):
+    stream = _get_rand_stream(2000, seed)
+    true_counts = Counter(stream)
+    counter = SpaceSavingCounter(20)
+    counter.update(stream)
+    top = counter.most_common(k)
+    top_items = {i for i, __, __ in top}
+    max_other_count = max(c for i, c in true_counts.items()
+        if i not in top_items)
+    for item, __, __ in top[:counter.get_n_guaranteed(k)]:
+        assert true_counts[item] >= max_other_count
@@ -0,0 +1,94 @@
+'''
+Index for matching (noisy) reference titles to collection titles.
+Titles are compared by the Jaccard similarity of their sets of character
+trigrams. Candidates are looked up in an inverted index from trigrams to
+titles using only the rarest trigrams of the query (prefix filtering),
+which is enough to find every title above the similarity threshold
+without comparing the query to all titles.
+'''
+
+
+import math
+from collections import defaultdict
+
+
+#minimum similarity for titles to match
+DEF_THRESHOLD = 0.8
+#titles shorter than this only match exactly
+DEF_MIN_LEN = 12
+#size of character n-grams
+DEF_N = 3
+
+
+def get_ngrams(title, n=DEF_N):
+    '''
+    Assumes title normalized (slugified).
+    '''
+    title = ' {} '.format(title.replace('-', ' '))
+    return {title[i:i+n] for i in range(len(title) - n + 1)}
+
+
+def get_similarity(grams_a, grams_b):
+    inter = len(grams_a & grams_b)
+    return inter/(len(grams_a) + len(grams_b) - inter)
+
+
+class TitleIndex:
+    def __init__(self, titles, threshold=DEF_THRESHOLD, min_len=DEF_MIN_LEN,
+            n=DEF_N):
+        self.threshold = threshold
+        self.min_len = min_len
+        self.n = n
+        self.titles = sorted(set(titles))
+        self.titles_set = set(self.titles)
+        self.grams = [get_ngrams(t, n) for t in self.titles]
+        postings = defaultdict(list)
+        for i, grams in enumerate(self.grams):
+            for gram in grams:
+                postings[gram].append(i)
+        self.postings = dict(postings)
+        #memo of non-exact queries, {title: (matched title or None, similarity)}
+        self.fuzzy_matches = {}
+
+
+    def get_candidates(self, grams):
+        #a title above threshold shares at least min_n_shared of the grams,
+        #so it must have one of any (len(grams) - min_n_shared + 1) grams
+        min_n_shared = math.ceil(self.threshold*len(grams) - 1e-9)
+        grams = sorted(grams, key=lambda g: len(self.postings.get(g, ())))
+        candidates = set()
+        for gram in grams[:len(grams) - min_n_shared + 1]:
+            candidates.update(self.postings.get(gram, ()))
+        return candidates
+
+
+    def _match(self, title):
+        grams = get_ngrams(title, self.n)
+        best_sim = 0
+        #past any title index, so ties compare with ints only
+        best_i = len(self.titles)
+        for i in self.get_candidates(grams):
+            #sizes of sets with jaccard >= threshold can't differ much
+            if not (self.threshold*len(self.grams[i]) <= len(grams)
+                    <= len(self.grams[i])/self.threshold):
+                continue
+            sim = get_similarity(grams, self.grams[i])
+            if sim > best_sim or (sim == best_sim and i < best_i):
+                best_sim = sim
+                best_i = i
+        if best_i == len(self.titles) or best_sim < self.threshold:
+            return None, best_sim
+        return self.titles[best_i], best_sim
+
+
+    def match(self, title):
+        '''
+        Returns the most similar collection title above threshold or None.
+        '''
+        if title in self.titles_set:
+            return title
+        if len(title) < self.min_len:
+            return None
+        if title not in self.fuzzy_matches:
+            self.fuzzy_matches[title] = self._match(title)
+        return self.fuzzy_matches[title][0]
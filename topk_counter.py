@@ -0,0 +1,123 @@
+'''
+Approximate counting of the most frequent items of a stream in fixed
+memory, with the Space-Saving algorithm (Metwally et al., 2005).
+At most capacity items are monitored. When a new item arrives and the
+counter is full, the item with minimum count is replaced by the new one,
+which inherits its count as (maximum) overestimation error. Thus:
+    - counts never underestimate true counts;
+    - count - error never overestimates true counts;
+    - errors are at most n/capacity, with n the number of updates;
+    - every item with true count > n/capacity is monitored.
+Counters of different parts of a stream can be merged (Agarwal et al.,
+2012), keeping the same guarantees.
+'''
+
+
+import heapq
+
+
+class SpaceSavingCounter:
+    def __init__(self, capacity):
+        assert capacity > 0
+        self.capacity = capacity
+        self.n = 0
+        self.counts = {}
+        self.errors = {}
+        #one (count, item) entry per monitored item. counts can be lower
+        #than current counts (stale), being updated only when popped
+        self._heap = []
+
+
+    def __len__(self):
+        return len(self.counts)
+
+
+    def _pop_min(self):
+        while True:
+            count, item = heapq.heappop(self._heap)
+            if count == self.counts[item]:
+                return count, item
+            heapq.heappush(self._heap, (self.counts[item], item))
+
+
+    def add(self, item, count=1):
+        self.n += count
+        if item in self.counts:
+            self.counts[item] += count
+        elif len(self.counts) < self.capacity:
+            self.counts[item] = count
+            self.errors[item] = 0
+            heapq.heappush(self._heap, (count, item))
+        else:
+            min_count, min_item = self._pop_min()
+            del self.counts[min_item]
+            del self.errors[min_item]
+            self.counts[item] = min_count + count
+            self.errors[item] = min_count
+            heapq.heappush(self._heap, (min_count + count, item))
+
+
+    def update(self, items):
+        for item in items:
+            self.add(item)
+
+
+    def min_count(self):
+        '''
+        Maximum count of items that are not monitored.
+        '''
+        if len(self.counts) < self.capacity:
+            return 0
+        return min(self.counts.values())
+
+
+    def max_error(self):
+        return max(self.errors.values(), default=0)
+
+
+    def merge(self, other):
+        '''
+        Returns counter of both streams. Items missing in one counter are
+        assumed to have its min count, added to count and error.
+        '''
+        assert self.capacity == other.capacity
+        merged = SpaceSavingCounter(self.capacity)
+        min_a = self.min_count()
+        min_b = other.min_count()
+        counts = {}
+        errors = {}
+        for item in set(self.counts) | set(other.counts):
+            counts[item] = self.counts.get(item, min_a) \
+                + other.counts.get(item, min_b)
+            errors[item] = self.errors.get(item, min_a) \
+                + other.errors.get(item, min_b)
+        items = heapq.nlargest(self.capacity, counts, key=counts.get)
+        merged.n = self.n + other.n
+        merged.counts = {k: counts[k] for k in items}
+        merged.errors = {k: errors[k] for k in items}
+        merged._heap = [(c, k) for k, c in merged.counts.items()]
+        heapq.heapify(merged._heap)
+        return merged
+
+
+    def most_common(self, k=None):
+        '''
+        Returns up to k tuples (item, count, error), by decreasing count.
+        '''
+        items = sorted(self.counts, key=self.counts.get, reverse=True)
+        return [(i, self.counts[i], self.errors[i]) for i in items[slice(k)]]
+
+
+    def get_n_guaranteed(self, k):
+        '''
+        Returns the number of first items of most_common(k) that are
+        surely among the true top k items.
+        '''
+        top = self.most_common(k + 1)
+        next_count = top[k][1] if len(top) > k else self.min_count()
+        n_guaranteed = 0
+        for __, count, error in top[:k]:
+            if count - error < next_count:
+                break
+            n_guaranteed += 1
+        return n_guaranteed
@@ -6,8 +6,13 @@ import tempfile
 import re
 import unicodedata
 import uuid
+import hashlib
+import functools
+import threading
+import collections
 import subprocess as sp
 import multiprocessing as mp
+from multiprocessing.pool import ThreadPool
 
 
 def get_rand_str():
@@ -41,15 +46,90 @@ def flatten(iterable):
     return (item for subiterable in iterable for item in subiterable)
 
 
+_SLUG_INVALID_CHARS_REGEX = re.compile(r'[^\w\s-]')
+_SLUG_SEPS_REGEX = re.compile(r'[-\s]+')
+
+
+def _is_ascii(string):
+    #same as str.isascii, which needs python 3.7+
+    try:
+        string.encode('ascii')
+    except UnicodeEncodeError:
+        return False
+    return True
+
+
 def slugify(seq, sep='-'):
-    seq = unicodedata.normalize('NFKD', seq)
-    seq = seq.encode('ascii', 'ignore').decode()
+    #NFKD normalization/ascii encoding don't change ascii strings
+    if not _is_ascii(seq):
+        seq = unicodedata.normalize('NFKD', seq)
+        seq = seq.encode('ascii', 'ignore').decode()
     seq = seq.strip().lower()
-    seq = re.sub(r'[^\w\s-]', '', seq)
-    seq = re.sub(r'[-\s]+', sep, seq)
+    seq = _SLUG_INVALID_CHARS_REGEX.sub('', seq)
+    seq = _SLUG_SEPS_REGEX.sub(sep, seq)
     return seq
 
 
+def _mk_slug_tokens_table():
+    '''
+    Translation table from ascii chars to what slugify does with them:
+    separators become spaces, invalid chars are removed.
+    '''
+    table = {}
+    for i in range(128):
+        char = chr(i)
+        if _SLUG_SEPS_REGEX.fullmatch(char):
+            table[i] = ' '
+        elif _SLUG_INVALID_CHARS_REGEX.fullmatch(char):
+            table[i] = None
+        else:
+            table[i] = char.lower()
+    table[ord(_SLUG_DOC_SEP)] = _SLUG_DOC_SEP
+    return table
+
+
+#separates texts in corpora
+_SLUG_DOC_SEP = '\x00'
+_SLUG_TOKENS_TABLE = _mk_slug_tokens_table()
+
+
+def _get_slug_corpus(texts):
+    corpus = _SLUG_DOC_SEP.join(texts)
+    if corpus.count(_SLUG_DOC_SEP) != max(len(texts) - 1, 0):
+        corpus = _SLUG_DOC_SEP.join(t.replace(_SLUG_DOC_SEP, '') for t in texts)
+    if not _is_ascii(corpus):
+        corpus = unicodedata.normalize('NFKD', corpus)
+        corpus = corpus.encode('ascii', 'ignore').decode()
+    return corpus.translate(_SLUG_TOKENS_TABLE)
+
+
+def tokenize_many(texts):
+    '''
+    Tokenizes all texts at once, the same as slugify(text).split('-')
+    without empty tokens for each text.
+    Returns a flat list of tokens and offsets, with tokens of texts[i]
+    in tokens[offsets[i]:offsets[i+1]].
+    '''
+    texts = list(texts)
+    if not texts:
+        return [], [0]
+    docs = _get_slug_corpus(texts).split(_SLUG_DOC_SEP)
+    tokens = []
+    offsets = [0]
+    for doc in docs:
+        tokens.extend(doc.split())
+        offsets.append(len(tokens))
+    return tokens, offsets
+
+
+def count_tokens(texts):
+    '''
+    Counts tokens (as in tokenize_many) of all texts at once.
+    '''
+    corpus = _get_slug_corpus(list(texts)).replace(_SLUG_DOC_SEP, ' ')
+    return collections.Counter(corpus.split())
+
+
 def remove(string, seqs):
     for seq in seqs:
         string = string.replace(seq, '')
@@ -94,11 +174,57 @@ def save_graph(path, graph):
     return path
 
 
+def get_rev_graph(graph):
+    '''
+    Reverses graph in format {node: {nodes}} in a single pass over the edges.
+    Only nodes that are keys of graph are kept.
+    '''
+    rev_graph = {node: set() for node in graph}
+    for from_node, to_nodes in graph.items():
+        for to_node in to_nodes:
+            if to_node in rev_graph:
+                rev_graph[to_node].add(from_node)
+    return rev_graph
+
+
 def save_json(path, dct):
     with open(path, 'w') as f:
         json.dump(dct, f, indent=4, sort_keys=True)
 
 
+def iter_jsonl(path):
+    '''
+    Yields objects from JSON-lines file, skipping malformed (partial) lines.
+    '''
+    with open(path) as f:
+        for i, line in enumerate(f):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                print('WARNING: skipping malformed line #{} in "{}"'.format(
+                    i+1, path))
+
+
+def append_jsonl(f, obj):
+    f.write(json.dumps(obj, sort_keys=True) + '\n')
+    f.flush()
+
+
+def iter_papers_refs(path):
+    '''
+    Yields (paper uid, refs) from JSON-lines file with one paper per line.
+    '''
+    for item in iter_jsonl(path):
+        yield item['uid'], item['refs']
+
+
+def append_paper_refs(f, uid, refs):
+    append_jsonl(f, {'uid': uid, 'refs': refs})
+
+
 def get_info_fn(prefix='', def_flush=True, silence=False):
     def wrapper(*args, **kwargs):
         if not 'flush' in kwargs:
@@ -123,6 +249,54 @@ def parallelize(fn, args, n_threads=1, star=False):
     return ret
 
 
+def _star_call(fn, args):
+    return fn(*args)
+
+
+def _iter_bounded(args, semaphore, stop):
+    '''
+    Yields args, waiting for a slot in semaphore before reading each one.
+    '''
+    args = iter(args)
+    while True:
+        semaphore.acquire()
+        if stop.is_set():
+            return
+        try:
+            arg = next(args)
+        except StopIteration:
+            return
+        yield arg
+
+
+def iparallelize(fn, args, n_threads=1, star=False, threads=False,
+        max_n_pending=None):
+    '''
+    Like parallelize, but yields results as they are ready, in any order.
+    If max_n_pending is given, at most that many args are read (e.g. from
+    a generator) and not yet yielded at a time, instead of all args being
+    queued at once.
+    '''
+    pool = (ThreadPool if threads else mp.Pool)(n_threads)
+    if star:
+        fn = functools.partial(_star_call, fn)
+    if max_n_pending is not None:
+        semaphore = threading.Semaphore(max_n_pending)
+        stop = threading.Event()
+        args = _iter_bounded(args, semaphore, stop)
+    try:
+        for result in pool.imap_unordered(fn, args):
+            yield result
+            if max_n_pending is not None:
+                semaphore.release()
+    finally:
+        if max_n_pending is not None:
+            #unblocking the pool's task feeder, if waiting for a slot
+            stop.set()
+            semaphore.release()
+        pool.terminate()
+
+
 _CSV_HIST_HEADER = 'term,frequency'
 
 
@@ -140,12 +314,17 @@ def load_csv_hist(path):
     if lines and lines[0] == _CSV_HIST_HEADER:
         lines = lines[1:]
     items = [l.split(',') for l in lines]
-    hist = {k: (float if '.' in v else int)(v) for k, v in items}
+    hist = {k: (int if v.lstrip('-').isdigit() else float)(v)
+        for k, v in items}
     return hist
 
 
 #maximum number of names that are not last names to be used. can be None
 DEF_MAX_N_NONLAST_NAMES = 0
+#maximum number of memoized normalized authors/titles
+NORM_CACHE_SIZE = 1 << 18
+_DIGITS_TABLE = str.maketrans('', '', '0123456789')
+_REP_SPACES_REGEX = re.compile(r' {2,}')
 
 
 def crop_author_names(author, max_n_nonlast_names=DEF_MAX_N_NONLAST_NAMES):
@@ -168,9 +347,9 @@ def pre_proc_author(author):
     Assumes author comes from raw text strings from ref file/paper metadata.
     '''
     #removing numbers, trailing spaces and repeating spaces
-    author = remove(author, '0123456789')
+    author = author.translate(_DIGITS_TABLE)
     author = author.strip(' ')
-    author = remove_reps(author, ' ')
+    author = _REP_SPACES_REGEX.sub(' ', author)
     #if there's a comma, assumes it's in format 'last name, blablabla'
     if ',' in author:
         if author.count(',') > 1:
@@ -189,6 +368,10 @@ def normalize_author(author):
     return author
 
 
+_TITLE_POLLUTING_TERMS = {'et', 'al'}
+_TITLE_POLLUTING_PREFIXES = ('arxiv', 'biorxiv', 'preprint', 'abs/')
+
+
 def normalize_title(title):
     '''
     Assumes title comes from raw text strings from ref file/paper metadata.
@@ -196,23 +379,54 @@ def normalize_title(title):
     title = '' if title is None else title
     title = title.lower()
     #removing numbers
-    title = remove(title, '0123456789')
+    title = title.translate(_DIGITS_TABLE)
     #using only first sentenced that ends with punctuation
-    title = title.split('.')[0]
+    title = title.split('.', 1)[0]
     #slugifying
     title = slugify(title)
     #removing polluting items
-    tokens = title.split('-')
-    for term in ['et', 'al']:
-        tokens = [tok for tok in tokens if not tok == term]
-    for term in ['arxiv', 'biorxiv', 'preprint', 'abs/']:
-        tokens = [tok for tok in tokens if not tok.startswith(term)]
-    for term in ['/']:
-        tokens = [tok for tok in tokens if not term in tok]
+    tokens = [tok for tok in title.split('-') if not (
+        tok in _TITLE_POLLUTING_TERMS
+        or tok.startswith(_TITLE_POLLUTING_PREFIXES)
+        or '/' in tok)]
     title = '-'.join(tokens)
     return title
 
 
+_normalize_author = functools.lru_cache(NORM_CACHE_SIZE)(normalize_author)
+_normalize_title = functools.lru_cache(NORM_CACHE_SIZE)(normalize_title)
+
+
+def normalize_authors(authors):
+    '''
+    Same as normalize_author for each author, memoized.
+    '''
+    return [_normalize_author(a) for a in authors]
+
+
+def normalize_titles(titles):
+    '''
+    Same as normalize_title for each title, memoized.
+    '''
+    return [_normalize_title(t) for t in titles]
+
+
+def get_file_hash(path, algo='sha256', chunk_size=1 << 20):
+    hsh = hashlib.new(algo)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            hsh.update(chunk)
+    return hsh.hexdigest()
+
+
+def add_path_suffix(path, suffix):
+    '''
+    Adds suffix to path before its extension.
+    '''
+    root, ext = os.path.splitext(path)
+    return '{}{}{}'.format(root, suffix, ext)
+
+
 def mk_dir_if_needed(path):
     if not os.path.isdir(path):
         os.makedirs(path)